@@ -1,9 +1,18 @@
+from fontTools.t1Lib import T1Font, T1Error
+from fontTools.ttLib import TTFont, TTLibError
 from extractor.exceptions import ExtractorError
-from extractor.formats.opentype import isOpenType, extractFontFromOpenType
+from extractor.formats.opentype import (
+    isOpenType,
+    extractFontFromOpenType,
+    disassembleInstructions,
+)
 from extractor.formats.woff import isWOFF, extractFontFromWOFF
 from extractor.formats.type1 import isType1, extractFontFromType1
 from extractor.formats.ttx import isTTX, extractFontFromTTX
 from extractor.formats.vfb import isVFB, extractFontFromVFB, haveVfb2ufo
+from extractor.formats.variable import extractVariableFont
+from extractor.stats import ExtractionStats, timePhase
+from extractor.cache import ExtractionCache
 
 try:
     from ._version import __version__
@@ -23,20 +32,95 @@ _extractFunctions = dict(
 )
 
 
-def extractFormat(pathOrFile):
-    if isType1(pathOrFile):
-        return "Type1"
-    elif isWOFF(pathOrFile):
-        return "WOFF"
-    elif isOpenType(pathOrFile):
+# number of bytes read from the start of a file to identify its format
+_SNIFF_SIZE = 512
+
+
+def _readHeader(pathOrFile, size=_SNIFF_SIZE):
+    if hasattr(pathOrFile, "read"):
+        position = pathOrFile.tell()
+        header = pathOrFile.read(size)
+        pathOrFile.seek(position)
+        return header
+    with open(pathOrFile, "rb") as f:
+        return f.read(size)
+
+
+def _sniffFormat(pathOrFile):
+    """
+    Identify the format from the first bytes of the file
+    without parsing it. Returns None if the header is
+    inconclusive.
+    """
+    header = _readHeader(pathOrFile)
+    tag = header[:4]
+    if tag in (b"\x00\x01\x00\x00", b"OTTO", b"true"):
         return "OTF"
-    elif isTTX(pathOrFile):
+    elif tag in (b"wOFF", b"wOF2"):
+        return "WOFF"
+    elif header.startswith((b"\x80\x01", b"%!PS-AdobeFont", b"%!FontType1")):
+        return "Type1"
+    elif header.startswith(b"\x1aWLF10"):
+        if haveVfb2ufo():
+            return "vfb"
+        return None
+    # skip a byte order mark and leading whitespace
+    text = header.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text.startswith((b"<?xml", b"<ttFont")) and b"<ttFont" in text:
         return "ttx"
-    elif haveVfb2ufo() and isVFB(pathOrFile):
-        return "vfb"
     return None
 
 
+def _parseFormat(pathOrFile):
+    """
+    Identify the format by trying each reader in turn. This is
+    only needed when the header is inconclusive (for example
+    Mac LWFN resources). The parsed source is returned along
+    with the format so that it doesn't have to be read again.
+    """
+    if isinstance(pathOrFile, str):
+        try:
+            return "Type1", T1Font(pathOrFile, encoding="macroman")
+        except T1Error:
+            pass
+    try:
+        source = TTFont(pathOrFile)
+    except TTLibError:
+        pass
+    else:
+        if source.flavor in ("woff", "woff2"):
+            return "WOFF", source
+        return "OTF", source
+    source = TTFont()
+    try:
+        source.importXML(pathOrFile)
+    except Exception:
+        pass
+    else:
+        return "ttx", source
+    if haveVfb2ufo() and isVFB(pathOrFile):
+        return "vfb", None
+    return None, None
+
+
+def _identifyFormat(pathOrFile):
+    format = _sniffFormat(pathOrFile)
+    if format is not None:
+        return format, None
+    return _parseFormat(pathOrFile)
+
+
+def _closeSource(source):
+    if isinstance(source, TTFont):
+        source.close()
+
+
+def extractFormat(pathOrFile):
+    format, source = _identifyFormat(pathOrFile)
+    _closeSource(source)
+    return format
+
+
 def extractUFO(
     pathOrFile,
     destination,
@@ -46,12 +130,205 @@ def extractUFO(
     doFeatures=True,
     format=None,
     customFunctions={},
+    stats=None,
+    cache=None,
+    incremental=False,
+    glyphs=None,
+    unicodes=None,
+    glyphWorkers=None,
+    lazy=False,
+    lazyGlyphs=False,
+    deferDisassembly=False,
+    groupKerning=False,
 ):
+    """
+    Extract the font at pathOrFile into destination. To collect
+    the time spent in each extraction phase and counts of the
+    extracted data, pass an extractor.stats.ExtractionStats
+    object as stats.
+
+    Without doGlyphs, the TrueType instructions and the anchors of
+    an OpenType font are not extracted either, as they are stored
+    in the glyphs.
+
+    To reuse the data of earlier extractions of the same file
+    with the same options, pass an extractor.cache.ExtractionCache
+    object as cache. The destination must be empty. On a cache hit,
+    customFunctions are not run: their results are part of the cached
+    data. Only the module-qualified names of the functions are part
+    of the cache key, so after changing what a function does, clear
+    the cache or the earlier results are still used.
+
+    With incremental=True, the checksums of the source tables are
+    stored in the destination lib, and when the destination has
+    been extracted incrementally before, only the data read from
+    tables that changed since then is extracted again and replaced.
+    This is only supported for OpenType fonts.
+
+    To extract only some of the glyphs, pass their names or glyph IDs
+    as glyphs and/or the code points they are mapped to as unicodes
+    (for example a range). The components of composite glyphs are
+    added, and all phases are restricted to the subset: the kerning
+    and groups are pruned and the features are extracted from the
+    layout tables subset with fontTools.subset. This isn't supported
+    for vfb files.
+
+    To draw the glyphs of an OpenType or Type 1 font with many glyphs
+    in parallel, pass the number of processes as glyphWorkers. The
+    result is the same as when the glyphs are drawn in this process.
+    It is ignored for the other formats.
+
+    With lazy=True, the tables of an OpenType font are only
+    decompiled when an extraction phase reads them, and dropped
+    when no later phase needs them. This saves time and memory
+    when only some of the data is extracted, for example only the
+    info. It is ignored for the other formats.
+
+    With lazyGlyphs=True, the glyphs of an OpenType font are only
+    read when they are first accessed or the destination is saved.
+    The glyph tables of the font are kept in memory until then.
+    It can't be combined with cache or incremental.
+    The destination must be an empty defcon or ufoLib2 font; other
+    destinations, and the layers of defcon or ufoLib2 releases that
+    read their glyphs differently, get the glyphs extracted as usual.
+    The glyph counts of stats leave out the contours and anchors.
+
+    With deferDisassembly=True, the TrueType programs of an OpenType
+    font are stored as bytecode in the font and glyph libs instead of
+    as assembly. Call extractor.disassembleInstructions with the
+    destination to turn them into assembly before it is saved; if the
+    instructions are dropped or compiled again, they are never
+    disassembled.
+
+    With groupKerning=True, the kerning pairs of a Type 1 font, read
+    from its AFM or PFM file, are grouped: glyphs with the same kerning
+    on one side are put in a kerning group and their pairs are merged.
+    It is ignored for the other formats.
+
+    customFunctions maps a format to a list of functions that are
+    called with the source and destination after the other phases.
+    For the OpenType, WOFF and TTX formats, functions that take a
+    context argument are also passed the
+    extractor.formats.opentype.ExtractionContext of the source,
+    which holds the cmap, glyph set and layout lookup data the
+    other phases already read.
+    """
+    if cache is not None and incremental:
+        raise ExtractorError("A cache can't be used for incremental extraction.")
+    if incremental and (glyphs is not None or unicodes is not None):
+        raise ExtractorError("A glyph subset can't be extracted incrementally.")
+    if incremental and lazyGlyphs:
+        raise ExtractorError("Glyphs can't be read lazily in incremental extraction.")
+    if cache is not None and lazyGlyphs:
+        # storing the glyphs in the cache would read them all
+        raise ExtractorError("A cache can't be used when glyphs are read lazily.")
+    # the subset may be read more than once
+    if glyphs is not None and not isinstance(glyphs, (list, tuple, set, frozenset)):
+        glyphs = list(glyphs)
+    if unicodes is not None and not isinstance(unicodes, (set, frozenset, range)):
+        unicodes = set(unicodes)
+    if cache is not None:
+        with timePhase(stats, "cache"):
+            key = cache.key(
+                pathOrFile,
+                doGlyphs=doGlyphs,
+                doInfo=doInfo,
+                doKerning=doKerning,
+                doFeatures=doFeatures,
+                format=format,
+                customFunctions=customFunctions,
+                glyphs=glyphs,
+                unicodes=unicodes,
+                deferDisassembly=deferDisassembly,
+                groupKerning=groupKerning,
+            )
+            hit = cache.load(key, destination)
+        if stats is not None:
+            stats.count("cache", "hits" if hit else "misses")
+        if hit:
+            return
+    _extractUFO(
+        pathOrFile,
+        destination,
+        doGlyphs=doGlyphs,
+        doInfo=doInfo,
+        doKerning=doKerning,
+        doFeatures=doFeatures,
+        format=format,
+        customFunctions=customFunctions,
+        stats=stats,
+        incremental=incremental,
+        glyphs=glyphs,
+        unicodes=unicodes,
+        glyphWorkers=glyphWorkers,
+        lazy=lazy,
+        lazyGlyphs=lazyGlyphs,
+        deferDisassembly=deferDisassembly,
+        groupKerning=groupKerning,
+    )
+    if cache is not None:
+        with timePhase(stats, "cache"):
+            cache.store(key, destination)
+
+
+def _extractUFO(
+    pathOrFile,
+    destination,
+    doGlyphs,
+    doInfo,
+    doKerning,
+    doFeatures,
+    format,
+    customFunctions,
+    stats,
+    incremental,
+    glyphs,
+    unicodes,
+    glyphWorkers,
+    lazy,
+    lazyGlyphs,
+    deferDisassembly,
+    groupKerning,
+):
+    source = None
     if format is None:
-        format = extractFormat(pathOrFile)
+        with timePhase(stats, "format"):
+            format, source = _identifyFormat(pathOrFile)
     if format not in _extractFunctions:
         raise ExtractorError("Unknown file format.")
     func = _extractFunctions[format]
+    options = {}
+    if incremental:
+        if format != "OTF":
+            _closeSource(source)
+            raise ExtractorError(
+                "Incremental extraction is not supported for %s files." % format
+            )
+        options["incremental"] = True
+    if glyphs is not None or unicodes is not None:
+        if format == "vfb":
+            _closeSource(source)
+            raise ExtractorError("Glyph subsets are not supported for vfb files.")
+        options["glyphs"] = glyphs
+        options["unicodes"] = unicodes
+    if glyphWorkers is not None and format in ("OTF", "Type1"):
+        options["glyphWorkers"] = glyphWorkers
+    if not doGlyphs and format == "OTF":
+        # the glyph programs and anchors are stored in the glyphs
+        options["doInstructions"] = False
+        options["doAnchors"] = False
+    if lazy and format == "OTF":
+        options["lazy"] = True
+    if lazyGlyphs and format == "OTF":
+        options["lazyGlyphs"] = True
+    if deferDisassembly and format == "OTF":
+        options["deferDisassembly"] = True
+    if groupKerning and format == "Type1":
+        options["groupKerning"] = True
+    # if the format had to be identified by parsing the file,
+    # hand the parsed source to the extraction function.
+    if source is not None:
+        pathOrFile = source
     # wrap the extraction in a try: except: so that
     # callers don't need to worry about lower level
     # (fontTools, etc.) errors. if an error
@@ -66,6 +343,8 @@ def extractUFO(
             doKerning=doKerning,
             doFeatures=doFeatures,
             customFunctions=customFunctions.get(format, []),
+            stats=stats,
+            **options
         )
     except:
         import sys
@@ -75,6 +354,105 @@ def extractUFO(
         raise ExtractorError(
             "There was an error reading the %s file." % format
         )
+    finally:
+        _closeSource(source)
+
+
+def extractUFOs(
+    paths,
+    destinationFactory,
+    doGlyphs=True,
+    doInfo=True,
+    doKerning=True,
+    doFeatures=True,
+    format=None,
+    customFunctions={},
+    backend="serial",
+    maxWorkers=None,
+    maxPending=None,
+    cache=None,
+):
+    """
+    Extract many fonts, yielding (path, destination, error) for each
+    path as soon as it is done, so that each font can be saved and
+    dropped before the next ones pile up. destinationFactory is called
+    without arguments to make each new destination, for example
+    ufoLib2.Font. error is None on success; if the extraction failed,
+    destination is None and error is the exception.
+
+    backend is "serial", "thread" or "process". With the "process"
+    backend, destinationFactory, customFunctions and the destinations
+    must be picklable (ufoLib2 fonts are, defcon fonts are not). With
+    a pool, fonts are yielded in the order they finish and at most
+    maxPending fonts (default: twice the number of workers) are
+    submitted or waiting to be collected at any time.
+
+    cache is passed on to extractUFO.
+    """
+    options = dict(
+        doGlyphs=doGlyphs,
+        doInfo=doInfo,
+        doKerning=doKerning,
+        doFeatures=doFeatures,
+        format=format,
+        customFunctions=customFunctions,
+        cache=cache,
+    )
+    if backend == "serial":
+        for path in paths:
+            yield _extractUFOResult(path, destinationFactory, options)
+        return
+    elif backend == "thread":
+        from concurrent.futures import ThreadPoolExecutor as Executor
+    elif backend == "process":
+        from concurrent.futures import ProcessPoolExecutor as Executor
+    else:
+        raise ValueError("Unknown backend: %r" % backend)
+    from concurrent.futures import wait, FIRST_COMPLETED
+    import os
+
+    if maxWorkers is None:
+        maxWorkers = os.cpu_count() or 1
+    if maxPending is None:
+        maxPending = 2 * maxWorkers
+    maxPending = max(1, maxPending)
+
+    def collect(futures):
+        for future in futures:
+            path = pending.pop(future)
+            try:
+                yield future.result()
+            except Exception as error:
+                # the result could not be sent back from the worker
+                yield path, None, error
+
+    pending = {}
+    with Executor(max_workers=maxWorkers) as executor:
+        try:
+            for path in paths:
+                while len(pending) >= maxPending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+                future = executor.submit(
+                    _extractUFOResult, path, destinationFactory, options
+                )
+                pending[future] = path
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+        finally:
+            # the caller stopped early, don't start any more work
+            for future in pending:
+                future.cancel()
+
+
+def _extractUFOResult(path, destinationFactory, options):
+    destination = destinationFactory()
+    try:
+        extractUFO(path, destination, **options)
+    except Exception as error:
+        return path, None, error
+    return path, destination, None
 
 
 def cmdline():
@@ -82,7 +460,7 @@ def cmdline():
     Extract one ore more fonts to UFO. Installed as command line script
     `extractufo`.
 
-    Usage: extractufo font [font ...]
+    Usage: extractufo [-j N] font [font ...]
     """
     import os
     from sys import exit
@@ -91,14 +469,35 @@ def cmdline():
     parser = ArgumentParser(
         description="Extract data from font binaries and build UFO objects from them.",
         epilog="Each resulting UFO will be saved as FONT_FILE.ufo(z) in the same directory as the original FONT_FILE. "
-               "If destination file or directory already exists, conversion for that source file will be skipped and the application exit code will indicate an error.",
+               "If destination file or directory already exists and --update is not given, conversion for that source file will be skipped and the application exit code will indicate an error.",
     )
     parser.add_argument('FONT_FILE', help='Input font path', nargs="+")
     parser.add_argument('-m', '--ufo-module', choices=['ufoLib2', 'defcon'],
                         help='Select the default library for writing UFOs (default: autodetect, prefer ufoLib2)')
     parser.add_argument('-z', '--zip', action="store_true", help="Output UFO ZIP")
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar="N",
+                        help="Extract N fonts in parallel (default: 1, 0: one per CPU)")
+    parser.add_argument('--glyph-jobs', type=int, default=1, metavar="N",
+                        help="Draw the glyphs of each OpenType or Type 1 font in N processes (default: 1, 0: one per CPU)")
+    parser.add_argument('--group-kerning', action="store_true",
+                        help="Put the glyphs of Type 1 fonts with the same kerning in kerning groups")
+    parser.add_argument('--stats', metavar="JSON_FILE",
+                        help="Write the time spent in each extraction phase and counts of the extracted data to JSON_FILE")
+    parser.add_argument('-u', '--update', action="store_true",
+                        help="Update existing UFOs in place, extracting again only the data whose source tables changed (OpenType fonts only)")
+    parser.add_argument('--cache', metavar="DIRECTORY",
+                        help="Cache the extracted data in DIRECTORY and reuse it for unchanged fonts")
+    parser.add_argument('--cache-size', type=int, default=1024, metavar="MB",
+                        help="Remove the least recently used cached data when the cache grows larger than MB megabytes (default: 1024)")
+    parser.add_argument('--variable', choices=['masters', 'instances'],
+                        help="Extract the masters or the named instances of variable fonts to a UFO each, "
+                             "saved as FONT_FILE-STYLE.ufo(z) next to a FONT_FILE.designspace (requires NumPy)")
 
     args = parser.parse_args()
+    if args.update and args.cache is not None:
+        parser.error("--cache can't be used with --update")
+    if args.variable is not None and (args.update or args.cache is not None):
+        parser.error("--variable can't be used with --update or --cache")
     if args.ufo_module is None:
         try:
             from ufoLib2 import Font
@@ -124,17 +523,201 @@ def cmdline():
             exit(1)
 
     structure = "zip" if args.zip else "package"
+    cache = None
+    if args.cache is not None:
+        cache = ExtractionCache(args.cache, maxSize=args.cache_size * 1024 * 1024)
+    # worker processes import the UFO library by name
+    ufo_module = Font.__module__.split(".")[0]
+    jobs = args.jobs or os.cpu_count()
+    glyph_jobs = args.glyph_jobs or os.cpu_count()
+    executor = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=jobs)
     had_write_errors = False
-    for font_path in args.FONT_FILE:
-        ufo_path = f"{font_path}.ufo" if not args.zip else f"{font_path}.ufoz"
-        print(f"Extracting {ufo_path}... ", end="")
-        if os.path.exists(ufo_path):
-            print("path already exists, skipping.")
-            had_write_errors = True
-            continue
-        ufo = Font()
-        extractUFO(font_path, ufo)
-        ufo.save(ufo_path, structure=structure)
-        print("done.")
+    done = skipped = failed = 0
+    all_stats = {}
+    try:
+        # check the destinations up front, so that a source listed
+        # more than once is skipped like an existing destination
+        tasks = []
+        seen = set()
+        for font_path in args.FONT_FILE:
+            ufo_path = f"{font_path}.ufo" if not args.zip else f"{font_path}.ufoz"
+            if args.variable is not None:
+                # the UFOs are named after the designspace
+                ufo_path = f"{font_path}.designspace"
+            if ufo_path in seen or (os.path.exists(ufo_path) and not args.update):
+                task = None
+            elif executor is None:
+                task = (font_path, ufo_path)
+            else:
+                task = executor.submit(
+                    _extractUFOFile,
+                    font_path,
+                    ufo_path,
+                    ufo_module,
+                    structure,
+                    args.stats is not None,
+                    cache,
+                    args.update,
+                    glyph_jobs,
+                    args.variable,
+                    args.group_kerning,
+                )
+            seen.add(ufo_path)
+            tasks.append((ufo_path, task))
+
+        for ufo_path, task in tasks:
+            print(f"Extracting {ufo_path}... ", end="", flush=True)
+            if task is None:
+                print("path already exists, skipping.")
+                had_write_errors = True
+                skipped += 1
+                continue
+            try:
+                if executor is None:
+                    stats = _extractUFOFile(
+                        *task,
+                        ufo_module,
+                        structure,
+                        args.stats is not None,
+                        cache,
+                        args.update,
+                        glyph_jobs,
+                        args.variable,
+                        args.group_kerning,
+                    )
+                else:
+                    stats = task.result()
+            except ExtractorError as e:
+                print(f"failed: {e}")
+                had_write_errors = True
+                failed += 1
+                continue
+            except Exception as e:
+                # a missing file, a failed save or a crashed worker
+                # only fails this font
+                print(f"failed: {type(e).__name__}: {e}")
+                had_write_errors = True
+                failed += 1
+                continue
+            print("done.")
+            done += 1
+            if stats is not None:
+                all_stats[ufo_path] = stats
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if len(tasks) > 1:
+        print(f"{done} extracted, {skipped} skipped, {failed} failed.")
+    if args.stats is not None:
+        import json
+
+        with open(args.stats, "w") as f:
+            json.dump(all_stats, f, indent=2)
 
     exit(had_write_errors)
+
+
+def _extractUFOFile(
+    font_path,
+    ufo_path,
+    ufo_module,
+    structure,
+    collect_stats=False,
+    cache=None,
+    update=False,
+    glyph_jobs=1,
+    variable=None,
+    group_kerning=False,
+):
+    """
+    Extract a font file and save it as UFO. This is used by
+    the command line script and runs in a worker process
+    when extracting in parallel. Returns the extraction stats
+    as a dictionary if collect_stats is True. If update is True,
+    an existing UFO is updated in place. The glyphs are drawn
+    in glyph_jobs processes. If variable is "masters" or
+    "instances", ufo_path is the path of the designspace that
+    the UFO of each master or named instance is saved next to.
+    If group_kerning is True, the kerning of Type 1 fonts is grouped.
+    """
+    import importlib
+    import os
+
+    Font = importlib.import_module(ufo_module).Font
+    stats = ExtractionStats() if collect_stats else None
+    if variable is not None:
+        _extractVariableFontFile(
+            font_path, ufo_path, Font, structure, stats, variable == "instances"
+        )
+        if stats is not None:
+            return stats.asDict()
+        return None
+    save_path = ufo_path
+    if update and os.path.exists(ufo_path):
+        if hasattr(Font, "open"):
+            ufo = Font.open(ufo_path)
+        else:
+            ufo = Font(ufo_path)
+        # save to the path the UFO was read from
+        save_path = None
+    else:
+        ufo = Font()
+    extractUFO(
+        font_path,
+        ufo,
+        stats=stats,
+        cache=cache,
+        incremental=update,
+        glyphWorkers=glyph_jobs,
+        groupKerning=group_kerning,
+    )
+    with timePhase(stats, "save"):
+        ufo.save(save_path, structure=structure)
+    if stats is not None:
+        return stats.asDict()
+
+
+def _extractVariableFontFile(
+    font_path, designspace_path, Font, structure, stats, instances
+):
+    import os
+    import re
+
+    try:
+        document = extractVariableFont(
+            font_path, Font, instances=instances, stats=stats
+        )
+    except ExtractorError:
+        raise
+    except:
+        import sys
+        import traceback
+
+        traceback.print_exc(file=sys.stdout)
+        raise ExtractorError("There was an error reading the variable font.")
+    extension = ".ufoz" if structure == "zip" else ".ufo"
+    base = os.path.basename(font_path)
+    directory = os.path.dirname(designspace_path)
+    filenames = set()
+    with timePhase(stats, "save"):
+        for descriptor in document.sources + document.instances:
+            if descriptor.font is None:
+                continue
+            # the style names come from the font, keep them from
+            # naming paths outside directory or the same UFO twice
+            style = re.sub(r"[^\w-]", "", descriptor.styleName or "") or "Style"
+            filename = f"{base}-{style}{extension}"
+            number = 1
+            while filename.lower() in filenames:
+                number += 1
+                filename = f"{base}-{style}-{number}{extension}"
+            filenames.add(filename.lower())
+            descriptor.filename = filename
+            descriptor.font.save(
+                os.path.join(directory, descriptor.filename), structure=structure
+            )
+        document.write(designspace_path)
@@ -0,0 +1 @@
+__version__ = "0.1.dev1+g2850b5e38"
\ No newline at end of file
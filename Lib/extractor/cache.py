@@ -0,0 +1,317 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import zlib
+from copy import deepcopy
+from fontTools.ufoLib import fontInfoAttributesVersion3
+from extractor.tools import OutlineRecordingPointPen, appendOutline
+
+# increment this when the structure of the cached data changes
+CACHE_FORMAT = 1
+
+# 1 GB
+DEFAULT_MAX_SIZE = 1 << 30
+
+_CACHE_FILE_EXTENSION = ".extracted"
+
+_anchorAttributes = ("x", "y", "name", "color", "identifier")
+_guidelineAttributes = ("x", "y", "angle", "name", "color", "identifier")
+
+
+class ExtractionCache(object):
+
+    """
+    An on-disk cache of extracted font data. Pass an instance
+    as `cache` to extractUFO to use it.
+
+    The cache key is built from a hash of the contents of the
+    font file, the extractor version and the extraction options,
+    so a changed file or option is extracted again. The info,
+    glyphs, kerning, groups, features and lib of the extracted
+    font are stored in a compressed file per key and copied into
+    the destination (defcon or ufoLib2) on a hit.
+
+    When the total size of the cached files exceeds maxSize bytes,
+    the least recently used files are removed.
+
+    The cached files are pickles, so only use a directory that
+    no one else can write to.
+    """
+
+    def __init__(self, directory, maxSize=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.maxSize = maxSize
+        # the size of the cached files, scanned on the first store
+        self._size = None
+
+    def key(self, pathOrFile, **options):
+        """
+        Return the cache key for the font at pathOrFile
+        extracted with options.
+        """
+        from extractor import __version__
+
+        contentHash = hashFile(pathOrFile)
+        # custom functions can't be hashed, use their names
+        customFunctions = options.pop("customFunctions", {})
+        options["customFunctions"] = sorted(
+            (format, [_functionName(function) for function in functions])
+            for format, functions in customFunctions.items()
+        )
+        # sets have no stable order
+        for name, value in options.items():
+            if isinstance(value, (set, frozenset)):
+                options[name] = sorted(value, key=repr)
+        key = repr((CACHE_FORMAT, __version__, contentHash, sorted(options.items())))
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + _CACHE_FILE_EXTENSION)
+
+    def load(self, key, destination):
+        """
+        Copy the data cached for key into destination. Returns False
+        if there is no data for key.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return False
+        try:
+            data = pickle.loads(zlib.decompress(data))
+        except Exception:
+            # a damaged file, extract again
+            _remove(path)
+            return False
+        # mark the file as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        rehydrate(data, destination)
+        return True
+
+    def store(self, key, destination):
+        """
+        Cache the data in destination for key. Errors writing the
+        cache are ignored, the next extraction will simply miss.
+        """
+        try:
+            data = pickle.dumps(serialize(destination), pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # the destination holds data that can't be cached
+            return
+        data = zlib.compress(data, 1)
+        tempPath = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # write to a temporary file first, so that other
+            # processes sharing the cache never read half a file
+            fd, tempPath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tempPath, self._path(key))
+        except OSError:
+            if tempPath is not None:
+                _remove(tempPath)
+            return
+        if self._size is None:
+            self.evict()
+            return
+        # only scan the directory once it may have grown past maxSize,
+        # the scan also picks up files stored by other processes
+        self._size += len(data)
+        if self._size > self.maxSize:
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used files until the
+        cache is no larger than maxSize.
+        """
+        entries = []
+        totalSize = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            self._size = None
+            return
+        for name in names:
+            if not name.endswith(_CACHE_FILE_EXTENSION):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            totalSize += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if totalSize <= self.maxSize:
+                break
+            _remove(path)
+            totalSize -= size
+        self._size = totalSize
+
+    def clear(self):
+        """
+        Remove all cached files.
+        """
+        self._size = None
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return
+        for name in names:
+            if name.endswith(_CACHE_FILE_EXTENSION):
+                _remove(os.path.join(self.directory, name))
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _functionName(function):
+    return "%s.%s" % (
+        getattr(function, "__module__", None),
+        getattr(function, "__qualname__", repr(function)),
+    )
+
+
+def hashFile(pathOrFile, chunkSize=1 << 20):
+    """
+    Return the SHA-256 hex digest of the contents of a file.
+    """
+    h = hashlib.sha256()
+    if hasattr(pathOrFile, "read"):
+        position = pathOrFile.tell()
+        for chunk in iter(lambda: pathOrFile.read(chunkSize), b""):
+            h.update(chunk)
+        pathOrFile.seek(position)
+    else:
+        with open(pathOrFile, "rb") as f:
+            for chunk in iter(lambda: f.read(chunkSize), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+# -------------
+# Serialization
+# -------------
+
+
+def _plain(value):
+    # convert the containers of defcon and ufoLib2
+    # objects to built in types
+    if isinstance(value, (str, bytes, int, float, bool)) or value is None:
+        return value
+    if hasattr(value, "items"):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_plain(v) for v in value)
+    return value
+
+
+def _attributes(obj, attributes):
+    data = {}
+    for attr in attributes:
+        value = getattr(obj, attr, None)
+        if value is not None:
+            data[attr] = value
+    return data
+
+
+def serialize(font):
+    """
+    Return the info, glyphs, kerning, groups, features and
+    lib of font as built in types.
+    """
+    info = {}
+    for attr in fontInfoAttributesVersion3:
+        value = getattr(font.info, attr, None)
+        if value is None:
+            continue
+        if attr == "guidelines":
+            value = [_attributes(g, _guidelineAttributes) for g in value]
+        info[attr] = _plain(value)
+    glyphs = []
+    for glyph in font:
+        pen = OutlineRecordingPointPen()
+        glyph.drawPoints(pen)
+        glyphs.append(
+            (
+                glyph.name,
+                glyph.width,
+                glyph.height,
+                list(glyph.unicodes),
+                glyph.note,
+                _plain(glyph.lib),
+                [_attributes(a, _anchorAttributes) for a in glyph.anchors],
+                [_attributes(g, _guidelineAttributes) for g in glyph.guidelines],
+                pen.contours,
+                pen.components,
+            )
+        )
+    return dict(
+        info=info,
+        glyphs=glyphs,
+        kerning=dict(font.kerning.items()),
+        groups={name: list(members) for name, members in font.groups.items()},
+        features=font.features.text,
+        lib=_plain(font.lib),
+    )
+
+
+def rehydrate(data, font):
+    """
+    Copy data returned by serialize into font. The containers
+    are copied, so data can be copied into several fonts.
+    """
+    for attr, value in data["info"].items():
+        setattr(font.info, attr, deepcopy(value))
+    for (
+        name,
+        width,
+        height,
+        unicodes,
+        note,
+        lib,
+        anchors,
+        guidelines,
+        contours,
+        components,
+    ) in data["glyphs"]:
+        glyph = font.newGlyph(name)
+        # like defcon does when it loads a glyph, don't send a
+        # notification for every point. the unicodes are set
+        # afterwards so that the layer's unicode data is updated.
+        notifications = hasattr(glyph, "disableNotifications")
+        if notifications:
+            glyph.disableNotifications()
+        glyph.width = width
+        glyph.height = height
+        if note is not None:
+            glyph.note = note
+        glyph.lib.update(deepcopy(lib))
+        for anchor in anchors:
+            glyph.appendAnchor(anchor)
+        for guideline in guidelines:
+            glyph.appendGuideline(guideline)
+        appendOutline(glyph, contours, components)
+        if notifications:
+            glyph.enableNotifications()
+        glyph.unicodes = list(unicodes)
+    font.kerning.update(data["kerning"])
+    font.groups.update(
+        {name: list(members) for name, members in data["groups"].items()}
+    )
+    if data["features"]:
+        font.features.text = data["features"]
+    font.lib.update(deepcopy(data["lib"]))
@@ -0,0 +1,461 @@
+import math
+from struct import unpack_from
+from fontTools.encodings.StandardEncoding import StandardEncoding
+from fontTools.misc.psCharStrings import calcSubrBias
+
+# the largest angle between the two sides of an on curve
+# point that makes it smooth, as in GuessSmoothPointPen
+_SMOOTH_ERROR = 0.05
+
+# operators, the escaped operators are 1200 + the second byte
+_HSTEM = 1
+_VSTEM = 3
+_VMOVETO = 4
+_RLINETO = 5
+_HLINETO = 6
+_VLINETO = 7
+_RRCURVETO = 8
+_CALLSUBR = 10
+_RETURN = 11
+_ENDCHAR = 14
+_HSTEMHM = 18
+_HINTMASK = 19
+_CNTRMASK = 20
+_RMOVETO = 21
+_HMOVETO = 22
+_VSTEMHM = 23
+_RCURVELINE = 24
+_RLINECURVE = 25
+_VVCURVETO = 26
+_HHCURVETO = 27
+_CALLGSUBR = 29
+_VHCURVETO = 30
+_HVCURVETO = 31
+_IGNORE = 1200
+_HFLEX = 1234
+_FLEX = 1235
+_HFLEX1 = 1236
+_FLEX1 = 1237
+
+
+class CharStringOutlineDecoder(object):
+
+    """
+    Decode the outlines of Type 2 (CFF) charstrings into the
+    contours and components recorded by an
+    extractor.tools.OutlineRecordingPointPen, with the same
+    points, segment types and smooth flags as drawing the
+    charstring into a SegmentToPointPen, which is what the
+    getPen method of ufoLib2 and defcon glyphs returns.
+
+    Each subroutine is decoded once into a list of operators and
+    their operands, which is reused by all charstrings decoded
+    with the same decoder. The hints are skipped, only the stems
+    are counted to find the size of the hint masks.
+
+    decode raises NotImplementedError for charstrings that use
+    operators that are not needed for the outlines of CFF fonts,
+    such as the arithmetic and the CFF2 operators, and for
+    charstrings that were not read from a font. Use their draw
+    method instead.
+    """
+
+    def __init__(self):
+        # id(subroutine) -> (subroutine, program, hint mask size)
+        self._programs = {}
+        self._handlers = {
+            _HSTEM: self._op_stem,
+            _VSTEM: self._op_stem,
+            _HSTEMHM: self._op_stem,
+            _VSTEMHM: self._op_stem,
+            _HINTMASK: self._op_hintmask,
+            _CNTRMASK: self._op_hintmask,
+            _RMOVETO: self._op_rmoveto,
+            _HMOVETO: self._op_hmoveto,
+            _VMOVETO: self._op_vmoveto,
+            _RLINETO: self._op_rlineto,
+            _HLINETO: self._op_hlineto,
+            _VLINETO: self._op_vlineto,
+            _RRCURVETO: self._op_rrcurveto,
+            _RCURVELINE: self._op_rcurveline,
+            _RLINECURVE: self._op_rlinecurve,
+            _VVCURVETO: self._op_vvcurveto,
+            _HHCURVETO: self._op_hhcurveto,
+            _VHCURVETO: self._op_vhcurveto,
+            _HVCURVETO: self._op_hvcurveto,
+            _HFLEX: self._op_hflex,
+            _FLEX: self._op_flex,
+            _HFLEX1: self._op_hflex1,
+            _FLEX1: self._op_flex1,
+            _CALLSUBR: self._op_callsubr,
+            _CALLGSUBR: self._op_callgsubr,
+            _ENDCHAR: self._op_endchar,
+            _RETURN: None,
+            _IGNORE: None,
+        }
+
+    def decode(self, charString):
+        """
+        Return the contours and components of charString.
+        """
+        if charString.bytecode is None:
+            raise NotImplementedError
+        private = charString.private
+        self._localSubrs = getattr(private, "Subrs", [])
+        self._localBias = calcSubrBias(self._localSubrs)
+        self._globalSubrs = charString.globalSubrs
+        self._globalBias = calcSubrBias(self._globalSubrs)
+        self._stack = []
+        self._hintCount = 0
+        self._hintMaskBytes = 0
+        self._gotWidth = False
+        self._x = self._y = 0
+        self._points = None
+        self._contours = []
+        self._components = []
+        for op, args in self._tokenize(charString.bytecode):
+            self._do(op, args)
+        self._closePath()
+        return self._contours, self._components
+
+    # --------------
+    # Interpretation
+    # --------------
+
+    def _tokenize(self, code):
+        # yield each operator with the operands before it. the
+        # size of a hint mask is read after the hintmask operator
+        # was done, it depends on the number of stems so far.
+        args = []
+        i = 0
+        n = len(code)
+        while i < n:
+            b0 = code[i]
+            if b0 >= 32:
+                if b0 <= 246:
+                    args.append(b0 - 139)
+                    i += 1
+                elif b0 <= 250:
+                    args.append((b0 - 247) * 256 + code[i + 1] + 108)
+                    i += 2
+                elif b0 <= 254:
+                    args.append(-(b0 - 251) * 256 - code[i + 1] - 108)
+                    i += 2
+                else:
+                    # 16.16 fixed
+                    args.append(unpack_from(">l", code, i + 1)[0] / 65536)
+                    i += 5
+            elif b0 == 28:
+                args.append(unpack_from(">h", code, i + 1)[0])
+                i += 3
+            else:
+                if b0 == 12:
+                    op = 1200 + code[i + 1]
+                    i += 2
+                else:
+                    op = b0
+                    i += 1
+                yield op, args
+                args = []
+                if op == _HINTMASK or op == _CNTRMASK:
+                    i += self._hintMaskBytes
+        if args:
+            yield None, args
+
+    def _do(self, op, args):
+        if args:
+            self._stack.extend(args)
+        if op is None:
+            return
+        try:
+            handler = self._handlers[op]
+        except KeyError:
+            raise NotImplementedError("Unsupported charstring operator: %d" % op)
+        if handler is not None:
+            handler()
+
+    def _callSubr(self, subr):
+        if subr.bytecode is None:
+            raise NotImplementedError
+        key = id(subr)
+        cached = self._programs.get(key)
+        if cached is not None:
+            _, program, hintMaskBytes = cached
+            # the program was decoded with hint masks of a
+            # different size, decode it again
+            if hintMaskBytes is not None and hintMaskBytes != self._hintMaskBytes:
+                cached = None
+        if cached is not None:
+            for op, args in program:
+                self._do(op, args)
+            return
+        program = []
+        hintMaskBytes = None
+        for op, args in self._tokenize(subr.bytecode):
+            program.append((op, args))
+            self._do(op, args)
+            if op == _HINTMASK or op == _CNTRMASK:
+                hintMaskBytes = self._hintMaskBytes
+        self._programs[key] = (subr, program, hintMaskBytes)
+
+    def _popall(self):
+        args = self._stack
+        self._stack = []
+        return args
+
+    def _popallWidth(self, evenOdd=0):
+        args = self._popall()
+        if not self._gotWidth:
+            # the width is not needed, only remove it
+            if evenOdd ^ (len(args) % 2):
+                args = args[1:]
+            self._gotWidth = True
+        return args
+
+    # -----
+    # Paths
+    # -----
+
+    def _moveTo(self, dx, dy):
+        self._closePath()
+        self._x += dx
+        self._y += dy
+        self._points = [(self._x, self._y, "move")]
+
+    def _lineTo(self, dx, dy):
+        if self._points is None:
+            self._moveTo(0, 0)
+        self._x += dx
+        self._y += dy
+        self._points.append((self._x, self._y, "line"))
+
+    def _curveTo(self, dxa, dya, dxb, dyb, dxc, dyc):
+        if self._points is None:
+            self._moveTo(0, 0)
+        append = self._points.append
+        x = self._x + dxa
+        y = self._y + dya
+        append((x, y, None))
+        x += dxb
+        y += dyb
+        append((x, y, None))
+        x += dxc
+        y += dyc
+        append((x, y, "curve"))
+        self._x = x
+        self._y = y
+
+    def _closePath(self):
+        points = self._points
+        if points is None:
+            return
+        self._points = None
+        # like SegmentToPointPen, remove the last point if it is
+        # on the first, otherwise the first point starts a line
+        if (
+            len(points) > 1
+            and points[0][:2] == points[-1][:2]
+            and points[-1][2] is not None
+        ):
+            points[0] = points.pop()
+        else:
+            x, y, _ = points[0]
+            points[0] = (x, y, "line")
+        self._contours.append((None, _guessSmooth(points)))
+
+    # ---------
+    # Operators
+    # ---------
+
+    def _countHints(self):
+        args = self._popallWidth()
+        self._hintCount += len(args) // 2
+
+    def _op_stem(self):
+        self._countHints()
+
+    def _op_hintmask(self):
+        if not self._hintMaskBytes:
+            self._countHints()
+            self._hintMaskBytes = (self._hintCount + 7) // 8
+
+    def _op_rmoveto(self):
+        args = self._popallWidth()
+        self._moveTo(args[0], args[1])
+
+    def _op_hmoveto(self):
+        self._moveTo(self._popallWidth(1)[0], 0)
+
+    def _op_vmoveto(self):
+        self._moveTo(0, self._popallWidth(1)[0])
+
+    def _op_endchar(self):
+        self._closePath()
+        args = self._popallWidth()
+        if args:
+            # seac accent building
+            adx, ady, bchar, achar = args
+            self._components.append(
+                (StandardEncoding[bchar], (1, 0, 0, 1, 0, 0), None)
+            )
+            self._components.append(
+                (StandardEncoding[achar], (1, 0, 0, 1, adx, ady), None)
+            )
+
+    def _op_rlineto(self):
+        args = self._popall()
+        for i in range(0, len(args), 2):
+            self._lineTo(args[i], args[i + 1])
+
+    def _op_hlineto(self):
+        self._alternatingLineTo(True)
+
+    def _op_vlineto(self):
+        self._alternatingLineTo(False)
+
+    def _alternatingLineTo(self, isHorizontal):
+        for arg in self._popall():
+            if isHorizontal:
+                self._lineTo(arg, 0)
+            else:
+                self._lineTo(0, arg)
+            isHorizontal = not isHorizontal
+
+    def _op_rrcurveto(self):
+        args = self._popall()
+        for i in range(0, len(args), 6):
+            self._curveTo(*args[i:i + 6])
+
+    def _op_rcurveline(self):
+        args = self._popall()
+        for i in range(0, len(args) - 2, 6):
+            self._curveTo(*args[i:i + 6])
+        self._lineTo(args[-2], args[-1])
+
+    def _op_rlinecurve(self):
+        args = self._popall()
+        for i in range(0, len(args) - 6, 2):
+            self._lineTo(args[i], args[i + 1])
+        self._curveTo(*args[-6:])
+
+    def _op_vvcurveto(self):
+        args = self._popall()
+        if len(args) % 2:
+            dx1 = args[0]
+            args = args[1:]
+        else:
+            dx1 = 0
+        for i in range(0, len(args), 4):
+            dya, dxb, dyb, dyc = args[i:i + 4]
+            self._curveTo(dx1, dya, dxb, dyb, 0, dyc)
+            dx1 = 0
+
+    def _op_hhcurveto(self):
+        args = self._popall()
+        if len(args) % 2:
+            dy1 = args[0]
+            args = args[1:]
+        else:
+            dy1 = 0
+        for i in range(0, len(args), 4):
+            dxa, dxb, dyb, dxc = args[i:i + 4]
+            self._curveTo(dxa, dy1, dxb, dyb, dxc, 0)
+            dy1 = 0
+
+    def _op_vhcurveto(self):
+        args = self._popall()
+        while args:
+            args = self._vcurveto(args)
+            if args:
+                args = self._hcurveto(args)
+
+    def _op_hvcurveto(self):
+        args = self._popall()
+        while args:
+            args = self._hcurveto(args)
+            if args:
+                args = self._vcurveto(args)
+
+    def _vcurveto(self, args):
+        dya, dxb, dyb, dxc = args[:4]
+        args = args[4:]
+        if len(args) == 1:
+            dyc = args[0]
+            args = []
+        else:
+            dyc = 0
+        self._curveTo(0, dya, dxb, dyb, dxc, dyc)
+        return args
+
+    def _hcurveto(self, args):
+        dxa, dxb, dyb, dyc = args[:4]
+        args = args[4:]
+        if len(args) == 1:
+            dxc = args[0]
+            args = []
+        else:
+            dxc = 0
+        self._curveTo(dxa, 0, dxb, dyb, dxc, dyc)
+        return args
+
+    def _op_hflex(self):
+        dx1, dx2, dy2, dx3, dx4, dx5, dx6 = self._popall()
+        self._curveTo(dx1, 0, dx2, dy2, dx3, 0)
+        self._curveTo(dx4, 0, dx5, -dy2, dx6, 0)
+
+    def _op_flex(self):
+        dx1, dy1, dx2, dy2, dx3, dy3, dx4, dy4, dx5, dy5, dx6, dy6, fd = self._popall()
+        self._curveTo(dx1, dy1, dx2, dy2, dx3, dy3)
+        self._curveTo(dx4, dy4, dx5, dy5, dx6, dy6)
+
+    def _op_hflex1(self):
+        dx1, dy1, dx2, dy2, dx3, dx4, dx5, dy5, dx6 = self._popall()
+        dy6 = -(dy1 + dy2 + dy5)
+        self._curveTo(dx1, dy1, dx2, dy2, dx3, 0)
+        self._curveTo(dx4, 0, dx5, dy5, dx6, dy6)
+
+    def _op_flex1(self):
+        dx1, dy1, dx2, dy2, dx3, dy3, dx4, dy4, dx5, dy5, d6 = self._popall()
+        dx = dx1 + dx2 + dx3 + dx4 + dx5
+        dy = dy1 + dy2 + dy3 + dy4 + dy5
+        if abs(dx) > abs(dy):
+            dx6 = d6
+            dy6 = -dy
+        else:
+            dx6 = -dx
+            dy6 = d6
+        self._curveTo(dx1, dy1, dx2, dy2, dx3, dy3)
+        self._curveTo(dx4, dy4, dx5, dy5, dx6, dy6)
+
+    def _op_callsubr(self):
+        index = self._stack.pop()
+        self._callSubr(self._localSubrs[index + self._localBias])
+
+    def _op_callgsubr(self):
+        index = self._stack.pop()
+        self._callSubr(self._globalSubrs[index + self._globalBias])
+
+
+def _guessSmooth(points):
+    # the smooth flags of the points of a closed contour,
+    # as set by GuessSmoothPointPen
+    nPoints = len(points)
+    smooth = [False] * nPoints
+    if nPoints > 1:
+        for i in range(-1, nPoints - 1):
+            x, y, segmentType = points[i]
+            if segmentType is None:
+                continue
+            prevX, prevY, prevType = points[i - 1]
+            nextX, nextY, nextType = points[i + 1]
+            if prevType is not None and nextType is not None:
+                continue
+            if (x, y) != (prevX, prevY) and (x, y) != (nextX, nextY):
+                a1 = math.atan2(y - prevY, x - prevX)
+                a2 = math.atan2(nextY - y, nextX - x)
+                if abs(a1 - a2) < _SMOOTH_ERROR:
+                    smooth[i] = True
+    return [
+        (x, y, segmentType, isSmooth)
+        for (x, y, segmentType), isSmooth in zip(points, smooth)
+    ]
@@ -1,19 +1,43 @@
+import hashlib
+import inspect
+import math
+import mmap
+import os
 import time
+from copy import deepcopy
 from fontTools.misc.fixedTools import floatToFixedToFloat
+from fontTools.misc.roundTools import otRound
 from fontTools.pens.boundsPen import ControlBoundsPen
 from fontTools.pens.hashPointPen import HashPointPen
+from fontTools.pens.pointPen import SegmentToPointPen
 from fontTools.pens.roundingPen import RoundingPointPen
-from fontTools.ttLib import TTFont, TTLibError
+from fontTools.ttLib import TTFont, TTLibError, newTable
+from fontTools.ttLib.sfnt import calcChecksum
 from fontTools.ttLib.tables._g_l_y_f import (
     OVERLAP_COMPOUND,
     ROUND_XY_TO_GRID,
     USE_MY_METRICS,
+    flagCubic,
+    flagOnCurve,
 )
 from fontTools.ttLib.tables._h_e_a_d import mac_epoch_diff
+from fontTools.ttLib.tables import otTables
 from functools import partial
+from extractor.charstrings import CharStringOutlineDecoder
 from extractor.exceptions import ExtractorError
+from extractor.stats import timePhase
 from extractor.stream import InstructionStream
-from extractor.tools import RelaxedInfo, copyAttr
+from extractor.tools import (
+    OutlineRecordingPointPen,
+    RelaxedInfo,
+    appendOutline,
+    clearInfo,
+    copyAttr,
+    drawOutline,
+    extractGlyphsInWorkers,
+    installGlyphReader,
+    subsetKerning,
+)
 
 
 TRUETYPE_INSTRUCTIONS_KEY = "public.truetype.instructions"
@@ -21,6 +45,8 @@ TRUETYPE_ROUND_KEY = "public.truetype.roundOffsetToGrid"
 TRUETYPE_METRICS_KEY = "public.truetype.useMyMetrics"
 TRUETYPE_OVERLAP_KEY = "public.truetype.overlap"
 OBJECT_LIBS_KEY = "public.objectLibs"
+TABLE_CHECKSUMS_KEY = "com.github.robotools.extractor.tableChecksums"
+TRUETYPE_BYTECODE_KEY = "com.github.robotools.extractor.truetypeBytecode"
 
 # ----------------
 # Public Functions
@@ -47,34 +73,595 @@ def extractFontFromOpenType(
     customFunctions=[],
     doInstructions=True,
     doAnchors=True,
+    lazy=False,
+    stats=None,
+    incremental=False,
+    glyphs=None,
+    unicodes=None,
+    glyphWorkers=None,
+    lazyGlyphs=False,
+    deferDisassembly=False,
 ):
-    source = TTFont(pathOrFile)
+    # pathOrFile may also be an already opened TTFont
+    if isinstance(pathOrFile, TTFont):
+        source = pathOrFile
+    else:
+        source = TTFont(pathOrFile, lazy=True if lazy else None)
+    # the anchors are read from the source, the subsetter drops the
+    # mark lookups of marks that are not in the subset with their bases.
+    context, glyphNames, layoutSource, layoutContext = prepareOpenTypeExtraction(
+        source, glyphs, unicodes, layout=doKerning or doFeatures, stats=stats
+    )
+    # in incremental mode, only extract the phases whose
+    # source tables changed since the last extraction
+    if incremental:
+        checksums = tableChecksums(source)
+        stale = _stalePhases(destination, checksums)
+        doInfo = doInfo and "info" in stale
+        doGlyphs = doGlyphs and "glyphs" in stale
+        doGlyphOrder = doGlyphOrder and "glyphOrder" in stale
+        doKerning = doKerning and "kerning" in stale
+        doFeatures = doFeatures and "features" in stale
+        doInstructions = doInstructions and "instructions" in stale
+        doAnchors = doAnchors and "anchors" in stale
+        for phase, enabled in (
+            ("info", doInfo),
+            ("glyphs", doGlyphs),
+            ("glyphOrder", doGlyphOrder),
+            ("kerning", doKerning),
+            ("instructions", doInstructions),
+            ("anchors", doAnchors),
+        ):
+            if enabled:
+                _clearPhase(destination, phase)
+    # in lazy mode, keep track of the pending phases so that
+    # each table can be dropped as soon as no phase needs it
+    phases = None
+    if lazy:
+        phases = [
+            phase
+            for phase, enabled in (
+                ("info", doInfo),
+                ("glyphs", doGlyphs),
+                ("glyphOrder", doGlyphOrder),
+                ("kerning", doKerning),
+                ("features", doFeatures),
+                ("instructions", doInstructions),
+                ("anchors", doAnchors),
+            )
+            if enabled
+        ]
     if doInfo:
-        extractOpenTypeInfo(source, destination)
+        with timePhase(stats, "info"):
+            extractOpenTypeInfo(source, destination)
+        _finishPhase(source, "info", phases, context)
+    # the outlines are kept for the glyph program hashes, unless
+    # the custom functions may change the glyphs in between
+    if doGlyphs and doInstructions and not customFunctions:
+        context.outlines = {}
     if doGlyphs:
-        extractOpenTypeGlyphs(source, destination)
-        extractUnicodeVariationSequences(source, destination)
+        with timePhase(stats, "glyphs"):
+            extractOpenTypeGlyphs(
+                source,
+                destination,
+                glyphNames,
+                workers=glyphWorkers,
+                lazy=lazyGlyphs,
+                context=context,
+            )
+        with timePhase(stats, "unicodeVariationSequences"):
+            extractUnicodeVariationSequences(
+                source, destination, glyphNames, context=context
+            )
+        if stats is not None:
+            if context.glyphReader is None:
+                stats.countGlyphs("glyphs", destination)
+            else:
+                # counting the contours would read the glyphs
+                stats.count("glyphs", "glyphs", len(destination))
+        _finishPhase(source, "glyphs", phases, context)
     if doGlyphOrder:
-        extractGlyphOrder(source, destination)
+        with timePhase(stats, "glyphOrder"):
+            extractGlyphOrder(source, destination, glyphNames)
+        _finishPhase(source, "glyphOrder", phases, context)
     if doKerning:
-        kerning, groups = extractOpenTypeKerning(source, destination)
-        destination.groups.update(groups)
-        destination.kerning.clear()
-        destination.kerning.update(kerning)
+        with timePhase(stats, "kerning"):
+            kerning, groups = extractOpenTypeKerning(
+                layoutSource, destination, glyphNames, context=layoutContext
+            )
+            destination.groups.update(groups)
+            destination.kerning.clear()
+            destination.kerning.update(kerning)
+        if stats is not None:
+            stats.count("kerning", "pairs", len(kerning))
+            stats.count("kerning", "groups", len(groups))
+        _finishPhase(source, "kerning", phases, context)
     if doFeatures:
-        features = extractOpenTypeFeatures(source)
-        destination.features.text = features
-    for function in customFunctions:
-        function(source, destination)
+        with timePhase(stats, "features"):
+            features = extractOpenTypeFeatures(layoutSource)
+            destination.features.text = features
+        _finishPhase(source, "features", phases, context)
+    with timePhase(stats, "customFunctions"):
+        callCustomFunctions(customFunctions, source, destination, context)
     if doInstructions:
-        extractInstructions(source, destination)
+        with timePhase(stats, "instructions"):
+            extractInstructions(
+                source,
+                destination,
+                stats=stats,
+                glyphNames=glyphNames,
+                context=context,
+                deferDisassembly=deferDisassembly,
+            )
+        _finishPhase(source, "instructions", phases, context)
+    context.outlines = None
     if doAnchors:
-        extractAnchors(source, destination)
-    source.close()
+        with timePhase(stats, "anchors"):
+            extractAnchors(source, destination, glyphNames, context=context)
+        if stats is not None and context.glyphReader is None:
+            stats.countAnchors("anchors", destination)
+        _finishPhase(source, "anchors", phases, context)
+    if incremental:
+        _recordTableChecksums(
+            destination,
+            checksums,
+            stale,
+            [
+                phase
+                for phase, enabled in (
+                    ("info", doInfo),
+                    ("glyphs", doGlyphs),
+                    ("glyphOrder", doGlyphOrder),
+                    ("kerning", doKerning),
+                    ("features", doFeatures),
+                    ("instructions", doInstructions),
+                    ("anchors", doAnchors),
+                )
+                if enabled
+            ],
+        )
+    if source is not pathOrFile:
+        source.close()
+
+
+# The source tables read by each extraction phase.
+PHASE_TABLES = dict(
+    info=("head", "name", "OS/2", "hhea", "vhea", "post", "CFF ", "gasp"),
+    glyphs=(
+        "cmap",
+        "maxp",
+        "loca",
+        "glyf",
+        "CFF ",
+        "CFF2",
+        "hhea",
+        "hmtx",
+        "vhea",
+        "vmtx",
+        "VORG",
+    ),
+    glyphOrder=("post", "CFF ", "cmap"),
+    kerning=("GPOS", "kern"),
+    features=("GDEF", "GSUB", "GPOS"),
+    instructions=("maxp", "cvt ", "fpgm", "prep", "loca", "glyf"),
+    anchors=("GPOS",),
+)
+
+# The source tables the glyph names are read from. All phases
+# refer to the glyphs by name, so a change to any of these makes
+# all phases stale, even when only a glyph was renamed.
+GLYPH_NAME_TABLES = ("post", "CFF ", "CFF2", "maxp")
+
+
+def _finishPhase(source, phase, phases, context=None):
+    """
+    Remove phase from the pending phases and drop the
+    decompiled tables it read that no pending phase needs.
+    The tables are only dropped from memory, so they can
+    still be read again from the file if something (for
+    example a custom function) asks for them later. The
+    structures context derived from them are forgotten too.
+    """
+    if phases is None:
+        return
+    phases.remove(phase)
+    needed = set()
+    for pending in phases:
+        needed.update(PHASE_TABLES[pending])
+    for tag in PHASE_TABLES[phase]:
+        if tag in needed or tag not in source.tables:
+            continue
+        if source.reader is not None and tag in source.reader:
+            del source.tables[tag]
+            if context is not None:
+                context.forgetTables([tag])
+
+
+# ------------------
+# Extraction Context
+# ------------------
+
+
+class ExtractionContext(object):
+
+    """
+    The structures derived from the tables of an OpenType source
+    that more than one extraction phase reads. Each one is built
+    the first time it is asked for and kept until one of the
+    tables it was derived from is dropped with forgetTables.
+
+    extractFontFromOpenType creates one for each source and passes
+    it to the extraction functions and to the custom functions that
+    take a context argument. When the glyphs are read lazily,
+    glyphReader is the OpenTypeGlyphReader that reads them.
+
+    assemblies holds the ttx assembly of the TrueType programs
+    disassembled so far by their bytecode, so that the programs
+    that are the same in the fpgm, prep and glyph programs are
+    only disassembled once. It doesn't depend on any table.
+
+    When outlines is a dict, extractOpenTypeGlyphs stores the
+    contours and components it adds to the destination glyphs of a
+    TrueType source in it by glyph name, so that the instructions
+    phase can hash them without drawing the glyphs again.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.glyphReader = None
+        self.assemblies = {}
+        self.outlines = None
+        self._values = {}
+        self._tables = {}
+
+    def _memoize(self, key, tags, build):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = build()
+        self._tables[key] = tags
+        return value
+
+    def forgetTables(self, tags):
+        """
+        Forget the structures derived from any of the tables in tags.
+        """
+        tags = set(tags)
+        for key, keyTags in list(self._tables.items()):
+            if tags.intersection(keyTags):
+                del self._values[key]
+                del self._tables[key]
+
+    @property
+    def bestCmap(self):
+        """
+        The best Unicode cmap subtable, as a dict of code point to glyph name.
+        """
+        return self._memoize(
+            "bestCmap", ("cmap",), lambda: self.source["cmap"].getBestCmap()
+        )
+
+    @property
+    def reversedCmap(self):
+        """
+        A dict of glyph name to the set of code points mapped to it.
+        """
+        return self._memoize(
+            "reversedCmap", ("cmap",), lambda: self.source["cmap"].buildReversed()
+        )
+
+    @property
+    def glyphSet(self):
+        """
+        The glyph set of the source.
+        """
+        return self._memoize(
+            "glyphSet",
+            ("loca", "glyf", "CFF ", "CFF2", "hmtx", "vmtx"),
+            self.source.getGlyphSet,
+        )
+
+    def scriptOrder(self, tableTag="GPOS"):
+        """
+        The script tags of the GSUB or GPOS table in the order
+        its lookups are read.
+        """
+        return self._memoize(
+            ("scriptOrder", tableTag),
+            (tableTag,),
+            lambda: _makeScriptOrder(self.source[tableTag].table),
+        )
+
+    def lookupIndexes(self, featureTags, tableTag="GPOS"):
+        """
+        A dict of script tag to the indexes of the lookups of the
+        GSUB or GPOS table referenced by the features in featureTags.
+        """
+        featureTags = tuple(sorted(set(featureTags)))
+        return self._memoize(
+            ("lookupIndexes", tableTag, featureTags),
+            (tableTag,),
+            lambda: _gatherLookupIndexes(self.source[tableTag].table, featureTags),
+        )
+
+
+def prepareOpenTypeExtraction(
+    source, glyphs=None, unicodes=None, layout=True, stats=None
+):
+    """
+    Set up the extraction of source, an OpenType font read from
+    any of the OpenType based formats. Returns the ExtractionContext
+    of source, the names of the glyphs in the subset of glyphs and
+    unicodes (None if both are None) and the font and context to
+    read the kerning and features from. For a subset with layout
+    True, that is a copy of the layout tables that only has the
+    subset, otherwise it is source and its context. The time spent
+    on the subset is added to stats.
+    """
+    # the structures derived from the tables that
+    # several phases read are only built once
+    context = ExtractionContext(source)
+    # restrict all phases to a subset of the glyphs
+    glyphNames = None
+    if glyphs is not None or unicodes is not None:
+        with timePhase(stats, "subset"):
+            glyphNames = openTypeGlyphSubset(source, glyphs, unicodes, context=context)
+    layoutSource = source
+    layoutContext = context
+    if glyphNames is not None and layout:
+        with timePhase(stats, "subset"):
+            layoutSource = subsetLayoutTables(source, glyphNames)
+        layoutContext = ExtractionContext(layoutSource)
+    return context, glyphNames, layoutSource, layoutContext
+
+
+def callCustomFunctions(customFunctions, source, destination, context):
+    """
+    Call the custom functions with source and destination, and
+    with context if they take a context argument.
+    """
+    for function in customFunctions:
+        if _takesContext(function):
+            function(source, destination, context=context)
+        else:
+            function(source, destination)
+
+
+def _takesContext(function):
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        return False
+    for parameter in parameters:
+        if parameter.kind == parameter.VAR_KEYWORD:
+            return True
+        if parameter.name == "context" and parameter.kind != parameter.POSITIONAL_ONLY:
+            return True
+    return False
+
+
+# -----------------------
+# Incremental Extraction
+# -----------------------
+
+
+def tableChecksums(source):
+    """
+    Return the checksums of the tables in the source file, from
+    the table directory where possible. As in the table directory,
+    the head checksum leaves out checkSumAdjustment, which changes
+    whenever any table changes.
+    """
+    reader = source.reader
+    if reader is None:
+        return {}
+    checksums = {}
+    for tag in reader.keys():
+        if tag == "head":
+            data = bytearray(reader[tag])
+            data[8:12] = bytes(4)
+            checksums[tag] = calcChecksum(bytes(data))
+            continue
+        checksum = getattr(reader.tables[tag], "checkSum", None)
+        if checksum is None:
+            # WOFF2 doesn't store the checksums
+            checksum = calcChecksum(reader[tag])
+        checksums[tag] = checksum
+    return checksums
 
 
-def extractGlyphOrder(source, destination):
+def _stalePhases(destination, checksums):
+    """
+    Return the phases that were never extracted into destination
+    or that read a table that changed since they were.
+    """
+    record = destination.lib.get(TABLE_CHECKSUMS_KEY)
+    if record is None:
+        return set(PHASE_TABLES)
+    previous = record["checksums"]
+    extracted = set(record["phases"])
+    if any(previous.get(tag) != checksums.get(tag) for tag in GLYPH_NAME_TABLES):
+        return set(PHASE_TABLES)
+    stale = set()
+    for phase, tags in PHASE_TABLES.items():
+        if phase not in extracted:
+            stale.add(phase)
+        elif any(previous.get(tag) != checksums.get(tag) for tag in tags):
+            stale.add(phase)
+    if "glyphs" in stale:
+        # the glyph programs and anchors are stored in the
+        # glyphs, they are gone when the glyphs are replaced
+        stale.update(("instructions", "anchors"))
+    return stale
+
+
+def _clearPhase(destination, phase):
+    """
+    Remove the data extracted by phase, so that it
+    doesn't linger when it is gone from the source.
+    """
+    if phase == "info":
+        clearInfo(destination.info)
+    elif phase == "glyphs":
+        for glyphName in list(destination.keys()):
+            del destination[glyphName]
+        destination.lib.pop("public.unicodeVariationSequences", None)
+    elif phase == "glyphOrder":
+        destination.lib.pop("public.glyphOrder", None)
+    elif phase == "kerning":
+        destination.groups.clear()
+        destination.kerning.clear()
+    elif phase == "instructions":
+        destination.lib.pop(TRUETYPE_INSTRUCTIONS_KEY, None)
+        destination.lib.pop(TRUETYPE_BYTECODE_KEY, None)
+        for glyph in destination:
+            glyph.lib.pop(TRUETYPE_INSTRUCTIONS_KEY, None)
+            glyph.lib.pop(TRUETYPE_BYTECODE_KEY, None)
+    elif phase == "anchors":
+        for glyph in destination:
+            glyph.clearAnchors()
+
+
+def _recordTableChecksums(destination, checksums, stale, extracted):
+    """
+    Store the table checksums and the phases that are up to
+    date with them in the destination lib.
+    """
+    record = destination.lib.get(TABLE_CHECKSUMS_KEY)
+    phases = set(extracted)
+    if record is not None:
+        phases.update(set(record["phases"]) - stale)
+    destination.lib[TABLE_CHECKSUMS_KEY] = dict(
+        checksums=checksums,
+        phases=sorted(phases),
+    )
+
+
+# -------------
+# Glyph Subsets
+# -------------
+
+
+def openTypeGlyphSubset(source, glyphs=None, unicodes=None, context=None):
+    """
+    Return the names of the glyphs given by glyphs, an iterable
+    of glyph names and glyph IDs, and the glyphs mapped to unicodes
+    in the cmap, including their Unicode variation sequences. The
+    components of composite glyphs are added to the subset.
+    Glyphs that are not in the font are ignored.
+    """
     glyphOrder = source.getGlyphOrder()
+    glyphNames = set()
+    if glyphs is not None:
+        existing = set(glyphOrder)
+        for glyph in glyphs:
+            if isinstance(glyph, int):
+                if 0 <= glyph < len(glyphOrder):
+                    glyphNames.add(glyphOrder[glyph])
+            elif glyph in existing:
+                glyphNames.add(glyph)
+    if unicodes is not None:
+        if not isinstance(unicodes, (set, frozenset, range)):
+            unicodes = set(unicodes)
+        if context is None:
+            context = ExtractionContext(source)
+        cmap = source["cmap"]
+        for charValue, glyphName in context.bestCmap.items():
+            if charValue in unicodes:
+                glyphNames.add(glyphName)
+        for subtable in cmap.tables:
+            if subtable.format == 14:
+                for uvsList in subtable.uvsDict.values():
+                    for charValue, glyphName in uvsList:
+                        if glyphName and charValue in unicodes:
+                            glyphNames.add(glyphName)
+    if "glyf" in source:
+        glyf = source["glyf"]
+        pending = list(glyphNames)
+        while pending:
+            glyph = glyf[pending.pop()]
+            if not glyph.isComposite():
+                continue
+            for component in glyph.components:
+                if component.glyphName not in glyphNames:
+                    glyphNames.add(component.glyphName)
+                    pending.append(component.glyphName)
+    return glyphNames
+
+
+def subsetLayoutTables(source, glyphNames):
+    """
+    Return a font with the layout tables of source subset to
+    glyphNames, for extracting the kerning and features of a
+    glyph subset. The tables are decompiled again from the
+    file, so the tables of source are left alone.
+    """
+    from fontTools import subset
+
+    font = copyTables(source, ("GDEF", "GSUB", "GPOS", "kern"))
+    options = subset.Options()
+    options.layout_features = ["*"]
+    options.layout_closure = False
+    options.legacy_kern = True
+    options.glyph_names = True
+    options.drop_tables = []
+    subsetter = subset.Subsetter(options)
+    subsetter.populate(glyphs=glyphNames)
+    subsetter.subset(font)
+    # when the subsetter numbers the classes again, it lists the
+    # glyphs of class 0 in the class definitions. fontFeatures takes
+    # class 0 to be the glyphs that are not listed, which would leave
+    # it empty, so drop the glyphs that are listed as class 0.
+    seen = set()
+    for tag in ("GSUB", "GPOS"):
+        if tag in font:
+            _dropClassZeroGlyphs(font[tag].table, seen)
+    return font
+
+
+def _dropClassZeroGlyphs(table, seen):
+    for entry in table.iterSubTables():
+        value = entry.value
+        # subtables may be shared
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+        if isinstance(value, otTables.ClassDef):
+            value.classDefs = {
+                glyphName: glyphClass
+                for glyphName, glyphClass in value.classDefs.items()
+                if glyphClass
+            }
+        else:
+            _dropClassZeroGlyphs(value, seen)
+
+
+def copyTables(source, tags):
+    """
+    Return a font with the glyph order of source and copies of
+    the tables of source listed in tags. The tables are decompiled
+    again from the file when possible, which is faster than copying
+    the decompiled tables.
+    """
+    font = TTFont()
+    font.setGlyphOrder(source.getGlyphOrder())
+    for tag in tags:
+        if tag not in source:
+            continue
+        if source.reader is not None and tag in source.reader:
+            table = newTable(tag)
+            table.decompile(source.reader[tag], font)
+        else:
+            table = deepcopy(source[tag])
+        font[tag] = table
+    return font
+
+
+def extractGlyphOrder(source, destination, glyphNames=None):
+    glyphOrder = source.getGlyphOrder()
+    if glyphNames is not None:
+        glyphOrder = [glyphName for glyphName in glyphOrder if glyphName in glyphNames]
     if len(glyphOrder):
         destination.lib["public.glyphOrder"] = glyphOrder
 
@@ -84,21 +671,29 @@ def extractGlyphOrder(source, destination):
 # ---------------------------
 
 
-def extractUnicodeVariationSequences(source, destination):
+def extractUnicodeVariationSequences(
+    source, destination, glyphNames=None, context=None
+):
     """
     Extract the Unicode Variation Sequences
     """
+    if context is None:
+        context = ExtractionContext(source)
     cmap = source.get("cmap")
-    mapping = cmap.getBestCmap()
+    mapping = context.bestCmap
     for subtable in cmap.tables:
         if subtable.format == 14:
-            destination.lib["public.unicodeVariationSequences"] = {
-                "%04X" % variationSelector: {
-                    "%04X" % charValue: glyphName if glyphName else mapping.get(charValue)
-                    for (charValue, glyphName) in uvsList
-                }
-                for variationSelector, uvsList in subtable.uvsDict.items()
-            }
+            sequences = {}
+            for variationSelector, uvsList in subtable.uvsDict.items():
+                sequence = {}
+                for charValue, glyphName in uvsList:
+                    if not glyphName:
+                        glyphName = mapping.get(charValue)
+                    if glyphNames is None or glyphName in glyphNames:
+                        sequence["%04X" % charValue] = glyphName
+                if sequence:
+                    sequences["%04X" % variationSelector] = sequence
+            destination.lib["public.unicodeVariationSequences"] = sequences
 
 
 # ------------
@@ -106,9 +701,25 @@ def extractUnicodeVariationSequences(source, destination):
 # ------------
 
 
-def extractInstructions(source, destination):
+def extractInstructions(
+    source,
+    destination,
+    stats=None,
+    glyphNames=None,
+    context=None,
+    deferDisassembly=False,
+):
+    """
+    Extract the TrueType instructions to the font and glyph libs.
+
+    With deferDisassembly=True, the programs are stored as bytecode
+    under TRUETYPE_BYTECODE_KEY in the font and glyph libs instead
+    of as assembly, until disassembleInstructions is called.
+    """
     if "glyf" not in source:
         return
+    if context is None:
+        context = ExtractionContext(source)
 
     lib = destination.lib[TRUETYPE_INSTRUCTIONS_KEY] = {
         "formatVersion": "1",
@@ -119,11 +730,26 @@ def extractInstructions(source, destination):
         "maxTwilightPoints": 0,
         "maxZones": 0,
     }
+    disassemble = not deferDisassembly
+    programLib = lib
+    if deferDisassembly:
+        programLib = destination.lib[TRUETYPE_BYTECODE_KEY] = {}
     extractControlValues(source, lib)
-    extractFontProgram(source, lib)
-    extractGlyphPrograms(source, destination)
+    extractFontProgram(
+        source, programLib, stats=stats, context=context, disassemble=disassemble
+    )
+    extractGlyphPrograms(
+        source,
+        destination,
+        stats=stats,
+        glyphNames=glyphNames,
+        context=context,
+        disassemble=disassemble,
+    )
     extractMaxpValues(source, lib)
-    extractPreProgram(source, lib)
+    extractPreProgram(
+        source, programLib, stats=stats, context=context, disassemble=disassemble
+    )
 
 
 def extractControlValues(source, lib):
@@ -136,43 +762,179 @@ def extractControlValues(source, lib):
     lib["controlValue"] = {str(i): val for i, val in enumerate(cvt.values)}
 
 
-def extractFontProgram(source, lib):
+def extractFontProgram(source, lib, stats=None, context=None, disassemble=True):
     """
-    Extract the TrueType font program to the font lib.
+    Extract the TrueType font program to the font lib, as
+    bytecode if disassemble is False.
     """
     if "fpgm" not in source:
         return
     fpgm = source["fpgm"].program
-    lib["fontProgram"] = _byteCodeToTtxAssembly(fpgm)
+    lib["fontProgram"] = _extractProgram(fpgm, stats, context, disassemble)
 
 
-def extractGlyphPrograms(source, destination):
+def extractGlyphPrograms(
+    source,
+    destination,
+    stats=None,
+    glyphNames=None,
+    context=None,
+    disassemble=True,
+):
     """
-    Extract the TrueType pre-program to the font lib.
+    Extract the TrueType glyph programs to the glyph libs, as
+    bytecode under TRUETYPE_BYTECODE_KEY if disassemble is False.
     """
     if "glyf" not in source:
         return
     glyph_table = source["glyf"]
-    for name in glyph_table.keys():
+    names = glyph_table.keys()
+    if glyphNames is not None:
+        names = [name for name in names if name in glyphNames]
+    # the hash data of the base glyphs of components
+    hashData = {}
+    for name in names:
         glyph = glyph_table[name]
-        dest_glyph = destination[name]
-        if glyph.isComposite():
-            # Extract composite flags
-            _extractCompositeFlags(glyph, dest_glyph)
-        if not hasattr(glyph, "program"):
+        if not glyph.isComposite() and not hasattr(glyph, "program"):
             continue
-
-        hash_pen = HashPointPen(dest_glyph.width, destination)
-        round_pen = RoundingPointPen(
-            hash_pen,
-            transformRoundFunc=partial(floatToFixedToFloat, precisionBits=14)
+        _updateGlyph(
+            destination,
+            name,
+            partial(
+                _extractGlyphProgram,
+                glyph=glyph,
+                destination=destination,
+                stats=stats,
+                context=context,
+                disassemble=disassemble,
+                hashData=hashData,
+            ),
+            context,
         )
-        dest_glyph.drawPoints(round_pen)
+
+
+def _extractGlyphProgram(
+    dest_glyph,
+    glyph,
+    destination,
+    stats=None,
+    context=None,
+    disassemble=True,
+    hashData=None,
+):
+    if glyph.isComposite():
+        # Extract composite flags
+        _extractCompositeFlags(glyph, dest_glyph)
+    if hasattr(glyph, "program"):
+        outlines = None if context is None else context.outlines
+        outlineHash = None
+        if outlines:
+            # hash the outlines the glyphs phase added
+            try:
+                outlineHash = _outlineHash(
+                    dest_glyph.name, dest_glyph.width, outlines, hashData
+                )
+            except KeyError:
+                pass
+        if outlineHash is None:
+            outlineHash = glyphProgramHash(dest_glyph, destination)
         lib = dest_glyph.lib[TRUETYPE_INSTRUCTIONS_KEY] = {
             "formatVersion": "1",
-            "id": hash_pen.hash,
+            "id": outlineHash,
         }
-        lib["assembly"] = _byteCodeToTtxAssembly(glyph.program)
+        program = _extractProgram(glyph.program, stats, context, disassemble)
+        if disassemble:
+            lib["assembly"] = program
+        else:
+            dest_glyph.lib[TRUETYPE_BYTECODE_KEY] = program
+
+
+def glyphProgramHash(glyph, font):
+    """
+    Return the hash of the outline of glyph that its TrueType
+    program is stored with, to tell if the outline was changed
+    after the program was written.
+    """
+    hash_pen = HashPointPen(glyph.width, font)
+    round_pen = RoundingPointPen(
+        hash_pen,
+        transformRoundFunc=partial(floatToFixedToFloat, precisionBits=14)
+    )
+    glyph.drawPoints(round_pen)
+    return hash_pen.hash
+
+
+def _outlineHash(glyphName, width, outlines, hashData):
+    """
+    Return the same hash as glyphProgramHash for the destination
+    glyph with the contours and components in outlines, without
+    drawing it. hashData keeps the data recorded for the base
+    glyphs of components. Raises KeyError if the outline of the
+    glyph or of one of its base glyphs is not in outlines.
+    """
+    data = "w%s%s" % (
+        round(width, 9),
+        _outlineHashData(glyphName, outlines, hashData, rounded=True),
+    )
+    if len(data) >= 128:
+        data = hashlib.sha512(data.encode("ascii")).hexdigest()
+    return data
+
+
+def _outlineHashData(glyphName, outlines, hashData, rounded=False):
+    # the data HashPointPen records for the outline. the glyph is
+    # drawn through a RoundingPointPen, its base glyphs are not.
+    if not rounded and glyphName in hashData:
+        return hashData[glyphName]
+    contours, components = outlines[glyphName]
+    data = []
+    for _, points in contours:
+        if rounded and not all(
+            type(x) is int and type(y) is int for x, y, _, _ in points
+        ):
+            points = [
+                (otRound(x), otRound(y), segmentType, smooth)
+                for x, y, segmentType, smooth in points
+            ]
+        # "%g" formats the numbers like the format spec of HashPointPen
+        data.append(
+            "".join(
+                [
+                    "%s%g%+g" % (_HASH_POINT_TYPES[segmentType], x, y)
+                    for x, y, segmentType, _ in points
+                ]
+            )
+        )
+        data.append("|")
+    for baseGlyph, transformation, _ in components:
+        if rounded:
+            # like floatToFixedToFloat with 14 precision bits
+            xx, xy, yx, yy, dx, dy = transformation
+            transformation = (
+                math.floor(xx * 16384 + 0.5) / 16384,
+                math.floor(xy * 16384 + 0.5) / 16384,
+                math.floor(yx * 16384 + 0.5) / 16384,
+                math.floor(yy * 16384 + 0.5) / 16384,
+                otRound(dx),
+                otRound(dy),
+            )
+        data.append("[")
+        data.append(_outlineHashData(baseGlyph, outlines, hashData))
+        data.append("(%s)]" % "".join([f"{t:+}" for t in transformation]))
+    data = "".join(data)
+    if not rounded:
+        hashData[glyphName] = data
+    return data
+
+
+# the first letter of the segment types that HashPointPen records
+_HASH_POINT_TYPES = {
+    None: "o",
+    "move": "m",
+    "line": "l",
+    "curve": "c",
+    "qcurve": "q",
+}
 
 
 def extractMaxpValues(source, lib):
@@ -194,19 +956,62 @@ def extractMaxpValues(source, lib):
     )
 
 
-def extractPreProgram(source, lib):
+def extractPreProgram(source, lib, stats=None, context=None, disassemble=True):
     """
-    Extract the TrueType pre-program to the font lib.
+    Extract the TrueType pre-program to the font lib, as
+    bytecode if disassemble is False.
     """
     if "prep" not in source:
         return
     prep = source["prep"].program
-    lib["controlValueProgram"] = _byteCodeToTtxAssembly(prep)
+    lib["controlValueProgram"] = _extractProgram(prep, stats, context, disassemble)
 
 
-def _byteCodeToTtxAssembly(program):
-    stream = InstructionStream(program_bytes=program.getBytecode())
-    return "\n%s\n" % str(stream)
+def disassembleInstructions(font, stats=None):
+    """
+    Replace the TrueType programs that were extracted as bytecode
+    with deferDisassembly=True in the font and glyph libs of font
+    with their assembly, as they are extracted by default. Call it
+    before the font is saved.
+    """
+    assemblies = {}
+    bytecode = font.lib.pop(TRUETYPE_BYTECODE_KEY, None)
+    if bytecode:
+        lib = font.lib[TRUETYPE_INSTRUCTIONS_KEY]
+        for key, program in bytecode.items():
+            lib[key] = _byteCodeToTtxAssembly(program, stats, assemblies)
+    for glyph in font:
+        if TRUETYPE_BYTECODE_KEY not in glyph.lib:
+            continue
+        program = glyph.lib.pop(TRUETYPE_BYTECODE_KEY)
+        glyph.lib[TRUETYPE_INSTRUCTIONS_KEY]["assembly"] = _byteCodeToTtxAssembly(
+            program, stats, assemblies
+        )
+
+
+def _extractProgram(program, stats=None, context=None, disassemble=True):
+    bytecode = program.getBytecode()
+    if stats is not None:
+        stats.count("instructions", "programs")
+        stats.count("instructions", "bytes", len(bytecode))
+    if not disassemble:
+        return bytecode
+    return _byteCodeToTtxAssembly(
+        bytecode, stats, None if context is None else context.assemblies
+    )
+
+
+def _byteCodeToTtxAssembly(bytecode, stats=None, assemblies=None):
+    # identical programs are only disassembled once
+    if assemblies is not None and bytecode in assemblies:
+        if stats is not None:
+            stats.count("instructions", "cacheHits")
+        return assemblies[bytecode]
+    stream = InstructionStream(program_bytes=bytecode)
+    assembly = "\n%s\n" % str(stream)
+    if assemblies is not None:
+        assemblies[bytecode] = assembly
+    return assembly
 
 
 def _extractCompositeFlags(glyph, dest_glyph):
@@ -551,46 +1356,417 @@ def formatDate(date):
 # --------
 
 
-def extractOpenTypeGlyphs(source, destination):
+def extractOpenTypeGlyphs(
+    source, destination, glyphNames=None, workers=None, lazy=False, context=None
+):
+    """
+    Extract the outlines and metrics of the glyphs in source.
+
+    With workers > 1, the glyph order is split into chunks that are
+    drawn in that many processes, each opening the font file source
+    was read from, and merged into destination in order. Changes made
+    to source after it was read are not seen by the workers. Sources
+    that were not read from a file and fonts with few glyphs are
+    always extracted in this process.
+
+    With lazy=True, only the glyph names are added to destination,
+    which must be an empty defcon or ufoLib2 font, and each glyph
+    is read from source when it is first accessed or the font is
+    saved. The reader is stored as the glyphReader of context.
+    Other destinations are extracted as usual.
+    """
+    if context is None:
+        context = ExtractionContext(source)
     # grab the cmap
     vmtx = source.get("vmtx")
     vorg = source.get("VORG")
     is_ttf = "glyf" in source
-    reversedMapping = source.get("cmap").buildReversed()
+    reversedMapping = context.reversedCmap
     # grab the glyphs
-    glyphSet = source.getGlyphSet()
-    for glyphName in glyphSet.keys():
+    glyphSet = context.glyphSet
+    names = glyphSet.keys()
+    if glyphNames is not None:
+        names = [glyphName for glyphName in names if glyphName in glyphNames]
+    if lazy:
+        if len(destination):
+            raise ExtractorError("Glyphs can only be read lazily into an empty font.")
+        reader = OpenTypeGlyphReader(source, names, context)
+        if installGlyphReader(destination, reader):
+            context.glyphReader = reader
+            return
+    if workers is not None and workers > 1:
+        path = _sourcePath(source)
+        if path is not None and extractGlyphsInWorkers(
+            destination,
+            list(names),
+            workers,
+            _drawGlyphChunk,
+            partial(_setGlyphAttributes, reversedMapping=reversedMapping),
+            initializer=_openGlyphWorkerSource,
+            initargs=(path,),
+        ):
+            return
+    decodeOutline = _outlineDecoder(source, glyphSet)
+    outlines = context.outlines if is_ttf else None
+    for glyphName in names:
         sourceGlyph = glyphSet[glyphName]
         # make the new glyph
         destination.newGlyph(glyphName)
         destinationGlyph = destination[glyphName]
-        # outlines
-        if is_ttf:
+        # outlines. like defcon does when it loads a glyph,
+        # don't send a notification for every point.
+        notifications = hasattr(destinationGlyph, "disableNotifications")
+        if notifications:
+            destinationGlyph.disableNotifications()
+        outline = decodeOutline(sourceGlyph)
+        if outline is not None:
+            appendOutline(destinationGlyph, *outline)
+            if outlines is not None:
+                outlines[glyphName] = outline
+        elif is_ttf:
             pen = destinationGlyph.getPointPen()
             sourceGlyph.drawPoints(pen)
         else:
             pen = destinationGlyph.getPen()
             sourceGlyph.draw(pen)
+        if notifications:
+            destinationGlyph.enableNotifications()
         # width
         destinationGlyph.width = sourceGlyph.width
         # unicodes
         destinationGlyph.unicodes = list(reversedMapping.get(glyphName, []))
         # height and vertical origin
-        if vmtx is not None and glyphName in vmtx.metrics:
-            destinationGlyph.height = vmtx[glyphName][0]
-            if vorg is not None:
-                if glyphName in vorg.VOriginRecords:
-                    destinationGlyph.verticalOrigin = vorg[glyphName]
-                else:
-                    destinationGlyph.verticalOrigin = vorg.defaultVertOriginY
+        height, verticalOrigin = _extractVerticalMetrics(
+            glyphName, sourceGlyph, glyphSet, vmtx, vorg, outline
+        )
+        if height is not None:
+            destinationGlyph.height = height
+        if verticalOrigin is not None:
+            destinationGlyph.verticalOrigin = verticalOrigin
+
+
+def _outlineDecoder(source, glyphSet):
+    """
+    Return a function that returns the outline of a glyph of
+    glyphSet as the contours and components recorded by an
+    OutlineRecordingPointPen, or None if the glyph has to be
+    drawn with a pen.
+    """
+    if "glyf" in source:
+        return partial(_glyfOutline, glyfTable=source["glyf"])
+    if "CFF " in source:
+        return partial(
+            _cffOutline,
+            charStrings=glyphSet.charStrings,
+            decoder=CharStringOutlineDecoder(),
+        )
+    return lambda sourceGlyph: None
+
+
+def _cffOutline(sourceGlyph, charStrings, decoder):
+    # the subroutines are decoded once by the decoder and
+    # shared by all glyphs
+    try:
+        return decoder.decode(charStrings[sourceGlyph.name])
+    except NotImplementedError:
+        return None
+
+
+def _glyfOutline(sourceGlyph, glyfTable):
+    """
+    Return the outline of a TrueType glyph as the contours and
+    components recorded by an OutlineRecordingPointPen, read
+    straight from the coordinates, end points and flags of the
+    glyf glyph instead of through its point pen. The points are
+    the same as drawn by sourceGlyph.drawPoints. Returns None for
+    cubic outlines, which are left to the pen.
+    """
+    glyph = glyfTable[sourceGlyph.name]
+    if glyph.isComposite():
+        components = []
+        for component in glyph.components:
+            baseGlyph, transformation = component.getComponentInfo()
+            components.append((baseGlyph, transformation, None))
+        return [], components
+    if glyph.numberOfContours <= 0:
+        return [], []
+    coordinates, endPts, flags = glyph.getCoordinates(glyfTable)
+    # the cubic flag is the high bit, so it's set in
+    # some flag if it's set in the largest one
+    if flags and max(flags) & flagCubic:
+        return None
+    # like GlyphCoordinates, use ints for the integer values
+    values = coordinates.array.tolist()
+    intValues = list(map(int, values))
+    if intValues == values:
+        values = intValues
+    else:
+        values = [int(v) if v.is_integer() else v for v in values]
+    xs = values[0::2]
+    ys = values[1::2]
+    # the outline is moved when the left side bearing
+    # in hmtx doesn't match the glyph bounds
+    offset = sourceGlyph.lsb - glyph.xMin
+    if offset:
+        xs = [x + offset for x in xs]
+    return glyfContours(xs, ys, endPts, flags), []
+
+
+def glyfContours(xs, ys, endPts, flags):
+    """
+    Return the contours of a quadratic TrueType outline as
+    recorded by an OutlineRecordingPointPen, from the point
+    coordinates, contour end points and point flags.
+    """
+    contours = []
+    start = 0
+    for end in endPts:
+        end += 1
+        # the first point continues the last segment
+        if flags[end - 1] & flagOnCurve:
+            segmentType = "line"
+        else:
+            segmentType = "qcurve"
+        points = []
+        for x, y, flag in zip(xs[start:end], ys[start:end], flags[start:end]):
+            if flag & flagOnCurve:
+                points.append((x, y, segmentType, False))
+                segmentType = "line"
             else:
-                tsb = vmtx[glyphName][1]
-                bounds_pen = ControlBoundsPen(glyphSet)
-                sourceGlyph.draw(bounds_pen)
-                if bounds_pen.bounds is None:
-                    continue
-                xMin, yMin, xMax, yMax = bounds_pen.bounds
-                destinationGlyph.verticalOrigin = tsb + yMax
+                points.append((x, y, None, False))
+                segmentType = "qcurve"
+        contours.append((None, points))
+        start = end
+    return contours
+
+
+def _extractVerticalMetrics(
+    glyphName, sourceGlyph, glyphSet, vmtx, vorg, outline=None
+):
+    # return the height and vertical origin of a glyph,
+    # None for the values that are not in the font
+    if vmtx is None or glyphName not in vmtx.metrics:
+        return None, None
+    height = vmtx[glyphName][0]
+    if vorg is not None:
+        if glyphName in vorg.VOriginRecords:
+            return height, vorg[glyphName]
+        return height, vorg.defaultVertOriginY
+    tsb = vmtx[glyphName][1]
+    yMax = _glyphYMax(sourceGlyph, glyphSet, outline)
+    if yMax is None:
+        return height, None
+    return height, tsb + yMax
+
+
+def _glyphYMax(sourceGlyph, glyphSet, outline=None):
+    """
+    Return the top of the control bounds of a glyph, or None if
+    it has no points. The bounds stored in glyf are used for
+    TrueType glyphs, and the points of outline, the contours and
+    components returned by the outline decoder, for CFF glyphs.
+    The glyph is only drawn again when neither is available.
+    """
+    glyfTable = getattr(glyphSet, "glyfTable", None)
+    if glyfTable is not None:
+        return getattr(glyfTable[sourceGlyph.name], "yMax", None)
+    if outline is not None:
+        contours, components = outline
+        # the bounds of components need their base glyphs
+        if not components:
+            return max(
+                (point[1] for _, points in contours for point in points),
+                default=None,
+            )
+    bounds_pen = ControlBoundsPen(glyphSet)
+    sourceGlyph.draw(bounds_pen)
+    if bounds_pen.bounds is None:
+        return None
+    xMin, yMin, xMax, yMax = bounds_pen.bounds
+    return yMax
+
+
+# -----------
+# Lazy glyphs
+# -----------
+
+
+class OpenTypeGlyphReader(object):
+
+    """
+    Reads the glyphs of an OpenType source into the glyphs of a
+    destination layer when they are first accessed. It stands in
+    for the glifLib.GlyphSet that defcon and ufoLib2 layers read
+    from a UFO lazily, and keeps the decompiled glyph tables it
+    reads from. Work that later phases do on a glyph that hasn't
+    been read yet is deferred until it is read.
+    """
+
+    def __init__(self, source, glyphNames, context):
+        self._glyphNames = list(glyphNames)
+        self._glyphNameSet = set(self._glyphNames)
+        self._pending = set(self._glyphNames)
+        self._deferred = {}
+        self._glyphSet = context.glyphSet
+        self._reversedMapping = context.reversedCmap
+        self._vmtx = source.get("vmtx")
+        self._vorg = source.get("VORG")
+        self._isTTF = "glyf" in source
+        self._decodeOutline = _outlineDecoder(source, self._glyphSet)
+        # defcon compares the glyphs in contents with the files on disk
+        self.contents = {}
+
+    def keys(self):
+        return list(self._glyphNames)
+
+    def __contains__(self, glyphName):
+        return glyphName in self._glyphNameSet
+
+    def __len__(self):
+        return len(self._glyphNames)
+
+    def isPending(self, glyphName):
+        """
+        Return True if glyphName hasn't been read yet.
+        """
+        return glyphName in self._pending
+
+    def defer(self, glyphName, function):
+        """
+        Call function with the destination glyph of
+        glyphName when the glyph is read.
+        """
+        self._deferred.setdefault(glyphName, []).append(function)
+
+    def readGlyph(self, glyphName, glyphObject=None, pointPen=None, formatVersions=None):
+        sourceGlyph = self._glyphSet[glyphName]
+        outline = self._decodeOutline(sourceGlyph)
+        if pointPen is not None:
+            if outline is not None:
+                drawOutline(*outline, pointPen)
+            elif self._isTTF:
+                sourceGlyph.drawPoints(pointPen)
+            else:
+                sourceGlyph.draw(SegmentToPointPen(pointPen))
+        if glyphObject is None:
+            return
+        glyphObject.width = sourceGlyph.width
+        glyphObject.unicodes = list(self._reversedMapping.get(glyphName, []))
+        height, verticalOrigin = _extractVerticalMetrics(
+            glyphName, sourceGlyph, self._glyphSet, self._vmtx, self._vorg, outline
+        )
+        if height is not None:
+            glyphObject.height = height
+        if verticalOrigin is not None:
+            glyphObject.verticalOrigin = verticalOrigin
+        self._pending.discard(glyphName)
+        for function in self._deferred.pop(glyphName, ()):
+            function(glyphObject)
+
+    def getUnicodes(self, glyphNames=None):
+        if glyphNames is None:
+            glyphNames = self._glyphNames
+        return {
+            glyphName: list(self._reversedMapping.get(glyphName, []))
+            for glyphName in glyphNames
+        }
+
+    def getComponentReferences(self, glyphNames=None):
+        if glyphNames is None:
+            glyphNames = self._glyphNames
+        references = {}
+        for glyphName in glyphNames:
+            pen = OutlineRecordingPointPen()
+            self.readGlyph(glyphName, pointPen=pen)
+            references[glyphName] = [
+                baseGlyph for baseGlyph, _, _ in pen.components
+            ]
+        return references
+
+    def getImageReferences(self, glyphNames=None):
+        return {}
+
+
+def _updateGlyph(destination, glyphName, function, context=None):
+    """
+    Call function with the destination glyph of glyphName, or
+    defer it until the glyph is read if it is read lazily.
+    """
+    reader = None if context is None else context.glyphReader
+    if reader is not None and reader.isPending(glyphName):
+        reader.defer(glyphName, function)
+    else:
+        function(destination[glyphName])
+
+
+# --------------
+# Sharded glyphs
+# --------------
+
+
+def _sourcePath(source):
+    # the path of the file a TTFont was read from, if any
+    reader = source.reader
+    if reader is None:
+        return None
+    path = getattr(reader.file, "name", None)
+    if not isinstance(path, str) or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _setGlyphAttributes(glyph, data, reversedMapping):
+    width, height, verticalOrigin = data
+    glyph.width = width
+    glyph.unicodes = list(reversedMapping.get(glyph.name, []))
+    if height is not None:
+        glyph.height = height
+    if verticalOrigin is not None:
+        glyph.verticalOrigin = verticalOrigin
+
+
+# the source opened by each worker process
+_glyphWorkerSource = None
+
+
+def _openGlyphWorkerSource(path):
+    global _glyphWorkerSource
+    f = open(path, "rb")
+    try:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        data = f
+    _glyphWorkerSource = TTFont(data, lazy=True)
+
+
+def _drawGlyphChunk(names):
+    # draw the glyphs into point tuples, which are
+    # quick to send back
+    source = _glyphWorkerSource
+    vmtx = source.get("vmtx")
+    vorg = source.get("VORG")
+    is_ttf = "glyf" in source
+    glyphSet = source.getGlyphSet()
+    decodeOutline = _outlineDecoder(source, glyphSet)
+    chunk = []
+    for glyphName in names:
+        sourceGlyph = glyphSet[glyphName]
+        outline = decodeOutline(sourceGlyph)
+        if outline is None:
+            pen = OutlineRecordingPointPen()
+            if is_ttf:
+                sourceGlyph.drawPoints(pen)
+            else:
+                # what the getPen method of the glyphs does
+                sourceGlyph.draw(SegmentToPointPen(pen))
+            outline = (pen.contours, pen.components)
+        height, verticalOrigin = _extractVerticalMetrics(
+            glyphName, sourceGlyph, glyphSet, vmtx, vorg, outline
+        )
+        chunk.append(
+            (glyphName, outline, (sourceGlyph.width, height, verticalOrigin))
+        )
+    return chunk
 
 
 # -------
@@ -598,29 +1774,35 @@ def extractOpenTypeGlyphs(source, destination):
 # -------
 
 
-def extractOpenTypeKerning(source, destination):
+def extractOpenTypeKerning(source, destination, glyphNames=None, context=None):
+    if context is None:
+        context = ExtractionContext(source)
     kerning = {}
     groups = {}
     if "GPOS" in source:
-        kerning, groups = _extractOpenTypeKerningFromGPOS(source)
+        kerning, groups = _extractOpenTypeKerningFromGPOS(source, context)
     if kerning == {} and "kern" in source:
         kerning = _extractOpenTypeKerningFromKern(source)
         groups = {}
+    if glyphNames is not None:
+        kerning, groups = subsetKerning(kerning, groups, glyphNames)
     for name, group in groups.items():
         groups[name] = list(sorted(group))
     return kerning, groups
 
 
-def _extractOpenTypeKerningFromGPOS(source):
+def _extractOpenTypeKerningFromGPOS(source, context):
     gpos = source["GPOS"].table
     # get an ordered list of scripts
-    scriptOrder = _makeScriptOrder(gpos)
+    scriptOrder = context.scriptOrder()
     # extract kerning and classes from each applicable lookup
     (
         kerningDictionaries,
         leftClassDictionaries,
         rightClassDictionaries,
-    ) = _gatherKerningDataFromLookups(gpos, scriptOrder)
+    ) = _gatherKerningDataFromLookups(
+        gpos, scriptOrder, context.lookupIndexes(["kern"])
+    )
     # merge all kerning pairs
     kerning = _mergeKerningDictionaries(kerningDictionaries)
     # get rid of groups that have only one member
@@ -672,12 +1854,11 @@ def _makeScriptOrder(gpos):
     return sorted(scripts)
 
 
-def _gatherKerningDataFromLookups(gpos, scriptOrder):
+def _gatherKerningDataFromLookups(gpos, scriptOrder, lookupIndexes):
     """
     Gather kerning and classes from the applicable lookups
     and return them in script order.
     """
-    lookupIndexes = _gatherLookupIndexes(gpos, ["kern"])
     seenLookups = set()
     kerningDictionaries = []
     leftClassDictionaries = []
@@ -715,11 +1896,11 @@ def _gatherLookupIndexes(gpos, featureTags):
         }
     """
     # gather the indexes of the desired features
-    desiredFeatureIndexes = [
+    desiredFeatureIndexes = {
         index
         for index, featureRecord in enumerate(gpos.FeatureList.FeatureRecord)
         if featureRecord.FeatureTag in featureTags
-    ]
+    }
     # find scripts and languages that have desired features
     scriptDesiredFeatureIndexes = {}
     for scriptRecord in gpos.ScriptList.ScriptRecord:
@@ -1110,32 +2291,51 @@ def extractOpenTypeFeatures(source):
 # -------
 
 
-def extractAnchors(source, destination):
+def extractAnchors(source, destination, glyphNames=None, context=None):
     if "GPOS" not in source:
         return
+    if context is None:
+        context = ExtractionContext(source)
 
     gpos = source["GPOS"].table
     # get an ordered list of scripts
-    scriptOrder = _makeScriptOrder(gpos)
+    scriptOrder = context.scriptOrder()
     # extract anchors from each applicable lookup
-    anchorGroups = _gatherAnchorDataFromLookups(gpos, scriptOrder)
+    anchorGroups = _gatherAnchorDataFromLookups(
+        gpos, scriptOrder, context.lookupIndexes(["mark", "mkmk"])
+    )
 
+    # gather the anchors of each glyph, so that
+    # glyphs that are read lazily are updated once
+    glyphAnchors = {}
     for groupIndex, groupAnchors in enumerate(anchorGroups):
         baseAnchors = groupAnchors["baseAnchors"]
         markAnchors = groupAnchors["markAnchors"]
 
         for base in baseAnchors.keys():
-            destination[base].appendAnchor({"x": baseAnchors[base]["x"], "y": baseAnchors[base]["y"], "name": f"Anchor-{groupIndex}"})
+            if glyphNames is not None and base not in glyphNames:
+                continue
+            glyphAnchors.setdefault(base, []).append({"x": baseAnchors[base]["x"], "y": baseAnchors[base]["y"], "name": f"Anchor-{groupIndex}"})
         for mark in markAnchors.keys():
-            destination[mark].appendAnchor({"x": markAnchors[mark]["x"], "y": markAnchors[mark]["y"], "name": f"_Anchor-{groupIndex}"})
+            if glyphNames is not None and mark not in glyphNames:
+                continue
+            glyphAnchors.setdefault(mark, []).append({"x": markAnchors[mark]["x"], "y": markAnchors[mark]["y"], "name": f"_Anchor-{groupIndex}"})
+    for glyphName, anchors in glyphAnchors.items():
+        _updateGlyph(
+            destination, glyphName, partial(_appendAnchors, anchors=anchors), context
+        )
+
+
+def _appendAnchors(glyph, anchors):
+    for anchor in anchors:
+        glyph.appendAnchor(anchor)
 
 
-def _gatherAnchorDataFromLookups(gpos, scriptOrder):
+def _gatherAnchorDataFromLookups(gpos, scriptOrder, lookupIndexes):
     """
     Gather anchor data from the applicable lookups
     and return them in script order.
     """
-    lookupIndexes = _gatherLookupIndexes(gpos, ["mark", "mkmk"])
 
     allAnchors = []
     seenLookups = set()
@@ -1,9 +1,12 @@
 from extractor.formats.opentype import (
+    callCustomFunctions,
     extractOpenTypeInfo,
     extractOpenTypeGlyphs,
     extractOpenTypeKerning,
     extractOpenTypeFeatures,
+    prepareOpenTypeExtraction,
 )
+from extractor.stats import timePhase
 
 
 def isTTX(pathOrFile):
@@ -26,23 +29,46 @@ def extractFontFromTTX(
     doKerning=True,
     doFeatures=True,
     customFunctions=[],
+    stats=None,
+    glyphs=None,
+    unicodes=None,
 ):
     from fontTools.ttLib import TTFont, TTLibError
 
-    source = TTFont()
-    source.importXML(pathOrFile)
+    # pathOrFile may also be an already imported TTFont
+    if isinstance(pathOrFile, TTFont):
+        source = pathOrFile
+    else:
+        with timePhase(stats, "parse"):
+            source = TTFont()
+            source.importXML(pathOrFile)
+    context, glyphNames, layoutSource, layoutContext = prepareOpenTypeExtraction(
+        source, glyphs, unicodes, layout=doKerning or doFeatures, stats=stats
+    )
     if doInfo:
-        extractOpenTypeInfo(source, destination)
+        with timePhase(stats, "info"):
+            extractOpenTypeInfo(source, destination)
     if doGlyphs:
-        extractOpenTypeGlyphs(source, destination)
+        with timePhase(stats, "glyphs"):
+            extractOpenTypeGlyphs(source, destination, glyphNames, context=context)
+        if stats is not None:
+            stats.countGlyphs("glyphs", destination)
     if doKerning:
-        kerning, groups = extractOpenTypeKerning(source, destination)
-        destination.groups.update(groups)
-        destination.kerning.clear()
-        destination.kerning.update(kerning)
+        with timePhase(stats, "kerning"):
+            kerning, groups = extractOpenTypeKerning(
+                layoutSource, destination, glyphNames, context=layoutContext
+            )
+            destination.groups.update(groups)
+            destination.kerning.clear()
+            destination.kerning.update(kerning)
+        if stats is not None:
+            stats.count("kerning", "pairs", len(kerning))
+            stats.count("kerning", "groups", len(groups))
     if doFeatures:
-        features = extractOpenTypeFeatures(source)
-        destination.features.text = features
-    for function in customFunctions:
-        function(source, destination)
-    source.close()
+        with timePhase(stats, "features"):
+            features = extractOpenTypeFeatures(layoutSource)
+            destination.features.text = features
+    with timePhase(stats, "customFunctions"):
+        callCustomFunctions(customFunctions, source, destination, context)
+    if source is not pathOrFile:
+        source.close()
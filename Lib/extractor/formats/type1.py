@@ -1,8 +1,18 @@
+import os
+import struct
 from fontTools.t1Lib import T1Font, T1Error
-from fontTools.agl import AGL2UV
+from fontTools.agl import AGL2UV, UV2AGL
+from fontTools.encodings.StandardEncoding import StandardEncoding
 from fontTools.misc.psLib import PSInterpreter
 from fontTools.misc.transform import Transform
-from extractor.tools import RelaxedInfo
+from fontTools.pens.pointPen import SegmentToPointPen
+from extractor.stats import timePhase
+from extractor.tools import (
+    OutlineRecordingPointPen,
+    RelaxedInfo,
+    extractGlyphsInWorkers,
+    groupKerningPairs,
+)
 
 # specification: http://partners.adobe.com/public/developer/en/font/T1_SPEC.PDF
 
@@ -28,23 +38,67 @@ def extractFontFromType1(
     doKerning=True,
     doFeatures=False,
     customFunctions=[],
+    stats=None,
+    glyphs=None,
+    unicodes=None,
+    glyphWorkers=None,
+    groupKerning=False,
 ):
-    source = T1Font(pathOrFile, encoding="macroman")
-    destination.lib["public.glyphOrder"] = _extractType1GlyphOrder(source)
+    # pathOrFile may also be an already read T1Font
+    if isinstance(pathOrFile, T1Font):
+        source = pathOrFile
+    else:
+        source = T1Font(pathOrFile, encoding="macroman")
+    # decrypt and parse the font once, T1Font keeps the
+    # parsed font for the glyph order, info and glyphs
+    with timePhase(stats, "parse"):
+        source.getGlyphSet()
+    # restrict all phases to a subset of the glyphs
+    glyphNames = None
+    if glyphs is not None or unicodes is not None:
+        with timePhase(stats, "subset"):
+            glyphNames = type1GlyphSubset(source, glyphs, unicodes)
+    with timePhase(stats, "glyphOrder"):
+        glyphOrder = _extractType1GlyphOrder(source)
+        if glyphNames is not None:
+            glyphOrder = [glyphName for glyphName in glyphOrder if glyphName in glyphNames]
+        destination.lib["public.glyphOrder"] = glyphOrder
+    # the kerning and some metrics are read from an AFM or
+    # PFM file with the same name next to the font file
+    metricsPath = None
+    if isinstance(pathOrFile, (str, os.PathLike)) and (doInfo or doKerning):
+        metricsPath = findType1MetricsFile(os.fspath(pathOrFile))
+    metrics = {}
+    pairs = []
+    if metricsPath is not None:
+        with timePhase(stats, "metricsFile"):
+            metrics, pairs = readType1MetricsFile(metricsPath, source)
     if doInfo:
-        extractType1Info(source, destination)
+        with timePhase(stats, "info"):
+            extractType1Info(source, destination)
+            _extractAFMMetrics(metrics, RelaxedInfo(destination.info))
     if doGlyphs:
-        extractType1Glyphs(source, destination)
-    if doKerning:
-        # kerning extraction is not supported yet.
-        # in theory, it could be retried from an AFM.
-        # we need to find the AFM naming rules so that we can sniff for the file.
-        pass
+        with timePhase(stats, "glyphs"):
+            extractType1Glyphs(source, destination, glyphNames, workers=glyphWorkers)
+        if stats is not None:
+            stats.countGlyphs("glyphs", destination)
+    if doKerning and pairs:
+        with timePhase(stats, "kerning"):
+            kerning, groups = extractType1Kerning(
+                source, pairs, glyphNames, groupKerning=groupKerning
+            )
+            destination.groups.update(groups)
+            destination.kerning.clear()
+            destination.kerning.update(kerning)
+        if stats is not None:
+            stats.count("kerning", "pairs", len(kerning))
+            stats.count("kerning", "groups", len(groups))
     if doFeatures:
         # Type1 does not have OpenType features
         pass
-    for function in customFunctions:
-        function(source, destination)
+    with timePhase(stats, "customFunctions"):
+        for function in customFunctions:
+            function(source, destination)
 
 
 def extractType1Info(source, destination):
@@ -142,22 +196,267 @@ def _extractType1Private(source, info):
 # --------
 
 
-def extractType1Glyphs(source, destination):
+def extractType1Glyphs(source, destination, glyphNames=None, workers=None):
+    """
+    Extract the outlines and widths of the glyphs in source.
+
+    With workers > 1, the charstrings are drawn in that many
+    processes, in chunks of at least tools.GLYPH_CHUNK_SIZE glyphs, and
+    added to destination in the same order as in this process.
+    """
     glyphSet = source.getGlyphSet()
-    for glyphName in sorted(glyphSet.keys()):
+    names = glyphSet.keys()
+    if glyphNames is not None:
+        names = [glyphName for glyphName in names if glyphName in glyphNames]
+    names = sorted(names)
+    # the charstrings are sent to the workers with their
+    # subroutines, so the workers don't parse the font again
+    if workers is not None and workers > 1 and extractGlyphsInWorkers(
+        destination,
+        [(glyphName, glyphSet[glyphName]) for glyphName in names],
+        workers,
+        _drawType1GlyphChunk,
+        _setType1GlyphAttributes,
+    ):
+        return
+    for glyphName in names:
         sourceGlyph = glyphSet[glyphName]
         # make the new glyph
         destination.newGlyph(glyphName)
         destinationGlyph = destination[glyphName]
-        # outlines
+        # outlines. like defcon does when it loads a glyph,
+        # don't send a notification for every point.
+        notifications = hasattr(destinationGlyph, "disableNotifications")
+        if notifications:
+            destinationGlyph.disableNotifications()
         pen = destinationGlyph.getPen()
         sourceGlyph.draw(pen)
+        if notifications:
+            destinationGlyph.enableNotifications()
         # width
         destinationGlyph.width = sourceGlyph.width
         # synthesize the unicode value
         destinationGlyph.unicode = AGL2UV.get(glyphName)
 
 
+def _setType1GlyphAttributes(glyph, width):
+    glyph.width = width
+    glyph.unicode = AGL2UV.get(glyph.name)
+
+
+def _drawType1GlyphChunk(chunk):
+    # draw the charstrings into point tuples, like
+    # the getPen method of the destination glyphs
+    drawn = []
+    for glyphName, charString in chunk:
+        pen = OutlineRecordingPointPen()
+        charString.draw(SegmentToPointPen(pen))
+        drawn.append((glyphName, (pen.contours, pen.components), charString.width))
+    return drawn
+
+
+# -------
+# Kerning
+# -------
+
+_METRICS_FILE_EXTENSIONS = (".afm", ".AFM", ".pfm", ".PFM")
+
+# the AFM header keys read into the font info
+_AFM_INFO_KEYS = dict(
+    CapHeight="capHeight",
+    XHeight="xHeight",
+    Ascender="ascender",
+    Descender="descender",
+)
+
+
+def findType1MetricsFile(path):
+    """
+    Return the path of the AFM or PFM file with the same name
+    as the Type 1 font at path, or None if there is none. An
+    AFM file is preferred.
+    """
+    base = os.path.splitext(path)[0]
+    for extension in _METRICS_FILE_EXTENSIONS:
+        metricsPath = base + extension
+        if os.path.isfile(metricsPath):
+            return metricsPath
+    return None
+
+
+def readType1MetricsFile(path, source):
+    """
+    Read the AFM or PFM file at path. Returns the AFM header
+    metrics as a dict and the kerning pairs as a list of
+    (first glyph, second glyph, value). The character codes
+    of a PFM file are mapped to the glyphs of source.
+    """
+    if path.lower().endswith(".pfm"):
+        charSet, codePairs = readPFMKerning(path)
+        glyphNames = _pfmGlyphNames(source, charSet)
+        pairs = [
+            (glyphNames[first], glyphNames[second], value)
+            for first, second, value in codePairs
+        ]
+        return {}, pairs
+    return readAFM(path)
+
+
+def readAFM(path):
+    """
+    Read the header metrics and the horizontal kerning pairs
+    of the AFM file at path, line by line. Returns the metrics
+    as a dict of AFM key to number and the pairs as a list of
+    (first glyph, second glyph, value). KPY pairs, which only
+    move the second glyph vertically, and the pairs for the
+    vertical writing direction are skipped.
+    """
+    metrics = {}
+    pairs = []
+    inHeader = True
+    inPairs = False
+    with open(path, "r", encoding="latin-1") as f:
+        for line in f:
+            fields = line.split()
+            if not fields:
+                continue
+            key = fields[0]
+            if inPairs:
+                if key == "KPX" or key == "KP":
+                    if len(fields) < 4:
+                        continue
+                    value = _number(fields[3])
+                    if value is not None:
+                        pairs.append((fields[1], fields[2], value))
+                elif key == "EndKernPairs":
+                    inPairs = False
+            elif inHeader:
+                if key in _AFM_INFO_KEYS and len(fields) > 1:
+                    value = _number(fields[1])
+                    if value is not None:
+                        metrics[key] = value
+                elif key == "StartCharMetrics":
+                    inHeader = False
+            if key == "StartKernPairs" or key == "StartKernPairs0":
+                inPairs = True
+    return metrics, pairs
+
+
+def _number(text):
+    try:
+        value = float(text)
+    except ValueError:
+        return None
+    if value.is_integer():
+        return int(value)
+    return value
+
+
+# the offsets of the fields read from a PFM file
+_PFM_CHARSET_OFFSET = 85
+_PFM_PAIR_KERN_TABLE_OFFSET = 131
+_PFM_ANSI_CHARSET = 0
+
+
+def readPFMKerning(path):
+    """
+    Read the kerning pairs of the PFM file at path. Returns the
+    character set of the file and the pairs as a list of (first
+    character code, second character code, value).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < _PFM_PAIR_KERN_TABLE_OFFSET + 4:
+        return _PFM_ANSI_CHARSET, []
+    charSet = data[_PFM_CHARSET_OFFSET]
+    (offset,) = struct.unpack_from("<I", data, _PFM_PAIR_KERN_TABLE_OFFSET)
+    if not offset or offset + 2 > len(data):
+        return charSet, []
+    (count,) = struct.unpack_from("<H", data, offset)
+    count = min(count, (len(data) - offset - 2) // 4)
+    pairs = list(struct.iter_unpack("<BBh", data[offset + 2:offset + 2 + count * 4]))
+    return charSet, pairs
+
+
+def _pfmGlyphNames(source, charSet):
+    # the glyph name of each character code. PFM files
+    # for text fonts use the Windows ANSI character set,
+    # the others the encoding of the font.
+    if charSet != _PFM_ANSI_CHARSET:
+        encoding = source["Encoding"]
+        if not isinstance(encoding, list):
+            encoding = StandardEncoding
+        return encoding
+    glyphNames = []
+    for code in range(256):
+        uv = ord(bytes([code]).decode("cp1252", errors="replace"))
+        glyphNames.append(UV2AGL.get(uv, "uni%04X" % uv))
+    return glyphNames
+
+
+def _extractAFMMetrics(metrics, info):
+    for key, attr in _AFM_INFO_KEYS.items():
+        if key in metrics:
+            setattr(info, attr, metrics[key])
+
+
+def extractType1Kerning(source, pairs, glyphNames=None, groupKerning=False):
+    """
+    Return the kerning and groups for the kerning pairs read from
+    a metrics file. Pairs of glyphs that are not in source, or not
+    in glyphNames, are left out. With groupKerning=True, the glyphs
+    that are kerned the same are put in public.kern1 and public.kern2
+    groups.
+    """
+    glyphSet = source.getGlyphSet()
+    kerning = {}
+    for first, second, value in pairs:
+        if first not in glyphSet or second not in glyphSet:
+            continue
+        if glyphNames is not None and (
+            first not in glyphNames or second not in glyphNames
+        ):
+            continue
+        kerning[first, second] = value
+    groups = {}
+    if groupKerning:
+        kerning, groups = groupKerningPairs(kerning)
+    return kerning, groups
+
+
+# -------------
+# Glyph subsets
+# -------------
+
+
+def type1GlyphSubset(source, glyphs=None, unicodes=None):
+    """
+    Return the names of the glyphs given by glyphs, an iterable of
+    glyph names and indexes in the glyph order, and the glyphs whose
+    names map to unicodes in the Adobe Glyph List. Glyphs that are
+    not in the font are ignored. Accented glyphs built with seac are
+    drawn decomposed, so no components need to be added.
+    """
+    glyphOrder = _extractType1GlyphOrder(source)
+    glyphNames = set()
+    if glyphs is not None:
+        existing = set(glyphOrder)
+        for glyph in glyphs:
+            if isinstance(glyph, int):
+                if 0 <= glyph < len(glyphOrder):
+                    glyphNames.add(glyphOrder[glyph])
+            elif glyph in existing:
+                glyphNames.add(glyph)
+    if unicodes is not None:
+        if not isinstance(unicodes, (set, frozenset, range)):
+            unicodes = set(unicodes)
+        for glyphName in glyphOrder:
+            unicode = AGL2UV.get(glyphName)
+            if unicode is not None and unicode in unicodes:
+                glyphNames.add(glyphName)
+    return glyphNames
+
+
 # -----------
 # Glyph order
 # -----------
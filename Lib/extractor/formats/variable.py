@@ -0,0 +1,774 @@
+from copy import copy, deepcopy
+from fontTools.designspaceLib import (
+    AxisDescriptor,
+    DesignSpaceDocument,
+    InstanceDescriptor,
+    SourceDescriptor,
+)
+from fontTools.misc.fixedTools import floatToFixedToFloat, otRound
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates, flagCubic
+from fontTools.varLib.iup import iup_delta
+from fontTools.varLib.models import normalizeValue, piecewiseLinearMap, supportScalar
+from extractor.cache import rehydrate, serialize
+from extractor.exceptions import ExtractorError
+from extractor.formats.opentype import (
+    TRUETYPE_INSTRUCTIONS_KEY,
+    ExtractionContext,
+    _extractCompositeFlags,
+    _outlineHash,
+    copyTables,
+    extractAnchors,
+    extractFontFromOpenType,
+    extractInstructions,
+    extractOpenTypeFeatures,
+    extractOpenTypeInfo,
+    extractOpenTypeGlyphs,
+    extractOpenTypeKerning,
+    extractUnicodeVariationSequences,
+    glyfContours,
+    glyphProgramHash,
+)
+from extractor.stats import timePhase
+from extractor.tools import appendOutline
+
+try:
+    import numpy
+
+    haveNumpy = True
+except ImportError:
+    haveNumpy = False
+
+
+# the tables the info is read from that an instance changes
+_INFO_VARIED_TABLES = ("OS/2", "hhea", "vhea", "post")
+_INFO_TABLES = ("head", "name", "CFF ", "gasp", "MVAR") + _INFO_VARIED_TABLES
+_LAYOUT_TABLES = ("GDEF", "GSUB", "GPOS", "kern")
+# the tables CFF2 glyphs are read from, in decompilation order
+_OUTLINE_TABLES = (
+    "head",
+    "maxp",
+    "hhea",
+    "vhea",
+    "hmtx",
+    "vmtx",
+    "HVAR",
+    "VVAR",
+    "VORG",
+    "CFF2",
+)
+
+# the tables with item variation stores whose regions are masters
+_VARIATION_STORE_TABLES = ("HVAR", "VVAR", "MVAR", "GDEF")
+
+
+# ----------------
+# Public Functions
+# ----------------
+
+
+def isVariableFont(source):
+    return "fvar" in source
+
+
+def extractVariableFont(
+    pathOrFile,
+    destinationFactory,
+    instances=False,
+    doGlyphs=True,
+    doInfo=True,
+    doKerning=True,
+    doFeatures=True,
+    doInstructions=True,
+    doAnchors=True,
+    stats=None,
+):
+    """
+    Extract the masters of the variable font at pathOrFile, or its
+    named instances with instances=True, each into a new font made
+    by calling destinationFactory without arguments. Returns a
+    designspace document with the axes of the font and a source
+    (or instance) for each location, whose font is the extracted
+    font. In master mode the named instances are added to the
+    document without fonts.
+
+    The data that doesn't vary is extracted once and copied into
+    each font. The outlines and metrics of TrueType glyphs are
+    computed for all locations at once by applying the gvar deltas
+    with NumPy, the result is the same as extracting the instances
+    made by fontTools.varLib.instancer. CFF2 glyphs are drawn at each
+    location. The kerning, features and anchors are only extracted
+    at each location when the layout tables vary.
+    """
+    if not haveNumpy:
+        raise ExtractorError("Extracting a variable font requires NumPy.")
+    if isinstance(pathOrFile, TTFont):
+        source = pathOrFile
+    else:
+        source = TTFont(pathOrFile)
+    try:
+        if not isVariableFont(source):
+            raise ExtractorError("The font is not a variable font.")
+        return _extractVariableFont(
+            source,
+            destinationFactory,
+            instances,
+            doGlyphs,
+            doInfo,
+            doKerning,
+            doFeatures,
+            doInstructions,
+            doAnchors,
+            stats,
+        )
+    finally:
+        if source is not pathOrFile:
+            source.close()
+
+
+def _extractVariableFont(
+    source,
+    destinationFactory,
+    instances,
+    doGlyphs,
+    doInfo,
+    doKerning,
+    doFeatures,
+    doInstructions,
+    doAnchors,
+    stats,
+):
+    with timePhase(stats, "locations"):
+        document = DesignSpaceDocument()
+        for axis in variableFontAxes(source):
+            document.addAxis(axis)
+        namedInstances = namedInstanceLocations(source)
+        if instances:
+            locations = namedInstances
+        else:
+            locations = masterLocations(source, namedInstances)
+    layoutVaries = (doKerning or doFeatures or doAnchors) and _layoutVaries(source)
+    # the data that is the same at all locations
+    # is extracted once and copied into each font
+    context = ExtractionContext(source)
+    template = destinationFactory()
+    extractFontFromOpenType(
+        source,
+        template,
+        doGlyphs=False,
+        doInfo=False,
+        doKerning=doKerning and not layoutVaries,
+        doFeatures=doFeatures and not layoutVaries,
+        doInstructions=False,
+        doAnchors=False,
+        stats=stats,
+    )
+    if doGlyphs:
+        with timePhase(stats, "unicodeVariationSequences"):
+            extractUnicodeVariationSequences(source, template, context=context)
+    templateData = serialize(template)
+    destinations = []
+    for location in locations:
+        destination = destinationFactory()
+        rehydrate(templateData, destination)
+        destinations.append(destination)
+    if doInfo:
+        with timePhase(stats, "info"):
+            for location, destination in zip(locations, destinations):
+                extractVariableFontInfo(source, destination, location)
+    if doGlyphs:
+        # the outlines are kept for the glyph program hashes
+        outlines = None
+        if doInstructions:
+            outlines = [{} for destination in destinations]
+        with timePhase(stats, "glyphs"):
+            extractVariableFontGlyphs(
+                source, destinations, locations, context, outlines=outlines
+            )
+        if stats is not None:
+            for destination in destinations:
+                stats.countGlyphs("glyphs", destination)
+        if doInstructions:
+            with timePhase(stats, "instructions"):
+                extractVariableFontInstructions(
+                    source, destinations, locations, stats=stats, outlines=outlines
+                )
+    if layoutVaries:
+        for location, destination in zip(locations, destinations):
+            with timePhase(stats, "layout"):
+                layoutSource = instanceLayoutTables(source, location["normalized"])
+            layoutContext = ExtractionContext(layoutSource)
+            if doKerning:
+                with timePhase(stats, "kerning"):
+                    kerning, groups = extractOpenTypeKerning(
+                        layoutSource, destination, context=layoutContext
+                    )
+                    destination.groups.update(groups)
+                    destination.kerning.update(kerning)
+            if doFeatures:
+                with timePhase(stats, "features"):
+                    destination.features.text = extractOpenTypeFeatures(layoutSource)
+            if doAnchors and doGlyphs:
+                with timePhase(stats, "anchors"):
+                    extractAnchors(layoutSource, destination, context=layoutContext)
+    elif doAnchors and doGlyphs:
+        with timePhase(stats, "anchors"):
+            for destination in destinations:
+                extractAnchors(source, destination, context=context)
+    if doGlyphs and doAnchors and stats is not None:
+        for destination in destinations:
+            stats.countAnchors("anchors", destination)
+    # describe the fonts
+    for location, destination in zip(locations, destinations):
+        if instances:
+            descriptor = InstanceDescriptor()
+        else:
+            descriptor = SourceDescriptor()
+        descriptor.name = location["name"]
+        descriptor.familyName = destination.info.familyName
+        descriptor.styleName = location["styleName"]
+        descriptor.location = location["location"]
+        descriptor.font = destination
+        if instances:
+            descriptor.postScriptFontName = location["postScriptFontName"]
+            document.addInstance(descriptor)
+        else:
+            document.addSource(descriptor)
+    if not instances:
+        familyName = template.info.familyName
+        if doInfo:
+            familyName = destinations[0].info.familyName
+        for location in namedInstances:
+            descriptor = InstanceDescriptor()
+            descriptor.name = location["name"]
+            descriptor.familyName = familyName
+            descriptor.styleName = location["styleName"]
+            descriptor.postScriptFontName = location["postScriptFontName"]
+            descriptor.location = location["location"]
+            document.addInstance(descriptor)
+    return document
+
+
+# ---------
+# Locations
+# ---------
+
+
+def variableFontAxes(source):
+    """
+    Return designspace axis descriptors for the axes of the
+    fvar table of source. The design coordinates are the
+    normalized coordinates after the avar mapping, scaled
+    back to the range of the axis.
+    """
+    name = source["name"]
+    avarSegments = source["avar"].segments if "avar" in source else {}
+    axes = []
+    for fvarAxis in source["fvar"].axes:
+        axis = AxisDescriptor()
+        axis.tag = fvarAxis.axisTag
+        axis.name = name.getDebugName(fvarAxis.axisNameID) or fvarAxis.axisTag
+        axis.minimum = fvarAxis.minValue
+        axis.default = fvarAxis.defaultValue
+        axis.maximum = fvarAxis.maxValue
+        axis.hidden = bool(fvarAxis.flags & 0x1)
+        triple = (fvarAxis.minValue, fvarAxis.defaultValue, fvarAxis.maxValue)
+        segments = avarSegments.get(fvarAxis.axisTag)
+        if segments and any(a != b for a, b in segments.items()):
+            axis.map = [
+                (_denormalizeValue(a, triple), _denormalizeValue(b, triple))
+                for a, b in sorted(segments.items())
+            ]
+        axes.append(axis)
+    return axes
+
+
+def namedInstanceLocations(source):
+    """
+    Return the locations of the named instances in the fvar
+    table of source. Each location is a dictionary with the name,
+    styleName and postScriptFontName of the instance, its design
+    location, its user location and its normalized location.
+    """
+    name = source["name"]
+    familyName = name.getDebugName(16) or name.getDebugName(1)
+    locations = []
+    for instance in source["fvar"].instances:
+        userLocation = dict(instance.coordinates)
+        normalized = normalizeLocation(source, userLocation)
+        styleName = name.getDebugName(instance.subfamilyNameID)
+        if styleName is None:
+            styleName = _locationName(userLocation)
+        postScriptFontName = None
+        if instance.postscriptNameID != 0xFFFF:
+            postScriptFontName = name.getDebugName(instance.postscriptNameID)
+        locations.append(
+            dict(
+                name="%s %s" % (familyName, styleName),
+                styleName=styleName,
+                postScriptFontName=postScriptFontName,
+                location=_designLocation(source, normalized),
+                userLocation=userLocation,
+                normalized=normalized,
+            )
+        )
+    return locations
+
+
+def masterLocations(source, namedInstances=None):
+    """
+    Return the locations of the masters of source in the same
+    form as namedInstanceLocations: the default location and the
+    peaks of the variation regions. Masters are named after the
+    named instance at the same location, if any.
+    """
+    if namedInstances is None:
+        namedInstances = namedInstanceLocations(source)
+    axisTags = [axis.axisTag for axis in source["fvar"].axes]
+    peaks = {tuple(0.0 for _ in axisTags)}
+    for axes in _variationRegions(source):
+        peak = {tag: peak for tag, (start, peak, end) in axes.items()}
+        peaks.add(tuple(peak.get(tag, 0.0) for tag in axisTags))
+    instanceNames = {
+        tuple(location["normalized"][tag] for tag in axisTags): location
+        for location in namedInstances
+    }
+    familyName = source["name"].getDebugName(16) or source["name"].getDebugName(1)
+    # the default first, then in the order of the axes
+    locations = []
+    for peak in sorted(peaks, key=lambda peak: (any(peak), peak)):
+        normalized = dict(zip(axisTags, peak))
+        designLocation = _designLocation(source, normalized)
+        userLocation = _userLocation(source, designLocation)
+        namedInstance = instanceNames.get(peak)
+        if namedInstance is not None:
+            styleName = namedInstance["styleName"]
+        else:
+            styleName = _locationName(userLocation)
+        locations.append(
+            dict(
+                name="master.%s" % _locationName(userLocation),
+                styleName=styleName,
+                postScriptFontName=None,
+                location=designLocation,
+                userLocation=userLocation,
+                normalized=normalized,
+            )
+        )
+    return locations
+
+
+def normalizeLocation(source, userLocation):
+    """
+    Normalize userLocation with the fvar and avar tables of source
+    and quantize it like fontTools.varLib.instancer does. Axes that
+    are not in userLocation are at their default.
+    """
+    location = {}
+    for axis in source["fvar"].axes:
+        triple = (axis.minValue, axis.defaultValue, axis.maxValue)
+        value = userLocation.get(axis.axisTag, axis.defaultValue)
+        location[axis.axisTag] = normalizeValue(value, triple)
+    if "avar" in source:
+        location = source["avar"].renormalizeLocation(location, source, dropZeroes=False)
+    return {tag: floatToFixedToFloat(value, 14) for tag, value in location.items()}
+
+
+def _variationRegions(source):
+    # the axes of the regions of the gvar deltas and of
+    # the item variation stores, as {tag: (start, peak, end)}
+    if "gvar" in source:
+        gvar = source["gvar"]
+        for glyphName in source.getGlyphOrder():
+            for variation in gvar.variations.get(glyphName, []):
+                yield variation.axes
+    varStores = []
+    for tag in _VARIATION_STORE_TABLES:
+        if tag in source:
+            varStores.append(getattr(source[tag].table, "VarStore", None))
+    if "CFF2" in source:
+        topDict = source["CFF2"].cff.topDictIndex[0]
+        varStore = getattr(topDict, "VarStore", None)
+        if varStore is not None:
+            varStores.append(varStore.otVarStore)
+    axisTags = [axis.axisTag for axis in source["fvar"].axes]
+    for varStore in varStores:
+        if varStore is None:
+            continue
+        for region in varStore.VarRegionList.Region:
+            axes = {}
+            for tag, record in zip(axisTags, region.VarRegionAxis):
+                if record.PeakCoord:
+                    axes[tag] = (record.StartCoord, record.PeakCoord, record.EndCoord)
+            yield axes
+
+
+def _denormalizeValue(value, triple):
+    minimum, default, maximum = triple
+    if value < 0:
+        return default + value * (default - minimum)
+    return default + value * (maximum - default)
+
+
+def _designLocation(source, normalized):
+    # use the nearest whole number that normalizes
+    # to the same value, normalized is quantized
+    location = {}
+    for axis in source["fvar"].axes:
+        triple = (axis.minValue, axis.defaultValue, axis.maxValue)
+        value = normalized.get(axis.axisTag, 0.0)
+        designValue = _denormalizeValue(value, triple)
+        rounded = otRound(designValue)
+        if floatToFixedToFloat(normalizeValue(rounded, triple), 14) == value:
+            designValue = rounded
+        location[axis.axisTag] = designValue
+    return _namedLocation(source, location)
+
+
+def _userLocation(source, designLocation):
+    userLocation = {}
+    for axis in variableFontAxes(source):
+        value = designLocation[axis.name]
+        if axis.map:
+            value = piecewiseLinearMap(value, {b: a for a, b in axis.map})
+        userLocation[axis.tag] = value
+    return userLocation
+
+
+def _namedLocation(source, location):
+    # designspace locations use the axis names
+    names = {axis.tag: axis.name for axis in variableFontAxes(source)}
+    return {names[tag]: value for tag, value in location.items()}
+
+
+def _locationName(userLocation):
+    return "_".join(
+        "%s%s" % (tag.strip(), ("%f" % value).rstrip("0").rstrip("."))
+        for tag, value in userLocation.items()
+    )
+
+
+# ----
+# Info
+# ----
+
+
+def extractVariableFontInfo(source, destination, location):
+    """
+    Extract the info of source at location, with the MVAR deltas
+    and the OS/2 weight and width classes and post italic angle
+    of the location applied like fontTools.varLib.instancer does.
+    The style name is set to the style name of the location.
+    """
+    from fontTools.varLib import set_default_weight_width_slant
+    from fontTools.varLib.instancer import setMvarDeltas, verticalMetricsKeptInSync
+    from fontTools.varLib.varStore import VarStoreInstancer
+
+    # the tables that vary are copied into a font of their own
+    infoSource = TTFont()
+    for tag in _INFO_TABLES:
+        if tag not in source:
+            continue
+        table = source[tag]
+        if tag in _INFO_VARIED_TABLES:
+            table = deepcopy(table)
+        infoSource[tag] = table
+    # the names that only fvar uses are left out, like
+    # the instancer does when it drops the fvar table
+    unused = _fvarNameIDs(source)
+    if "name" in source and unused:
+        infoSource["name"] = newTable("name")
+        infoSource["name"].names = [
+            record for record in source["name"].names if record.nameID not in unused
+        ]
+    if "MVAR" in source:
+        mvar = source["MVAR"].table
+        instancer = VarStoreInstancer(
+            mvar.VarStore, source["fvar"].axes, location["normalized"]
+        )
+        deltas = {record.VarIdx: instancer[record.VarIdx] for record in mvar.ValueRecord}
+        if "OS/2" in infoSource and "hhea" in infoSource:
+            with verticalMetricsKeptInSync(infoSource):
+                setMvarDeltas(infoSource, deltas)
+        else:
+            setMvarDeltas(infoSource, deltas)
+    set_default_weight_width_slant(infoSource, location["userLocation"])
+    extractOpenTypeInfo(infoSource, destination)
+    destination.info.styleName = location["styleName"]
+    destination.info.postscriptFontName = location["postScriptFontName"]
+
+
+def _fvarNameIDs(source):
+    # the name IDs above 255 that only the fvar table uses
+    nameIDs = set()
+    for axis in source["fvar"].axes:
+        nameIDs.add(axis.axisNameID)
+    for instance in source["fvar"].instances:
+        nameIDs.add(instance.subfamilyNameID)
+        nameIDs.add(instance.postscriptNameID)
+    if "STAT" in source:
+        stat = source["STAT"].table
+        if stat.DesignAxisRecord:
+            nameIDs.difference_update(
+                axis.AxisNameID for axis in stat.DesignAxisRecord.Axis
+            )
+        if stat.AxisValueArray:
+            nameIDs.difference_update(
+                value.ValueNameID for value in stat.AxisValueArray.AxisValue
+            )
+        nameIDs.discard(getattr(stat, "ElidedFallbackNameID", None))
+    return {nameID for nameID in nameIDs if 255 < nameID < 0xFFFF}
+
+
+# ------
+# Glyphs
+# ------
+
+
+def extractVariableFontGlyphs(
+    source, destinations, locations, context=None, outlines=None
+):
+    """
+    Extract the glyphs of source at each location into the
+    destination at the same index. When outlines is a list with a
+    dict for each destination, the outlines of the TrueType glyphs
+    are stored in them for the hashes of the glyph programs.
+    """
+    if context is None:
+        context = ExtractionContext(source)
+    if "glyf" in source:
+        _extractGlyfGlyphs(source, destinations, locations, context, outlines)
+        return
+    for destination, location in zip(destinations, locations):
+        outlineSource = instanceOutlineTables(source, location["normalized"])
+        extractOpenTypeGlyphs(
+            outlineSource, destination, context=ExtractionContext(outlineSource)
+        )
+
+
+def _extractGlyfGlyphs(source, destinations, locations, context, outlines=None):
+    glyf = source["glyf"]
+    gvar = source["gvar"].variations if "gvar" in source else {}
+    hMetrics = source["hmtx"].metrics
+    vMetrics = source["vmtx"].metrics if "vmtx" in source else None
+    reversedMapping = context.reversedCmap
+    normalized = [location["normalized"] for location in locations]
+    # the scalars of a region at all locations, most regions
+    # are shared by many glyphs
+    scalars = {}
+
+    def regionScalars(axes):
+        key = tuple(sorted(axes.items()))
+        if key not in scalars:
+            scalars[key] = numpy.array(
+                [supportScalar(location, axes) for location in normalized]
+            )
+        return scalars[key]
+
+    for glyphName in source.getGlyphOrder():
+        glyph = glyf[glyphName]
+        coordinates, controls = glyf._getCoordinatesAndControls(
+            glyphName, hMetrics, vMetrics
+        )
+        points = numpy.array(coordinates.array, dtype=float)
+        # the deltas of all variations at all locations at once,
+        # summed and rounded like the instancer does
+        rows = []
+        deltas = []
+        for variation in gvar.get(glyphName, []):
+            row = regionScalars(variation.axes)
+            if not row.any():
+                continue
+            delta = variation.coordinates
+            if None in delta:
+                delta = iup_delta(delta, coordinates, controls.endPts)
+            rows.append(row)
+            deltas.append(delta)
+        if deltas:
+            deltas = numpy.array(deltas, dtype=float).reshape(len(deltas), -1)
+            points = points + numpy.floor(numpy.array(rows).T @ deltas + 0.5)
+        else:
+            points = numpy.broadcast_to(points, (len(locations), len(points)))
+        points = points.astype(int).tolist()
+        isCubic = controls.flags is not None and max(controls.flags, default=0) & flagCubic
+        unicodes = list(reversedMapping.get(glyphName, []))
+        for index, (destination, values) in enumerate(zip(destinations, points)):
+            xs = values[0::2]
+            ys = values[1::2]
+            # the phantom points
+            left, right = xs[-4], xs[-3]
+            top, bottom = ys[-2], ys[-1]
+            del xs[-4:], ys[-4:]
+            destinationGlyph = destination.newGlyph(glyphName)
+            notifications = hasattr(destinationGlyph, "disableNotifications")
+            if notifications:
+                destinationGlyph.disableNotifications()
+            outline = ([], [])
+            if glyph.isComposite():
+                components = []
+                for component, x, y in zip(glyph.components, xs, ys):
+                    baseGlyph, transformation = component.getComponentInfo()
+                    if hasattr(component, "x"):
+                        transformation = tuple(transformation[:4]) + (x, y)
+                    components.append((baseGlyph, transformation, None))
+                outline = ([], components)
+                appendOutline(destinationGlyph, *outline)
+            elif isCubic:
+                # the cubic outlines are left to the pen
+                outline = None
+                instance = copy(glyph)
+                instance.coordinates = GlyphCoordinates(zip(xs, ys))
+                instance.drawPoints(destinationGlyph.getPointPen(), glyf, -left)
+            elif glyph.numberOfContours > 0:
+                # like the instancer and _glyfOutline, the outline is
+                # moved by the left side bearing of the phantom points
+                if left:
+                    xs = [x - left for x in xs]
+                outline = (glyfContours(xs, ys, controls.endPts, controls.flags), [])
+                appendOutline(destinationGlyph, *outline)
+            if outlines is not None and outline is not None:
+                outlines[index][glyphName] = outline
+            if notifications:
+                destinationGlyph.enableNotifications()
+            destinationGlyph.width = max(0, right - left)
+            destinationGlyph.unicodes = list(unicodes)
+            if vMetrics is not None and glyphName in vMetrics:
+                destinationGlyph.height = max(0, top - bottom)
+                if glyph.numberOfContours:
+                    destinationGlyph.verticalOrigin = top
+
+
+def instanceOutlineTables(source, normalized):
+    """
+    Return a font with copies of the CFF2 table and the metrics
+    tables of source instanced at the normalized location with
+    fontTools.varLib.instancer, and the cmap of source.
+    """
+    from fontTools.varLib.instancer import (
+        instantiateCFF2,
+        instantiateHVAR,
+        instantiateVVAR,
+    )
+
+    font = copyTables(source, _OUTLINE_TABLES)
+    font["fvar"] = source["fvar"]
+    if "cmap" in source:
+        font["cmap"] = source["cmap"]
+    limits = _axisLimits(source, normalized)
+    if "CFF2" in font:
+        instantiateCFF2(font, limits)
+    if "HVAR" in font:
+        instantiateHVAR(font, limits)
+    if "VVAR" in font:
+        instantiateVVAR(font, limits)
+    return font
+
+
+def _axisLimits(source, normalized):
+    from fontTools.varLib.instancer import NormalizedAxisLimits
+
+    return NormalizedAxisLimits(
+        {axis.axisTag: normalized.get(axis.axisTag, 0) for axis in source["fvar"].axes}
+    )
+
+
+# ------------
+# Instructions
+# ------------
+
+
+def extractVariableFontInstructions(
+    source, destinations, locations, stats=None, outlines=None
+):
+    """
+    Extract the TrueType instructions into the destinations. The
+    programs are the same at all locations, so they are only
+    disassembled for the first destination, only the hashes of
+    the outlines and the control values with the cvar deltas
+    applied differ. outlines are the outlines stored by
+    extractVariableFontGlyphs, the glyphs are hashed from them
+    instead of drawn when possible.
+    """
+    if "glyf" not in source or not destinations:
+        return
+    if outlines is None:
+        outlines = [{} for destination in destinations]
+    first = destinations[0]
+    context = ExtractionContext(source)
+    context.outlines = outlines[0]
+    extractInstructions(source, first, stats=stats, context=context)
+    glyf = source["glyf"]
+    lib = first.lib[TRUETYPE_INSTRUCTIONS_KEY]
+    for destination, destinationOutlines in zip(destinations[1:], outlines[1:]):
+        destination.lib[TRUETYPE_INSTRUCTIONS_KEY] = deepcopy(lib)
+        # the hash data of the base glyphs of components
+        hashData = {}
+        for glyphName in glyf.keys():
+            glyph = glyf[glyphName]
+            if not glyph.isComposite() and not hasattr(glyph, "program"):
+                continue
+            destinationGlyph = destination[glyphName]
+            if glyph.isComposite():
+                _extractCompositeFlags(glyph, destinationGlyph)
+            if hasattr(glyph, "program"):
+                try:
+                    outlineHash = _outlineHash(
+                        glyphName, destinationGlyph.width, destinationOutlines, hashData
+                    )
+                except KeyError:
+                    outlineHash = glyphProgramHash(destinationGlyph, destination)
+                destinationGlyph.lib[TRUETYPE_INSTRUCTIONS_KEY] = {
+                    "formatVersion": "1",
+                    "id": outlineHash,
+                    "assembly": first[glyphName].lib[TRUETYPE_INSTRUCTIONS_KEY][
+                        "assembly"
+                    ],
+                }
+    if "cvar" in source and "cvt " in source:
+        values = numpy.array(source["cvt "].values, dtype=float)
+        for destination, location in zip(destinations, locations):
+            deltas = numpy.zeros(len(values))
+            for variation in source["cvar"].variations:
+                scalar = supportScalar(location["normalized"], variation.axes)
+                if not scalar:
+                    continue
+                deltas += scalar * numpy.array(
+                    [0 if delta is None else delta for delta in variation.coordinates]
+                )
+            cvt = (values + numpy.floor(deltas + 0.5)).astype(int).tolist()
+            destination.lib[TRUETYPE_INSTRUCTIONS_KEY]["controlValue"] = {
+                str(i): value for i, value in enumerate(cvt)
+            }
+
+
+# ------
+# Layout
+# ------
+
+
+def _layoutVaries(source):
+    if "GDEF" in source and getattr(source["GDEF"].table, "VarStore", None):
+        return True
+    for tag in ("GSUB", "GPOS"):
+        if tag in source and getattr(source[tag].table, "FeatureVariations", None):
+            return True
+    return False
+
+
+def instanceLayoutTables(source, normalized):
+    """
+    Return a font with copies of the layout tables of source
+    instanced at the normalized location with
+    fontTools.varLib.instancer.
+    """
+    from fontTools.varLib.instancer import (
+        instantiateFeatureVariations,
+        instantiateOTL,
+    )
+
+    font = copyTables(source, _LAYOUT_TABLES)
+    font["fvar"] = source["fvar"]
+    limits = _axisLimits(source, normalized)
+    instantiateOTL(font, limits)
+    instantiateFeatureVariations(font, limits)
+    return font
@@ -3,6 +3,7 @@ import shutil
 import tempfile
 
 from fontTools.ufoLib import UFOReader
+from extractor.stats import timePhase
 
 try:
     from vfbLib.vfb.vfb import Vfb
@@ -40,55 +41,70 @@ def extractFontFromVFB(
     doFeatures=True,
     doLib=True,
     customFunctions=[],
+    stats=None,
 ):
     extract_minimal = True
-    vfb = Vfb(
-        pathOrFile,
-        minimal=extract_minimal,
-        drop_keys=("Encoding", "Encoding Mac"),
-        unicode_strings=True,
-    )
-    vfb.decompile()
-    builder = VfbToUfoBuilder(
-        vfb,
-        minimal=extract_minimal,
-        base64=True,
-        pshints=False,
-        add_kerning_groups=False,
-    )
-    masters = builder.get_ufo_masters(silent=True)
-    ufoLib_source = masters[0]
-    ufoPath = tempfile.mkdtemp(suffix=".ufo")
-    ufoLib_source.save(ufoPath, overwrite=True)
+    with timePhase(stats, "parse"):
+        vfb = Vfb(
+            pathOrFile,
+            minimal=extract_minimal,
+            drop_keys=("Encoding", "Encoding Mac"),
+            unicode_strings=True,
+        )
+        vfb.decompile()
+        builder = VfbToUfoBuilder(
+            vfb,
+            minimal=extract_minimal,
+            base64=True,
+            pshints=False,
+            add_kerning_groups=False,
+        )
+        masters = builder.get_ufo_masters(silent=True)
+        ufoLib_source = masters[0]
+        ufoPath = tempfile.mkdtemp(suffix=".ufo")
+        ufoLib_source.save(ufoPath, overwrite=True)
     try:
         # We now use vfbLib instead of vfb2ufo, which wrote ufo2, and had no update
         # since 2015, so the extracted UFOs were pretty basic.
         # More data could be extracted now with vfbLib if needed.
         source = UFOReader(ufoPath, validate=True)
         if doInfo:
-            source.readInfo(destination.info)
+            with timePhase(stats, "info"):
+                source.readInfo(destination.info)
         if doKerning:
-            kerning = source.readKerning()
-            destination.kerning.update(kerning)
+            with timePhase(stats, "kerning"):
+                kerning = source.readKerning()
+                destination.kerning.update(kerning)
+            if stats is not None:
+                stats.count("kerning", "pairs", len(kerning))
         if doGroups:
-            groups = source.readGroups()
-            destination.groups.update(groups)
+            with timePhase(stats, "groups"):
+                groups = source.readGroups()
+                destination.groups.update(groups)
+            if stats is not None:
+                stats.count("groups", "groups", len(groups))
         if doFeatures:
-            features = source.readFeatures()
-            destination.features.text = features
+            with timePhase(stats, "features"):
+                features = source.readFeatures()
+                destination.features.text = features
         if doLib:
-            lib = source.readLib()
-            destination.lib.update(lib)
+            with timePhase(stats, "lib"):
+                lib = source.readLib()
+                destination.lib.update(lib)
         if doGlyphs:
-            glyphSet = source.getGlyphSet()
-            for glyphName in glyphSet.keys():
-                destination.newGlyph(glyphName)
-                glyph = destination[glyphName]
-                pointPen = glyph.getPointPen()
-                glyphSet.readGlyph(
-                    glyphName=glyphName, glyphObject=glyph, pointPen=pointPen
-                )
-        for function in customFunctions:
-            function(source, destination)
+            with timePhase(stats, "glyphs"):
+                glyphSet = source.getGlyphSet()
+                for glyphName in glyphSet.keys():
+                    destination.newGlyph(glyphName)
+                    glyph = destination[glyphName]
+                    pointPen = glyph.getPointPen()
+                    glyphSet.readGlyph(
+                        glyphName=glyphName, glyphObject=glyph, pointPen=pointPen
+                    )
+            if stats is not None:
+                stats.countGlyphs("glyphs", destination)
+        with timePhase(stats, "customFunctions"):
+            for function in customFunctions:
+                function(source, destination)
     finally:
         shutil.rmtree(ufoPath)
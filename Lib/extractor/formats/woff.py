@@ -1,11 +1,14 @@
 from xml.sax.saxutils import quoteattr
 from fontTools.ttLib import TTFont, TTLibError
 from extractor.tools import RelaxedInfo
+from extractor.stats import timePhase
 from extractor.formats.opentype import (
+    callCustomFunctions,
     extractOpenTypeInfo,
     extractOpenTypeGlyphs,
     extractOpenTypeKerning,
     extractOpenTypeFeatures,
+    prepareOpenTypeExtraction,
 )
 
 try:
@@ -37,23 +40,45 @@ def extractFontFromWOFF(
     doKerning=True,
     doFeatures=True,
     customFunctions=[],
+    stats=None,
+    glyphs=None,
+    unicodes=None,
 ):
-    source = TTFont(pathOrFile)
+    # pathOrFile may also be an already opened TTFont
+    if isinstance(pathOrFile, TTFont):
+        source = pathOrFile
+    else:
+        source = TTFont(pathOrFile)
+    context, glyphNames, layoutSource, layoutContext = prepareOpenTypeExtraction(
+        source, glyphs, unicodes, layout=doKerning or doFeatures, stats=stats
+    )
     if doInfo:
-        extractWOFFInfo(source, destination)
+        with timePhase(stats, "info"):
+            extractWOFFInfo(source, destination)
     if doGlyphs:
-        extractWOFFGlyphs(source, destination)
+        with timePhase(stats, "glyphs"):
+            extractWOFFGlyphs(source, destination, glyphNames, context=context)
+        if stats is not None:
+            stats.countGlyphs("glyphs", destination)
     if doKerning:
-        kerning, groups = extractWOFFKerning(source, destination)
-        destination.groups.update(groups)
-        destination.kerning.clear()
-        destination.kerning.update(kerning)
+        with timePhase(stats, "kerning"):
+            kerning, groups = extractWOFFKerning(
+                layoutSource, destination, glyphNames, context=layoutContext
+            )
+            destination.groups.update(groups)
+            destination.kerning.clear()
+            destination.kerning.update(kerning)
+        if stats is not None:
+            stats.count("kerning", "pairs", len(kerning))
+            stats.count("kerning", "groups", len(groups))
     if doFeatures:
-        features = extractOpenTypeFeatures(source)
-        destination.features.text = features
-    for function in customFunctions:
-        function(source, destination)
-    source.close()
+        with timePhase(stats, "features"):
+            features = extractOpenTypeFeatures(layoutSource)
+            destination.features.text = features
+    with timePhase(stats, "customFunctions"):
+        callCustomFunctions(customFunctions, source, destination, context)
+    if source is not pathOrFile:
+        source.close()
 
 
 # ----------------
@@ -69,12 +94,12 @@ def extractWOFFInfo(source, destination):
     return extractOpenTypeInfo(source, destination)
 
 
-def extractWOFFGlyphs(source, destination):
-    return extractOpenTypeGlyphs(source, destination)
+def extractWOFFGlyphs(source, destination, glyphNames=None, context=None):
+    return extractOpenTypeGlyphs(source, destination, glyphNames, context=context)
 
 
-def extractWOFFKerning(source, destination):
-    return extractOpenTypeKerning(source, destination)
+def extractWOFFKerning(source, destination, glyphNames=None, context=None):
+    return extractOpenTypeKerning(source, destination, glyphNames, context=context)
 
 
 # --------
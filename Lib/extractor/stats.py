@@ -0,0 +1,81 @@
+import time
+from contextlib import contextmanager, nullcontext
+
+
+class ExtractionStats(object):
+
+    """
+    Wall time, process CPU time and counters for each extraction
+    phase. Pass an instance as `stats` to extractUFO to collect them.
+
+    The collected data is a dictionary of this structure:
+        {
+            "glyphs": {
+                "wallTime": 0.25,
+                "cpuTime": 0.24,
+                "counts": {"glyphs": 1000, "contours": 1500}
+            }
+        }
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    def _phase(self, phase):
+        if phase not in self.phases:
+            self.phases[phase] = dict(wallTime=0.0, cpuTime=0.0, counts={})
+        return self.phases[phase]
+
+    @contextmanager
+    def timePhase(self, phase):
+        """
+        Add the time spent in the with block to the phase.
+        """
+        record = self._phase(phase)
+        wallTime = time.perf_counter()
+        cpuTime = time.process_time()
+        try:
+            yield
+        finally:
+            record["wallTime"] += time.perf_counter() - wallTime
+            record["cpuTime"] += time.process_time() - cpuTime
+
+    def count(self, phase, counter, value=1):
+        """
+        Add value to a counter of the phase.
+        """
+        counts = self._phase(phase)["counts"]
+        counts[counter] = counts.get(counter, 0) + value
+
+    def countGlyphs(self, phase, destination):
+        """
+        Count the glyphs, contours and components in the destination.
+        """
+        contours = components = 0
+        for glyph in destination:
+            contours += len(glyph)
+            components += len(glyph.components)
+        self.count(phase, "glyphs", len(destination))
+        self.count(phase, "contours", contours)
+        self.count(phase, "components", components)
+
+    def countAnchors(self, phase, destination):
+        """
+        Count the anchors in the destination glyphs.
+        """
+        self.count(phase, "anchors", sum(len(glyph.anchors) for glyph in destination))
+
+    def asDict(self):
+        return {
+            phase: dict(record, counts=dict(record["counts"]))
+            for phase, record in self.phases.items()
+        }
+
+
+def timePhase(stats, phase):
+    """
+    Time the phase if stats are being collected.
+    """
+    if stats is None:
+        return nullcontext()
+    return stats.timePhase(phase)
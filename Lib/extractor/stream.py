@@ -2,6 +2,54 @@
 from fontTools.misc.textTools import num2binary
 from fontTools.ttLib.tables.ttProgram import streamOpcodeDict, opcodeDict
 from io import BytesIO
+from struct import unpack_from
+
+
+class IllegalOpcodeError(KeyError):
+    """
+    An opcode that is not defined in the instruction stream.
+    """
+
+    def __str__(self) -> str:
+        return str(self.args[0]) if self.args else ""
+
+
+class Instruction(object):
+    """
+    :param offset: The offset of the opcode in bytes.
+    :type offset:  int
+    :param opcode: The opcode.
+    :type opcode:  int
+    :param mnemonic: The name of the command, e.g. "MDRP".
+    :type mnemonic:  str
+    :param flags: The value of the flag bits of the opcode, 0 for commands
+                  without flags and for push instructions.
+    :type flags:  int
+    :param args: The values pushed by push instructions, None for other
+                 commands.
+    :type args:  tuple
+    :param depth: The nesting depth in function definitions and if
+                  branches, as the assembly code is indented.
+    :type depth:  int
+
+    A decoded instruction.
+    """
+
+    __slots__ = ("offset", "opcode", "mnemonic", "flags", "args", "depth")
+
+    def __init__(self, offset, opcode, mnemonic, flags, args, depth) -> None:
+        self.offset = offset
+        self.opcode = opcode
+        self.mnemonic = mnemonic
+        self.flags = flags
+        self.args = args
+        self.depth = depth
+
+    def __repr__(self) -> str:
+        return (
+            f"Instruction({self.offset}, 0x{self.opcode:02x}, {self.mnemonic!r}, "
+            f"{self.flags}, {self.args!r}, {self.depth})"
+        )
 
 
 class InstructionStream(object):
@@ -85,121 +133,125 @@ class InstructionStream(object):
         Return the instructions from the bytecode in the current stream as
         assembly code in the specified dialect, "ttx" or "vtt".
         """
-        vtt = dialect == "vtt"
-        ttx = dialect == "ttx"
-        self.rewind()
-
-        asm = ""
-        indent = 0
-
+        if dialect == "ttx":
+            vtt = False
+        elif dialect == "vtt":
+            vtt = True
+        else:
+            # Unknown dialect
+            raise NotImplementedError
+
+        lines = []
+        instructions = self.instructions()
         while True:
-            opcode = self.io.read(1)
-            if not opcode:
-                asm = asm.strip()
-                if ttx:
-                    return asm
-                elif vtt:
-                    if asm:
-                        return f"#PUSHOFF{end}" + asm.strip() + f"{end}#PUSHON"
-                    return ""
-                else:
-                    # Unknown dialect
-                    raise NotImplementedError
-
-            opcode = int.from_bytes(opcode, byteorder="big", signed=False)
-            cmd_info = streamOpcodeDict.get(opcode, None)
-            if cmd_info is None:
-                cmd_info = opcodeDict.get(opcode, None)
-            if cmd_info is None:
-                print(
-                    asm + "\n"
-                    "Illegal opcode 0x%02x at offset 0x%04x."
-                    % (int(opcode), self.io.tell(),)
-                )
-                raise KeyError
-            cmd_name, arg_bits, base_opcode, name = cmd_info
-
-            args = []
-            if cmd_name in ("EIF", "ELSE", "ENDF"):
-                indent -= 1
-
-            if cmd_name in ("NPUSHB", "NPUSHW", "PUSHB", "PUSHW"):
-                # PUSH instructions read their arguments from the stream
-                if cmd_name.startswith("PUSH"):
-                    # Take number of arguments from the opcode
-                    num_args = opcode - base_opcode + 1
-                else:
-                    # Take number of arguments from the stream
-                    _, num_args = self.read_byte()
-                if cmd_name.endswith("B"):
-                    for n in range(num_args):
-                        _, i = self.read_byte()
-                        args.append(str(i))
-                else:
-                    for n in range(num_args):
-                        _, i = self.read_word()
-                        args.append(str(i))
-                arg_bits = 0  # Don't output bits for push instructions
-
-            if arg_bits == 0:
-                if ttx:
-                    arg_bitstring = " "
-                else:
-                    arg_bitstring = ""
-            else:
-                if ttx:
-                    arg_bitstring = num2binary(opcode - base_opcode, arg_bits)
-                elif vtt:
-                    arg_bitstring = self.bitstring_to_mnemonic(
-                        cmd_name, num2binary(opcode - base_opcode, arg_bits)
-                    )
+            try:
+                instruction = next(instructions)
+            except StopIteration:
+                break
+            except IllegalOpcodeError as error:
+                print("".join(lines) + "\n" + str(error))
+                raise
+            cmd_name, _, _, _, _, ttx_line, vtt_line, _, _ = _OPCODES[
+                instruction.opcode
+            ]
+            indent = "  " * instruction.depth
+            prefix = end + indent if vtt else "\n" + indent
+            args = instruction.args
+
+            if args is not None:
+                if vtt:
+                    # Format as generic #PUSH for VTT assembly output
+                    lines.append(f"{prefix}#PUSH, {', '.join(map(str, args))}")
                 else:
-                    # Unknown dialect
-                    raise NotImplementedError
-
-            if ttx:
-                if cmd_name in ("NPUSHB", "NPUSHW", "PUSHB", "PUSHW"):
                     num_args = len(args)
                     val = "value" if num_args == 1 else "values"
-                    asm += (
-                        f"\n{'  ' * indent}{cmd_name}[{arg_bitstring}]"
-                        f"\t/* {num_args} {val} pushed */"
+                    lines.append(
+                        f"{prefix}{cmd_name}[ ]\t/* {num_args} {val} pushed */"
                     )
+                    if args:
+                        lines.append(f"\n{indent}{' '.join(map(str, args))}")
+            elif vtt:
+                if vtt_line is None:
+                    # Illegal flags for this command
+                    raise KeyError
+                if cmd_name in ("JMPR", "JROF"):
+                    # Special formatting for jump instructions
+                    lines.append(f"{end}#PUSHON{prefix}{vtt_line}{end}#PUSHOFF")
                 else:
-                    asm += (
-                        f"\n{'  ' * indent}{cmd_name}[{arg_bitstring}]"
-                        f"\t/* {name} */"
-                    )
+                    lines.append(prefix + vtt_line)
+            else:
+                lines.append(prefix + ttx_line)
 
-                if args:
-                    asm += f"\n{'  ' * indent}{' '.join(args)}"
+        asm = "".join(lines).strip()
+        if vtt and asm:
+            return f"#PUSHOFF{end}{asm}{end}#PUSHON"
+        elif vtt:
+            return ""
+        return asm
 
-            elif vtt:
-                if cmd_name in ("NPUSHB", "NPUSHW", "PUSHB", "PUSHW"):
-                    # Format as generic #PUSH for VTT assembly output
-                    cmd_name = "#PUSH"
-                    asm += f"{end}{'  ' * indent}{cmd_name}, {', '.join(args)}"
-                elif cmd_name in ("JMPR", "JROF"):
-                    # Special formatting for jump instructions
-                    if cmd_name == "JPMR":
-                        args = ("*",)
-                    elif cmd_name == "JROF":
-                        args = ("*", "*")
-                    asm += f"{end}#PUSHON"
-                    asm += f"{end}{'  ' * indent}{cmd_name}, {', '.join(args)}"
-                    asm += f"{end}#PUSHOFF"
+    # Decoding the instructions
+
+    def instructions(self):
+        """
+        Iterate over the instructions from the bytecode in the current stream
+        starting at the beginning, as Instruction objects.
+
+        Raises IllegalOpcodeError at an opcode that is not defined.
+        """
+        self.rewind()
+        data = self.io.getvalue()
+        size = len(data)
+        depth = 0
+        pos = 0
+
+        while pos < size:
+            offset = pos
+            opcode = data[pos]
+            pos += 1
+            info = _OPCODES[opcode]
+            if info is None:
+                raise IllegalOpcodeError(
+                    "Illegal opcode 0x%02x at offset 0x%04x." % (opcode, pos)
+                )
+            cmd_name, is_push, num_args, is_word, flags, _, _, dedent, nest = info
+
+            if dedent:
+                depth -= 1
+
+            args = None
+            if is_push:
+                if num_args is None:
+                    # Take number of arguments from the stream
+                    num_args = data[pos] if pos < size else None
+                    pos += 1
+                if num_args is None:
+                    length = None
                 else:
-                    asm += (
-                        f"{end}{'  ' * indent}{cmd_name}[{arg_bitstring}]"
-                        f"\t/* {name} */"
-                    )
+                    length = num_args * 2 if is_word else num_args
+                if length is None or pos + length > size:
+                    # Truncated program, read what is left like the stream
+                    # methods do
+                    args = self._read_truncated_args(pos, num_args, is_word)
+                    length = 0
+                    pos = size
+                elif is_word:
+                    args = unpack_from(">%dh" % num_args, data, pos)
+                else:
+                    args = tuple(data[pos:pos + length])
+                pos += length
 
-            else:
-                # Unknown dialect
-                raise NotImplementedError
+            yield Instruction(offset, opcode, cmd_name, flags, args, depth)
+
+            if nest:
+                depth += 1
 
-            if cmd_name in ("ELSE", "FDEF", "IF"):
-                indent += 1
+    def _read_truncated_args(self, offset, num_args, is_word):
+        self.io.seek(offset)
+        if num_args is None:
+            # Raises the same error as reading past the end of the stream
+            _, num_args = self.read_byte()
+        read = self.read_word if is_word else self.read_byte
+        return tuple(read()[1] for n in range(num_args))
 
     def bitstring_to_mnemonic(self, cmd_name: str, bitstring: str) -> str:
         """
@@ -284,3 +336,63 @@ class InstructionStream(object):
             return "Wh"  # White
         # "11" is not defined
         raise KeyError
+
+
+def _build_opcode_table():
+    """
+    Return a table with the command name, how to read its arguments, its
+    flag bits, the assembly line in both dialects and the change of nesting
+    depth for all 256 opcodes, or None for illegal opcodes.
+    """
+    stream = InstructionStream()
+    table = []
+    for opcode in range(256):
+        cmd_info = streamOpcodeDict.get(opcode, None)
+        if cmd_info is None:
+            cmd_info = opcodeDict.get(opcode, None)
+        if cmd_info is None:
+            table.append(None)
+            continue
+        cmd_name, arg_bits, base_opcode, name = cmd_info
+        is_push = cmd_name in ("NPUSHB", "NPUSHW", "PUSHB", "PUSHW")
+        num_args = None
+        flags = 0
+        ttx_line = vtt_line = None
+        if is_push:
+            if cmd_name.startswith("PUSH"):
+                # Take number of arguments from the opcode
+                num_args = opcode - base_opcode + 1
+        elif arg_bits == 0:
+            ttx_line = f"{cmd_name}[ ]\t/* {name} */"
+            if cmd_name in ("JMPR", "JROF"):
+                if cmd_name == "JROF":
+                    vtt_line = f"{cmd_name}, *, *"
+                else:
+                    vtt_line = f"{cmd_name}, "
+            else:
+                vtt_line = f"{cmd_name}[]\t/* {name} */"
+        else:
+            flags = opcode - base_opcode
+            bitstring = num2binary(flags, arg_bits)
+            ttx_line = f"{cmd_name}[{bitstring}]\t/* {name} */"
+            try:
+                mnemonic = stream.bitstring_to_mnemonic(cmd_name, bitstring)
+            except KeyError:
+                pass
+            else:
+                vtt_line = f"{cmd_name}[{mnemonic}]\t/* {name} */"
+        table.append((
+            cmd_name,
+            is_push,
+            num_args,
+            cmd_name.endswith("W"),
+            flags,
+            ttx_line,
+            vtt_line,
+            cmd_name in ("EIF", "ELSE", "ENDF"),
+            cmd_name in ("ELSE", "FDEF", "IF"),
+        ))
+    return table
+
+
+_OPCODES = _build_opcode_table()
@@ -1,8 +1,21 @@
+from fontTools.pens.pointPen import AbstractPointPen
 from fontTools.ufoLib import (
     fontInfoAttributesVersion3,
     validateFontInfoVersion3ValueForAttribute,
 )
 
+try:
+    from ufoLib2.objects import Component, Contour, Glyph, Layer, Point
+
+    haveUFOLib2 = True
+except ImportError:
+    haveUFOLib2 = False
+
+try:
+    from ufoLib2.objects.layer import _GLYPH_NOT_LOADED
+except ImportError:
+    _GLYPH_NOT_LOADED = None
+
 
 class RelaxedInfo(object):
 
@@ -28,8 +41,260 @@ class RelaxedInfo(object):
             super(RelaxedInfo, self).__setattr__(attr, value)
 
 
+def clearInfo(info):
+    """
+    Set all info attributes to None.
+    """
+    for attr in fontInfoAttributesVersion3:
+        if attr == "guidelines":
+            continue
+        setattr(info, attr, None)
+
+
+def subsetKerning(kerning, groups, glyphNames):
+    """
+    Remove the glyphs that are not in glyphNames from the groups
+    and the kerning pairs with a glyph or group that is not left.
+    Returns the new kerning and groups.
+    """
+    prunedGroups = {}
+    for groupName, members in groups.items():
+        members = [glyphName for glyphName in members if glyphName in glyphNames]
+        if members:
+            prunedGroups[groupName] = members
+    prunedKerning = {}
+    for (left, right), value in kerning.items():
+        if left not in prunedGroups and left not in glyphNames:
+            continue
+        if right not in prunedGroups and right not in glyphNames:
+            continue
+        prunedKerning[left, right] = value
+    return prunedKerning, prunedGroups
+
+
+def groupKerningPairs(kerning):
+    """
+    Put the glyphs of kerning, a dict of glyph pairs to values,
+    that are kerned the same against all other glyphs into
+    public.kern1 and public.kern2 groups. Returns the kerning
+    with the pairs of the groups and the groups. Glyphs that
+    are kerned like no other glyph are left out of the groups.
+    """
+    # group the second glyphs first, then the first
+    # glyphs by their kerning with those groups
+    columns = {}
+    for (first, second), value in kerning.items():
+        columns.setdefault(second, {})[first] = value
+    rightGroups, rightNames = _groupKerningSides(columns, "public.kern2.")
+    rows = {}
+    for second, column in columns.items():
+        second = rightNames.get(second, second)
+        for first, value in column.items():
+            rows.setdefault(first, {})[second] = value
+    leftGroups, leftNames = _groupKerningSides(rows, "public.kern1.")
+    grouped = {}
+    for first, row in rows.items():
+        first = leftNames.get(first, first)
+        for second, value in row.items():
+            grouped[first, second] = value
+    groups = {}
+    groups.update(leftGroups)
+    groups.update(rightGroups)
+    return grouped, groups
+
+
+def _groupKerningSides(sides, prefix):
+    # group the glyphs that have the same dict of other
+    # side to value, named after their first member
+    members = {}
+    for glyphName, values in sides.items():
+        members.setdefault(frozenset(values.items()), []).append(glyphName)
+    groups = {}
+    groupNames = {}
+    for glyphNames in members.values():
+        if len(glyphNames) < 2:
+            continue
+        glyphNames = sorted(glyphNames)
+        groupName = prefix + glyphNames[0]
+        groups[groupName] = glyphNames
+        for glyphName in glyphNames:
+            groupNames[glyphName] = groupName
+    return groups, groupNames
+
+
 def copyAttr(src, srcAttr, dest, destAttr):
     if not hasattr(src, srcAttr):
         return
     value = getattr(src, srcAttr)
     setattr(dest, destAttr, value)
+
+
+class OutlineRecordingPointPen(AbstractPointPen):
+
+    """
+    Record contours as lists of point tuples, which are
+    much smaller and faster to pickle than pen calls.
+    """
+
+    def __init__(self):
+        self.contours = []
+        self.components = []
+
+    def beginPath(self, identifier=None, **kwargs):
+        self._points = []
+        self.contours.append((identifier, self._points))
+
+    def endPath(self):
+        self._points = None
+
+    def addPoint(
+        self, pt, segmentType=None, smooth=False, name=None, identifier=None, **kwargs
+    ):
+        if name is None and identifier is None:
+            self._points.append((pt[0], pt[1], segmentType, smooth))
+        else:
+            self._points.append((pt[0], pt[1], segmentType, smooth, name, identifier))
+
+    def addComponent(self, baseGlyph, transformation, identifier=None, **kwargs):
+        self.components.append((baseGlyph, tuple(transformation), identifier))
+
+
+def drawOutline(contours, components, pen):
+    """
+    Draw the contours and components recorded by an
+    OutlineRecordingPointPen into a point pen.
+    """
+    for identifier, points in contours:
+        pen.beginPath(identifier=identifier)
+        for point in points:
+            if len(point) == 4:
+                x, y, segmentType, smooth = point
+                pen.addPoint((x, y), segmentType=segmentType, smooth=smooth)
+            else:
+                x, y, segmentType, smooth, name, identifier = point
+                pen.addPoint(
+                    (x, y),
+                    segmentType=segmentType,
+                    smooth=smooth,
+                    name=name,
+                    identifier=identifier,
+                )
+        pen.endPath()
+    for baseGlyph, transformation, identifier in components:
+        pen.addComponent(baseGlyph, transformation, identifier=identifier)
+
+
+def appendOutline(glyph, contours, components):
+    """
+    Add the contours and components recorded by an
+    OutlineRecordingPointPen to glyph. The objects of ufoLib2
+    glyphs are made directly, other glyphs are drawn into with
+    their point pen.
+    """
+    if haveUFOLib2 and isinstance(glyph, Glyph):
+        # the point tuples are in the order of the Point arguments
+        glyph.contours.extend(
+            Contour([Point(*point) for point in points], identifier)
+            for identifier, points in contours
+        )
+        glyph.components.extend(
+            Component(baseGlyph, transformation, identifier)
+            for baseGlyph, transformation, identifier in components
+        )
+    else:
+        drawOutline(contours, components, glyph.getPointPen())
+
+
+# the smallest number of glyphs drawn by a worker
+GLYPH_CHUNK_SIZE = 500
+
+
+def extractGlyphsInWorkers(
+    destination,
+    items,
+    workers,
+    drawChunk,
+    setAttributes,
+    initializer=None,
+    initargs=(),
+):
+    """
+    Draw the glyphs of items, a list with an item per glyph, in
+    workers processes and add them to destination in the order of
+    items. drawChunk is called in the workers with a list of items
+    and returns a (glyph name, outline, data) tuple for each, with
+    the outline recorded by an OutlineRecordingPointPen. The outline
+    is added to the destination glyph, and setAttributes is called
+    with the destination glyph and data. initializer is called with
+    initargs when a worker starts.
+
+    Returns False without drawing anything if workers is None or
+    less than 2, or items has no more than GLYPH_CHUNK_SIZE glyphs.
+    """
+    if workers is None or workers < 2 or len(items) <= GLYPH_CHUNK_SIZE:
+        return False
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few chunks per worker, so that a worker that gets
+    # complex glyphs doesn't hold up the others for long
+    chunkSize = max(GLYPH_CHUNK_SIZE, -(-len(items) // (workers * 4)))
+    chunks = [items[i:i + chunkSize] for i in range(0, len(items), chunkSize)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        initializer=initializer,
+        initargs=initargs,
+    ) as executor:
+        # map returns the chunks in order, so the glyphs are
+        # added to destination in the same order as serially
+        for chunk in executor.map(drawChunk, chunks):
+            for glyphName, outline, data in chunk:
+                destination.newGlyph(glyphName)
+                glyph = destination[glyphName]
+                # like defcon does when it loads a glyph,
+                # don't send a notification for every point
+                notifications = hasattr(glyph, "disableNotifications")
+                if notifications:
+                    glyph.disableNotifications()
+                appendOutline(glyph, *outline)
+                if notifications:
+                    glyph.enableNotifications()
+                setAttributes(glyph, data)
+    return True
+
+
+def installGlyphReader(destination, reader):
+    """
+    Make the default layer of destination, a defcon or ufoLib2
+    font, read its glyphs from reader when they are first accessed,
+    like a layer that was read lazily from a UFO reads them from its
+    glyph set. reader needs the methods of glifLib.GlyphSet that the
+    layers call. Returns False if destination is neither, or if its
+    layers don't read their glyphs the way this expects.
+    """
+    # there is no public API for this, so the private attributes of
+    # the layers are set like they are when a layer is read lazily
+    # (as of ufoLib2 0.19.1 and defcon 0.12.2). ufoLib2 marks the
+    # unread glyphs in _glyphs with _GLYPH_NOT_LOADED and reads them
+    # from _glyphSet when _lazy is set; defcon lists the glyph names
+    # in _keys and reads the glyphs that aren't loaded from _glyphSet.
+    # if a release changes these, the caller extracts the glyphs.
+    layer = destination.layers.defaultLayer
+    if haveUFOLib2 and isinstance(layer, Layer):
+        if (
+            _GLYPH_NOT_LOADED is None
+            or not isinstance(getattr(layer, "_glyphs", None), dict)
+            or not hasattr(layer, "_lazy")
+            or not hasattr(layer, "_glyphSet")
+        ):
+            return False
+        layer._glyphs.update(dict.fromkeys(reader.keys(), _GLYPH_NOT_LOADED))
+        layer._lazy = True
+    elif isinstance(getattr(layer, "_keys", None), set) and hasattr(
+        layer, "_glyphSet"
+    ):
+        # defcon
+        layer._keys.update(reader.keys())
+    else:
+        return False
+    layer._glyphSet = reader
+    return True
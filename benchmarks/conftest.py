@@ -0,0 +1,104 @@
+import os
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from fontbuilders import buildType1Font, buildSyntheticFont, buildVariableFont
+
+
+PLEX_OTF = os.path.join(
+    os.path.dirname(__file__),
+    os.pardir,
+    "tests",
+    "data",
+    "ibm_plex",
+    "IBM Plex Serif-Text-FL.otf",
+)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--full-scale",
+        action="store_true",
+        help="Run the scaling benchmarks up to production font sizes.",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "scaling(sizes, full): parametrize size with sizes, or with full "
+        "when running with --full-scale",
+    )
+
+
+def pytest_generate_tests(metafunc):
+    marker = metafunc.definition.get_closest_marker("scaling")
+    if marker is None:
+        return
+    if metafunc.config.getoption("full_scale"):
+        sizes = marker.kwargs["full"]
+    else:
+        sizes = marker.kwargs["sizes"]
+    metafunc.parametrize("size", sizes)
+
+
+@pytest.fixture(scope="session", params=["defcon", "ufoLib2"])
+def ufo_module(request):
+    return pytest.importorskip(request.param)
+
+
+@pytest.fixture(scope="session")
+def FontClass(ufo_module):
+    return ufo_module.Font
+
+
+@pytest.fixture(scope="session")
+def type1Path(tmp_path_factory):
+    """
+    The test data has no Type 1 font, so build one
+    from the outlines of the IBM Plex OTF.
+    """
+    path = str(tmp_path_factory.mktemp("type1") / "IBM Plex Serif-Text.pfa")
+    buildType1Font(PLEX_OTF, path)
+    return path
+
+
+def _sessionFontBuilder(directory, builder):
+    """
+    Return a function that builds a font with builder and the
+    given keyword arguments in directory and returns its path.
+    Each font is built once.
+    """
+    paths = {}
+
+    def build(**kwargs):
+        key = tuple(sorted(kwargs.items()))
+        if key not in paths:
+            extension = ".otf" if kwargs.get("isTTF") is False else ".ttf"
+            path = str(directory / ("font%d%s" % (len(paths), extension)))
+            builder(path, **kwargs)
+            paths[key] = path
+        return paths[key]
+
+    return build
+
+
+@pytest.fixture(scope="session")
+def syntheticFont(tmp_path_factory):
+    """
+    Return a function that builds a synthetic font with the given
+    buildSyntheticFont arguments and returns its path. Fonts are
+    built once per session.
+    """
+    return _sessionFontBuilder(tmp_path_factory.mktemp("synthetic"), buildSyntheticFont)
+
+
+@pytest.fixture(scope="session")
+def variableFont(tmp_path_factory):
+    """
+    Return a function that builds a variable font with the given
+    buildVariableFont arguments and returns its path. Fonts are
+    built once per session.
+    """
+    return _sessionFontBuilder(tmp_path_factory.mktemp("variable"), buildVariableFont)
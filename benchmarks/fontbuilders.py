@@ -0,0 +1,356 @@
+"""
+Build fonts for the benchmarks that are not part of the test data.
+"""
+
+from array import array
+from fontTools.encodings.StandardEncoding import StandardEncoding
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString
+from fontTools.fontBuilder import FontBuilder
+from fontTools.misc.psCharStrings import T1CharString
+from fontTools.pens.basePen import BasePen
+from fontTools.pens.t2CharStringPen import T2CharStringPen
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+from fontTools.t1Lib import (
+    T1Font,
+    RD_value,
+    ND_values,
+    PD_values,
+    std_subrs,
+    write,
+)
+from fontTools.ttLib import TTFont, newTable
+from fontTools.ttLib.tables.ttProgram import Program
+
+
+class T1CharStringPen(BasePen):
+
+    """
+    Draw a glyph into a Type 1 charstring program.
+    Quadratic curves are converted to cubic curves.
+    """
+
+    def __init__(self, width, glyphSet=None):
+        super().__init__(glyphSet)
+        self.program = [0, round(width), "hsbw"]
+        self._last = (0, 0)
+
+    def _relative(self, pt):
+        x, y = round(pt[0]), round(pt[1])
+        dx, dy = x - self._last[0], y - self._last[1]
+        self._last = (x, y)
+        return [dx, dy]
+
+    def _moveTo(self, pt):
+        self.program.extend(self._relative(pt) + ["rmoveto"])
+
+    def _lineTo(self, pt):
+        self.program.extend(self._relative(pt) + ["rlineto"])
+
+    def _curveToOne(self, pt1, pt2, pt3):
+        self.program.extend(
+            self._relative(pt1)
+            + self._relative(pt2)
+            + self._relative(pt3)
+            + ["rrcurveto"]
+        )
+
+    def _closePath(self):
+        self.program.append("closepath")
+
+    def getCharString(self):
+        return T1CharString(program=self.program + ["endchar"])
+
+
+def buildType1Font(sourcePath, path, kind="OTHER"):
+    """
+    Write the outlines and widths of the OpenType font at
+    sourcePath as a Type 1 font (PFA for kind "OTHER", PFB for
+    kind "PFB") to path.
+    """
+    source = TTFont(sourcePath)
+    glyphSet = source.getGlyphSet()
+    charStrings = {}
+    for glyphName in source.getGlyphOrder():
+        glyph = glyphSet[glyphName]
+        pen = T1CharStringPen(glyph.width, glyphSet)
+        glyph.draw(pen)
+        charStrings[glyphName] = pen.getCharString()
+    head = source["head"]
+    scale = 1 / head.unitsPerEm
+    fontName = source["name"].getDebugName(6) or "Untitled"
+    familyName = source["name"].getDebugName(1) or "Untitled"
+    fontDict = {
+        "FontInfo": {
+            "version": "%.3f" % head.fontRevision,
+            "FullName": source["name"].getDebugName(4) or fontName,
+            "FamilyName": familyName,
+            "Weight": "Regular",
+            "ItalicAngle": source["post"].italicAngle,
+            "isFixedPitch": bool(source["post"].isFixedPitch),
+            "UnderlinePosition": source["post"].underlinePosition,
+            "UnderlineThickness": source["post"].underlineThickness,
+        },
+        "FontName": fontName,
+        "Encoding": StandardEncoding,
+        "PaintType": 0,
+        "FontType": 1,
+        "FontMatrix": [scale, 0, 0, scale, 0, 0],
+        "FontBBox": (head.xMin, head.yMin, head.xMax, head.yMax),
+        "Private": {
+            "-|": RD_value,
+            "|-": ND_values[0],
+            "|": PD_values[0],
+            "BlueValues": [],
+            "lenIV": 4,
+            "MinFeature": (16, 16),
+            "password": 5839,
+            "Subrs": [T1CharString(bytecode=subr) for subr in std_subrs],
+        },
+        "CharStrings": charStrings,
+    }
+    source.close()
+    font = T1Font.__new__(T1Font)
+    font.font = fontDict
+    font.encoding = "ascii"
+    write(path, font.createData(), kind)
+
+
+# ---------------
+# Synthetic fonts
+# ---------------
+
+
+def buildSyntheticFont(
+    path,
+    numGlyphs=1000,
+    isTTF=True,
+    numKernClasses=0,
+    kernClassSize=3,
+    numMarks=0,
+    numMarkClasses=4,
+    programSize=0,
+    programVariants=None,
+    compositeEvery=0,
+    supplementaryCmap=False,
+    numUVS=0,
+    vertical=False,
+    weight=0,
+):
+    """
+    Build a font with the given dimensions and save it to path.
+    The font is returned, and only saved when path is not None.
+
+    - numGlyphs: number of base glyphs (at most 65535 in total)
+    - numKernClasses: number of kerning classes on each side, with
+      kernClassSize glyphs each, kerned against each other in a
+      class based PairPos
+    - numMarks: number of mark glyphs, spread over numMarkClasses
+      mark classes; every base glyph gets an anchor for each class
+    - programSize: approximate bytes of TrueType instructions in each glyph,
+      with programVariants distinct programs (default: all distinct)
+    - compositeEvery: make every nth glyph a composite (TrueType only)
+    - supplementaryCmap: map the glyphs to the supplementary planes,
+      which needs a format 12 cmap subtable
+    - numUVS: number of format 14 Unicode variation sequences
+    - vertical: add vhea and vmtx tables, without VORG
+    - weight: make the outlines, advance widths, kerning, anchors
+      and control values heavier by this many units, for building
+      the masters of a variable font
+    """
+    numKernGlyphs = numKernClasses * kernClassSize
+    numGlyphs = max(numGlyphs, numKernGlyphs, numUVS)
+    baseNames = ["g%05d" % i for i in range(numGlyphs)]
+    markNames = ["m%05d" % i for i in range(numMarks)]
+    glyphOrder = [".notdef"] + baseNames + markNames
+    if len(glyphOrder) > 65535:
+        raise ValueError("Too many glyphs: %d" % len(glyphOrder))
+
+    fb = FontBuilder(unitsPerEm=1000, isTTF=isTTF)
+    fb.setupGlyphOrder(glyphOrder)
+
+    # cmap and Unicode variation sequences
+    start = 0x20000 if supplementaryCmap else 0x4E00
+    cmap = {start + i: glyphName for i, glyphName in enumerate(baseNames)}
+    uvs = []
+    for i in range(numUVS):
+        selector = 0xFE00 + i % 16
+        # alternate between default and non-default sequences
+        glyphName = baseNames[(i + 1) % numGlyphs] if i % 2 else None
+        uvs.append((start + i, selector, glyphName))
+    fb.setupCharacterMap(cmap, uvs=uvs)
+
+    # outlines
+    metrics = {}
+    if isTTF:
+        glyphs = {}
+        for i, glyphName in enumerate(glyphOrder):
+            pen = TTGlyphPen(glyphs)
+            if compositeEvery and i > 2 and i % compositeEvery == 0:
+                pen.addComponent(glyphOrder[i - 1], (1, 0, 0, 1, 0, 0))
+                pen.addComponent(glyphOrder[i - 2], (1, 0, 0, 1, 100 + weight // 2, 0))
+            else:
+                _drawSyntheticGlyph(pen, i, weight)
+            glyphs[glyphName] = pen.glyph()
+        fb.setupGlyf(glyphs)
+        glyf = fb.font["glyf"]
+        for glyphName in glyphOrder:
+            glyph = glyf[glyphName]
+            glyph.recalcBounds(glyf)
+            metrics[glyphName] = (600 + weight, getattr(glyph, "xMin", 0))
+    else:
+        charStrings = {}
+        for i, glyphName in enumerate(glyphOrder):
+            pen = T2CharStringPen(600 + weight, None)
+            _drawSyntheticGlyph(pen, i, weight)
+            charStrings[glyphName] = pen.getCharString()
+            metrics[glyphName] = (600 + weight, 50 + i % 50)
+        fb.setupCFF("Synthetic-Regular", {"FullName": "Synthetic Regular"}, charStrings, {})
+    fb.setupHorizontalMetrics(metrics)
+    fb.setupHorizontalHeader(ascent=800, descent=-200)
+    if vertical:
+        fb.setupVerticalMetrics({glyphName: (1000, 100) for glyphName in glyphOrder})
+        fb.setupVerticalHeader(ascent=500, descent=-500)
+    fb.setupNameTable(dict(familyName="Synthetic", styleName="Regular"))
+    fb.setupOS2(
+        sTypoAscender=800,
+        usWinAscent=800,
+        usWinDescent=200,
+        sxHeight=500 + weight // 10,
+        sCapHeight=700,
+    )
+    fb.setupPost()
+
+    # instructions
+    if isTTF and programSize:
+        if programVariants is None:
+            programVariants = numGlyphs
+        glyf = fb.font["glyf"]
+        for i, glyphName in enumerate(glyphOrder):
+            program = Program()
+            program.fromBytecode(_syntheticProgram(i % programVariants, programSize))
+            glyf[glyphName].program = program
+        for tag in ("fpgm", "prep"):
+            program = Program()
+            program.fromBytecode(_syntheticProgram(0, programSize))
+            fb.font[tag] = newTable(tag)
+            fb.font[tag].program = program
+        fb.font["cvt "] = newTable("cvt ")
+        fb.font["cvt "].values = array("h", range(weight, 2000 + weight, 10))
+
+    # kerning and mark attachment
+    fea = []
+    if numKernClasses:
+        fea.append(
+            _syntheticKerningFeature(baseNames, numKernClasses, kernClassSize, weight)
+        )
+    if numMarks:
+        fea.append(_syntheticMarkFeature(baseNames, markNames, numMarkClasses, weight))
+    if fea:
+        addOpenTypeFeaturesFromString(fb.font, "\n".join(fea))
+
+    if path is not None:
+        fb.save(path)
+    return fb.font
+
+
+def _drawSyntheticGlyph(pen, index, weight=0):
+    # a rectangle and a triangle that vary a little with each glyph
+    x = 50 + index % 50
+    y = index % 30
+    pen.moveTo((x, y))
+    pen.lineTo((x, 700 + y))
+    pen.lineTo((x + 500 + weight, 700 + y))
+    pen.lineTo((x + 500 + weight, y))
+    pen.closePath()
+    pen.moveTo((x + 100 + weight // 2, 100 + y))
+    pen.lineTo((x + 400 + weight // 2, 100 + y))
+    pen.lineTo((x + 250 + weight // 2, 600 - y))
+    pen.closePath()
+
+
+def _syntheticProgram(variant, size):
+    # PUSHB[001] a b, SRP0, MIRP[00100], IUP[0], IUP[1]
+    chunk = bytes([0xB1, variant & 0xFF, (variant >> 8) & 0xFF, 0x10, 0xE4, 0x30, 0x31])
+    return chunk * max(1, size // len(chunk))
+
+
+def _syntheticKerningFeature(glyphNames, numClasses, classSize, weight=0):
+    lines = []
+    for i in range(numClasses):
+        members = " ".join(glyphNames[i * classSize:(i + 1) * classSize])
+        lines.append("@L%d = [%s];" % (i, members))
+        lines.append("@R%d = [%s];" % (i, members))
+    lines.append("feature kern {")
+    for left in range(numClasses):
+        for right in range(numClasses):
+            value = -10 - (left * 7 + right * 3) % 50 - weight // 10
+            lines.append("    pos @L%d @R%d %d;" % (left, right, value))
+    lines.append("} kern;")
+    return "\n".join(lines)
+
+
+def _syntheticMarkFeature(baseNames, markNames, numClasses, weight=0):
+    numClasses = min(numClasses, len(markNames))
+    lines = []
+    for i, markName in enumerate(markNames):
+        lines.append(
+            "markClass %s <anchor %d %d> @MC%d;"
+            % (markName, i % 100, 500 + i % 200, i % numClasses)
+        )
+    lines.append("feature mark {")
+    for i, baseName in enumerate(baseNames):
+        anchors = " ".join(
+            "<anchor %d %d> mark @MC%d" % (250 + i % 50 + weight // 2, 700 + c * 20, c)
+            for c in range(numClasses)
+        )
+        lines.append("    pos base %s %s;" % (baseName, anchors))
+    lines.append("} mark;")
+    return "\n".join(lines)
+
+
+# --------------
+# Variable fonts
+# --------------
+
+# the weights of the masters of the variable fonts, and
+# how much heavier than the default their outlines are
+VARIABLE_MASTERS = [(100, -40), (400, 0), (900, 100)]
+
+
+def buildVariableFont(path, numInstances=9, **kwargs):
+    """
+    Build a variable font with a weight axis from 100 to 900
+    and save it to path. The masters are synthetic fonts built
+    with the buildSyntheticFont arguments in kwargs, and the
+    font has numInstances named instances spread over the axis.
+    """
+    from fontTools import varLib
+    from fontTools.designspaceLib import (
+        AxisDescriptor,
+        DesignSpaceDocument,
+        InstanceDescriptor,
+        SourceDescriptor,
+    )
+
+    designspace = DesignSpaceDocument()
+    axis = AxisDescriptor()
+    axis.tag = "wght"
+    axis.name = "Weight"
+    axis.minimum = VARIABLE_MASTERS[0][0]
+    axis.default = 400
+    axis.maximum = VARIABLE_MASTERS[-1][0]
+    designspace.addAxis(axis)
+    for value, weight in VARIABLE_MASTERS:
+        source = SourceDescriptor()
+        source.font = buildSyntheticFont(None, weight=weight, **kwargs)
+        source.location = dict(Weight=value)
+        designspace.addSource(source)
+    for i in range(numInstances):
+        value = axis.minimum + (axis.maximum - axis.minimum) * i // max(1, numInstances - 1)
+        instance = InstanceDescriptor()
+        instance.familyName = "Synthetic"
+        instance.styleName = "W%d" % value
+        instance.location = dict(Weight=value)
+        designspace.addInstance(instance)
+    font, _, _ = varLib.build(designspace)
+    font.save(path)
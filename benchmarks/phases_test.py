@@ -0,0 +1,171 @@
+"""
+Benchmarks for the extraction phases. Run with:
+
+    pytest benchmarks --benchmark-autosave
+
+and compare against the last saved run with:
+
+    pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+"""
+
+import os
+import pytest
+from fontTools.t1Lib import T1Font
+from fontTools.ttLib import TTFont
+
+import extractor
+from extractor.formats.opentype import (
+    extractOpenTypeInfo,
+    extractOpenTypeGlyphs,
+    extractOpenTypeKerning,
+    extractOpenTypeFeatures,
+    extractInstructions,
+    extractAnchors,
+)
+from extractor.formats.type1 import extractType1Glyphs
+from extractor.stream import InstructionStream
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "tests", "data")
+
+FONTS = {
+    "plex-ttf": os.path.join(DATA_DIR, "ibm_plex", "IBM Plex Serif-Text-FL.ttf"),
+    "plex-otf": os.path.join(DATA_DIR, "ibm_plex", "IBM Plex Serif-Text-FL.otf"),
+    "plex-vfb": os.path.join(DATA_DIR, "ibm_plex", "IBM Plex Serif-Text Italic.vfb"),
+    "uvs-ttf": os.path.join(DATA_DIR, "UVSTest.ttf"),
+}
+
+# the number of rounds for fast and slow phases
+ROUNDS = 10
+SLOW_ROUNDS = 3
+
+
+def _sourceAndDestination(font, FontClass, doGlyphs=False):
+    """
+    Return a setup function for benchmark.pedantic that opens
+    a fresh source and destination for each round, so that the
+    decompilation of the tables read by the phase is included.
+    """
+
+    def setup():
+        source = TTFont(FONTS[font])
+        destination = FontClass()
+        if doGlyphs:
+            extractOpenTypeGlyphs(source, destination)
+        return (source, destination), {}
+
+    return setup
+
+
+@pytest.mark.benchmark(group="info")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf", "uvs-ttf"])
+def test_extractOpenTypeInfo(benchmark, FontClass, font):
+    benchmark.pedantic(
+        extractOpenTypeInfo,
+        setup=_sourceAndDestination(font, FontClass),
+        rounds=ROUNDS,
+    )
+
+
+@pytest.mark.benchmark(group="glyphs")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf", "uvs-ttf"])
+def test_extractOpenTypeGlyphs(benchmark, FontClass, font):
+    benchmark.pedantic(
+        extractOpenTypeGlyphs,
+        setup=_sourceAndDestination(font, FontClass),
+        rounds=ROUNDS,
+    )
+
+
+@pytest.mark.benchmark(group="kerning")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf"])
+def test_extractOpenTypeKerning(benchmark, FontClass, font):
+    benchmark.pedantic(
+        extractOpenTypeKerning,
+        setup=_sourceAndDestination(font, FontClass),
+        rounds=ROUNDS,
+    )
+
+
+@pytest.mark.benchmark(group="features")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf"])
+def test_extractOpenTypeFeatures(benchmark, font):
+    pytest.importorskip("fontFeatures")
+
+    def setup():
+        return (TTFont(FONTS[font]),), {}
+
+    benchmark.pedantic(extractOpenTypeFeatures, setup=setup, rounds=SLOW_ROUNDS)
+
+
+@pytest.mark.benchmark(group="instructions")
+@pytest.mark.parametrize("font", ["plex-ttf", "uvs-ttf"])
+def test_extractInstructions(benchmark, FontClass, font):
+    benchmark.pedantic(
+        extractInstructions,
+        setup=_sourceAndDestination(font, FontClass, doGlyphs=True),
+        rounds=ROUNDS,
+    )
+
+
+@pytest.mark.benchmark(group="anchors")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf"])
+def test_extractAnchors(benchmark, FontClass, font):
+    benchmark.pedantic(
+        extractAnchors,
+        setup=_sourceAndDestination(font, FontClass, doGlyphs=True),
+        rounds=ROUNDS,
+    )
+
+
+@pytest.mark.benchmark(group="type1")
+def test_extractType1Glyphs(benchmark, FontClass, type1Path):
+    def setup():
+        return (T1Font(type1Path, encoding="macroman"), FontClass()), {}
+
+    benchmark.pedantic(extractType1Glyphs, setup=setup, rounds=ROUNDS)
+
+
+@pytest.mark.benchmark(group="assembly")
+@pytest.mark.parametrize("dialect", ["ttx", "vtt"])
+def test_get_assembly_fpgm(benchmark, dialect):
+    font = TTFont(FONTS["plex-ttf"])
+    stream = InstructionStream(program_bytes=font["fpgm"].program.getBytecode())
+    benchmark(stream.get_assembly, dialect=dialect)
+
+
+@pytest.mark.benchmark(group="assembly")
+def test_instructions_fpgm(benchmark):
+    font = TTFont(FONTS["plex-ttf"])
+    stream = InstructionStream(program_bytes=font["fpgm"].program.getBytecode())
+    benchmark(lambda: list(stream.instructions()))
+
+
+@pytest.mark.benchmark(group="assembly")
+def test_get_assembly_glyphs(benchmark):
+    font = TTFont(FONTS["plex-ttf"])
+    glyf = font["glyf"]
+    streams = [
+        InstructionStream(program_bytes=glyf[name].program.getBytecode())
+        for name in font.getGlyphOrder()
+        if hasattr(glyf[name], "program")
+    ]
+
+    def disassemble():
+        for stream in streams:
+            stream.get_assembly()
+
+    benchmark(disassemble)
+
+
+@pytest.mark.benchmark(group="extractUFO")
+@pytest.mark.parametrize("font", ["plex-ttf", "plex-otf", "plex-vfb", "uvs-ttf", "type1"])
+def test_extractUFO(benchmark, FontClass, type1Path, font):
+    if font == "plex-vfb" and not extractor.haveVfb2ufo():
+        pytest.skip("vfbLib is not installed")
+    path = type1Path if font == "type1" else FONTS[font]
+
+    def setup():
+        return (path, FontClass()), {}
+
+    benchmark.pedantic(extractor.extractUFO, setup=setup, rounds=SLOW_ROUNDS)
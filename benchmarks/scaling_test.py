@@ -0,0 +1,110 @@
+"""
+Benchmarks for how the extraction time and peak memory scale with
+the size of a font, using synthetic fonts. By default the sizes are
+kept small enough for a quick run; pass --full-scale to go up to
+production sizes (65k glyphs, hundreds of kerning classes per side,
+...). The peak memory of each phase is stored in the extra_info of
+the benchmark results.
+"""
+
+import tracemalloc
+import pytest
+from fontTools.ttLib import TTFont
+
+from extractor.formats.opentype import (
+    extractOpenTypeGlyphs,
+    extractOpenTypeKerning,
+    extractUnicodeVariationSequences,
+    extractInstructions,
+    extractAnchors,
+)
+from extractor.formats.variable import extractVariableFont
+
+
+ROUNDS = 3
+
+
+def _measure(benchmark, function, path, FontClass, doGlyphs=False):
+    def setup():
+        source = TTFont(path)
+        destination = FontClass()
+        if doGlyphs:
+            extractOpenTypeGlyphs(source, destination)
+        return (source, destination), {}
+
+    # measure the peak memory in a separate run, as tracing
+    # the allocations slows everything down
+    args, kwargs = setup()
+    tracemalloc.start()
+    try:
+        function(*args, **kwargs)
+        benchmark.extra_info["peakMemory"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    benchmark.pedantic(function, setup=setup, rounds=ROUNDS)
+
+
+@pytest.mark.benchmark(group="scaling-glyphs")
+@pytest.mark.scaling(sizes=[250, 1000, 4000], full=[1000, 8000, 32000, 65000])
+@pytest.mark.parametrize("isTTF", [True, False], ids=["ttf", "otf"])
+def test_glyphs(benchmark, FontClass, syntheticFont, size, isTTF):
+    path = syntheticFont(numGlyphs=size, isTTF=isTTF)
+    _measure(benchmark, extractOpenTypeGlyphs, path, FontClass)
+
+
+@pytest.mark.benchmark(group="scaling-cmap12")
+@pytest.mark.scaling(sizes=[250, 1000, 4000], full=[1000, 8000, 32000, 65000])
+def test_supplementary_cmap(benchmark, FontClass, syntheticFont, size):
+    path = syntheticFont(numGlyphs=size, supplementaryCmap=True)
+    _measure(benchmark, extractOpenTypeGlyphs, path, FontClass)
+
+
+@pytest.mark.benchmark(group="scaling-uvs")
+@pytest.mark.scaling(sizes=[250, 1000, 4000], full=[1000, 8000, 32000, 65000])
+def test_unicode_variation_sequences(benchmark, FontClass, syntheticFont, size):
+    path = syntheticFont(numGlyphs=100, numUVS=size)
+    _measure(benchmark, extractUnicodeVariationSequences, path, FontClass)
+
+
+@pytest.mark.benchmark(group="scaling-kerning")
+@pytest.mark.scaling(sizes=[25, 50, 100], full=[100, 200, 400])
+def test_kerning_classes(benchmark, FontClass, syntheticFont, size):
+    path = syntheticFont(numGlyphs=100, numKernClasses=size)
+    _measure(benchmark, extractOpenTypeKerning, path, FontClass)
+
+
+@pytest.mark.benchmark(group="scaling-anchors")
+@pytest.mark.scaling(sizes=[100, 400, 1600], full=[1000, 4000, 16000])
+def test_mark_anchors(benchmark, FontClass, syntheticFont, size):
+    path = syntheticFont(numGlyphs=250, numMarks=size)
+    _measure(benchmark, extractAnchors, path, FontClass, doGlyphs=True)
+
+
+@pytest.mark.benchmark(group="scaling-instructions")
+@pytest.mark.scaling(sizes=[50, 200, 800], full=[100, 1000, 4000])
+def test_glyph_programs(benchmark, FontClass, syntheticFont, size):
+    path = syntheticFont(numGlyphs=250, programSize=size)
+    _measure(benchmark, extractInstructions, path, FontClass, doGlyphs=True)
+
+
+@pytest.mark.benchmark(group="scaling-instructions")
+@pytest.mark.scaling(sizes=[1, 10, 250], full=[1, 10, 100, 1000])
+def test_shared_glyph_programs(benchmark, FontClass, syntheticFont, size):
+    # the glyphs share size distinct programs, as in autohinted fonts
+    path = syntheticFont(numGlyphs=1000, programSize=200, programVariants=size)
+    _measure(benchmark, extractInstructions, path, FontClass, doGlyphs=True)
+
+
+@pytest.mark.benchmark(group="scaling-variable")
+@pytest.mark.scaling(sizes=[250, 1000], full=[1000, 8000, 32000])
+@pytest.mark.parametrize("isTTF", [True, False], ids=["ttf", "otf"])
+def test_variable_instances(benchmark, FontClass, variableFont, size, isTTF):
+    path = variableFont(
+        numGlyphs=size, isTTF=isTTF, numKernClasses=10, numMarks=size // 10
+    )
+    benchmark.pedantic(
+        extractVariableFont,
+        args=(path, FontClass),
+        kwargs=dict(instances=True),
+        rounds=ROUNDS,
+    )
@@ -45,6 +45,7 @@ setup_params = dict(
     extras_require={
         "vfb": ["vfbLib>=0.7.1"],
         "script": ["ufoLib2"],
+        "variable": ["numpy"],
     },
     classifiers=[
         "Development Status :: 4 - Beta",
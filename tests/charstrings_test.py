@@ -0,0 +1,60 @@
+import os
+import pytest
+from fontTools.cffLib import PrivateDict
+from fontTools.misc.psCharStrings import T2CharString
+from fontTools.pens.pointPen import SegmentToPointPen
+from fontTools.ttLib import TTFont
+from extractor.charstrings import CharStringOutlineDecoder
+from extractor.tools import OutlineRecordingPointPen
+
+
+def getpath(filename):
+    dirname = os.path.dirname(__file__)
+    return os.path.join(dirname, "data", filename)
+
+
+def _charString(program):
+    charString = T2CharString(program=program, private=PrivateDict(), globalSubrs=[])
+    charString.compile()
+    return charString
+
+
+def _drawPoints(charString):
+    pen = OutlineRecordingPointPen()
+    charString.draw(SegmentToPointPen(pen))
+    return pen.contours, pen.components
+
+
+class CharStringOutlineDecoderTest:
+
+    def test_decode_font(self):
+        font = TTFont(getpath("ibm_plex/IBM Plex Serif-Text-FL.otf"))
+        charStrings = font.getGlyphSet().charStrings
+        decoder = CharStringOutlineDecoder()
+        outlines = [decoder.decode(charStrings[name]) for name in font.getGlyphOrder()]
+        # the subroutines were decoded once
+        assert decoder._programs
+        # draw a fresh copy, drawing decompiles the charstrings
+        font = TTFont(getpath("ibm_plex/IBM Plex Serif-Text-FL.otf"))
+        charStrings = font.getGlyphSet().charStrings
+        for name, outline in zip(font.getGlyphOrder(), outlines):
+            assert outline == _drawPoints(charStrings[name])
+
+    def test_decode_flex_and_seac(self):
+        program = [
+            100, 0, "rmoveto",
+            10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, 120, 50, "flex",
+            10, 20, 30, 40, 50, 60, 70, 80, 90, 100, 110, "flex1",
+            10, 20, 30, 40, 50, 60, 70, "hflex",
+            -300, "hlineto",
+            0, 0, 65, 194, "endchar",
+        ]
+        decoder = CharStringOutlineDecoder()
+        contours, components = decoder.decode(_charString(program))
+        assert (contours, components) == _drawPoints(_charString(program))
+        assert [baseGlyph for baseGlyph, _, _ in components] == ["A", "acute"]
+
+    def test_decode_unsupported(self):
+        decoder = CharStringOutlineDecoder()
+        with pytest.raises(NotImplementedError):
+            decoder.decode(_charString([1, 2, "add", 0, "rmoveto", "endchar"]))
@@ -0,0 +1,94 @@
+import os
+import shutil
+import sys
+import pytest
+import extractor
+
+pytest.importorskip("ufoLib2")
+
+
+def getpath(filename):
+    dirname = os.path.dirname(__file__)
+    return os.path.join(dirname, "data", filename)
+
+
+def _run(monkeypatch, capsys, *args):
+    monkeypatch.setattr(sys, "argv", ["extractufo", "-m", "ufoLib2"] + list(args))
+    with pytest.raises(SystemExit) as exit:
+        extractor.cmdline()
+    lines = [
+        line
+        for line in capsys.readouterr().out.splitlines()
+        if line.startswith("Extracting") or line[:1].isdigit()
+    ]
+    return exit.value.code, lines
+
+
+class CommandLineTest:
+
+    def _fonts(self, tmp_path, *names):
+        paths = []
+        for name in names:
+            path = str(tmp_path / name)
+            shutil.copy(getpath("UVSTest.ttf"), path)
+            paths.append(path)
+        return paths
+
+    def test_jobs_order(self, monkeypatch, capsys, tmp_path):
+        paths = self._fonts(tmp_path, "b.ttf", "a.ttf", "c.ttf")
+        code, lines = _run(monkeypatch, capsys, "-j", "2", *paths)
+        # the results are reported in the order of the arguments
+        assert lines == [
+            f"Extracting {path}.ufo... done." for path in paths
+        ] + ["3 extracted, 0 skipped, 0 failed."]
+        assert not code
+        assert all(os.path.isdir(path + ".ufo") for path in paths)
+
+    def test_existing_skipped(self, monkeypatch, capsys, tmp_path):
+        paths = self._fonts(tmp_path, "a.ttf", "b.ttf")
+        _run(monkeypatch, capsys, paths[0])
+        code, lines = _run(monkeypatch, capsys, *paths)
+        assert lines == [
+            f"Extracting {paths[0]}.ufo... path already exists, skipping.",
+            f"Extracting {paths[1]}.ufo... done.",
+            "1 extracted, 1 skipped, 0 failed.",
+        ]
+        assert code
+        # existing UFOs are updated with -u
+        code, lines = _run(monkeypatch, capsys, "-u", *paths)
+        assert lines[-1] == "2 extracted, 0 skipped, 0 failed."
+        assert not code
+
+    @pytest.mark.parametrize("jobs", ["1", "2"])
+    def test_errors_continue(self, monkeypatch, capsys, tmp_path, jobs):
+        missing = str(tmp_path / "missing.ttf")
+        paths = self._fonts(tmp_path, "a.ttf")
+        code, lines = _run(monkeypatch, capsys, "-j", jobs, missing, *paths)
+        assert lines[0].startswith(f"Extracting {missing}.ufo... failed: ")
+        assert "FileNotFoundError" in lines[0]
+        # the other fonts are still extracted
+        assert lines[1:] == [
+            f"Extracting {paths[0]}.ufo... done.",
+            "1 extracted, 0 skipped, 1 failed.",
+        ]
+        assert code
+        assert os.path.isdir(paths[0] + ".ufo")
+
+    def test_group_kerning(self, monkeypatch, capsys, tmp_path):
+        import ufoLib2
+
+        path = str(tmp_path / "font.pfb")
+        shutil.copy(getpath("Type1Test.pfb"), path)
+        (tmp_path / "font.afm").write_text(
+            "StartFontMetrics 4.1\nStartKernPairs 3\n"
+            "KPX A V -80\nKPX Aacute V -80\nKPX T o -50\n"
+            "EndKernPairs\nEndFontMetrics\n"
+        )
+        code, _ = _run(monkeypatch, capsys, "--group-kerning", path)
+        assert not code
+        ufo = ufoLib2.Font.open(path + ".ufo")
+        assert dict(ufo.groups) == {"public.kern1.A": ["A", "Aacute"]}
+        assert dict(ufo.kerning) == {
+            ("public.kern1.A", "V"): -80,
+            ("T", "o"): -50,
+        }
@@ -25,6 +25,500 @@ class ExtractUfoTest:
             "FE0F": {"1F170": "Anegativesquared"},
         }
 
+    def test_extract_format(self):
+        assert extractor.extractFormat(getpath("UVSTest.ttf")) == "OTF"
+        assert extractor.extractFormat(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.otf")
+        ) == "OTF"
+        assert extractor.extractFormat(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.ttx")
+        ) == "ttx"
+        assert extractor.extractFormat(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.fpgm.ttxasm")
+        ) is None
+
+    def test_extract_format_from_file(self):
+        with open(getpath("UVSTest.ttf"), "rb") as f:
+            f.seek(0)
+            assert extractor.extractFormat(f) == "OTF"
+            # the file position must not change
+            assert f.tell() == 0
+
+    def test_extract_from_file(self, FontClass):
+        ufo = FontClass()
+        with open(getpath("UVSTest.ttf"), "rb") as f:
+            extractor.extractUFO(f, ufo)
+        assert "zero.slash" in ufo
+
+    def test_extract_lazy_info_only(self, FontClass):
+        from extractor.formats.opentype import TRUETYPE_INSTRUCTIONS_KEY
+
+        tags = ("head", "name", "OS/2", "glyf", "GPOS", "GSUB")
+        loaded = {}
+
+        def check(source, destination):
+            loaded.update((tag, source.isLoaded(tag)) for tag in tags)
+
+        ufo = FontClass()
+        extractor.extractUFO(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"),
+            ufo,
+            doGlyphs=False,
+            doKerning=False,
+            doFeatures=False,
+            customFunctions={"OTF": [check]},
+            lazy=True,
+        )
+        assert ufo.info.familyName == "IBM Plex Serif"
+        assert not len(ufo)
+        assert TRUETYPE_INSTRUCTIONS_KEY not in ufo.lib
+        # the info tables have been dropped, the others were never decompiled
+        assert loaded == dict.fromkeys(tags, False)
+
+    @pytest.mark.parametrize("backend", ["serial", "thread"])
+    def test_extract_ufos(self, FontClass, backend):
+        paths = [
+            getpath("UVSTest.ttf"),
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.fpgm.ttxasm"),
+            getpath("UVSTest.ttf"),
+        ]
+        results = list(
+            extractor.extractUFOs(
+                paths, FontClass, backend=backend, maxWorkers=2, maxPending=1
+            )
+        )
+        assert sorted(path for path, _, _ in results) == sorted(paths)
+        for path, ufo, error in results:
+            if path.endswith(".ttf"):
+                assert error is None
+                assert "zero.slash" in ufo
+            else:
+                assert ufo is None
+                assert isinstance(error, extractor.ExtractorError)
+
+    def test_extract_ufos_process(self):
+        ufoLib2 = pytest.importorskip("ufoLib2")
+        paths = [getpath("UVSTest.ttf")] * 2
+        for path, ufo, error in extractor.extractUFOs(
+            paths, ufoLib2.Font, backend="process", maxWorkers=2
+        ):
+            assert error is None
+            assert "zero.slash" in ufo
+
+    def test_extract_stats(self, FontClass):
+        from fontTools.ttLib import TTFont
+        from extractor.stats import ExtractionStats
+
+        ufo = FontClass()
+        stats = ExtractionStats()
+        extractor.extractUFO(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"), ufo, stats=stats
+        )
+        phases = stats.asDict()
+        for phase in ("format", "info", "glyphs", "kerning", "instructions"):
+            assert phases[phase]["wallTime"] >= 0
+            assert phases[phase]["cpuTime"] >= 0
+        assert phases["glyphs"]["counts"]["glyphs"] == len(ufo)
+        assert phases["kerning"]["counts"]["pairs"] == len(ufo.kerning)
+        assert phases["instructions"]["counts"]["bytes"] > 0
+        # each distinct program is only disassembled once
+        source = TTFont(getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"))
+        glyf = source["glyf"]
+        programs = [source["fpgm"].program, source["prep"].program] + [
+            glyf[name].program for name in glyf.keys() if hasattr(glyf[name], "program")
+        ]
+        counts = phases["instructions"]["counts"]
+        assert counts["programs"] == len(programs)
+        assert counts["programs"] - counts["cacheHits"] == len(
+            set(program.getBytecode() for program in programs)
+        )
+
+    def test_extract_cache(self, FontClass, tmp_path):
+        from extractor.cache import ExtractionCache, serialize
+        from extractor.stats import ExtractionStats
+
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf")
+        cache = ExtractionCache(str(tmp_path))
+        stats = ExtractionStats()
+        extracted = FontClass()
+        extractor.extractUFO(path, extracted, cache=cache, stats=stats)
+        cached = FontClass()
+        extractor.extractUFO(path, cached, cache=cache, stats=stats)
+        assert stats.asDict()["cache"]["counts"] == {"hits": 1, "misses": 1}
+
+        extracted = serialize(extracted)
+        cached = serialize(cached)
+        # defcon doesn't keep the order of the glyphs
+        assert sorted(extracted.pop("glyphs")) == sorted(cached.pop("glyphs"))
+        assert extracted == cached
+
+        # different options are cached separately
+        ufo = FontClass()
+        extractor.extractUFO(path, ufo, doKerning=False, cache=cache, stats=stats)
+        assert stats.asDict()["cache"]["counts"]["misses"] == 2
+        assert not ufo.kerning
+
+    def test_extract_cache_eviction(self, FontClass, tmp_path):
+        from extractor.cache import ExtractionCache
+
+        cache = ExtractionCache(str(tmp_path), maxSize=0)
+        extractor.extractUFO(getpath("UVSTest.ttf"), FontClass(), cache=cache)
+        assert not list(tmp_path.iterdir())
+
+    def test_extract_cache_eviction_scans(self, FontClass, tmp_path, monkeypatch):
+        import os
+        from extractor.cache import ExtractionCache
+
+        scans = []
+        listdir = os.listdir
+
+        def countingListdir(path):
+            scans.append(path)
+            return listdir(path)
+
+        monkeypatch.setattr(os, "listdir", countingListdir)
+        path = getpath("UVSTest.ttf")
+        cache = ExtractionCache(str(tmp_path))
+        extractor.extractUFO(path, FontClass(), cache=cache)
+        extractor.extractUFO(path, FontClass(), doKerning=False, cache=cache)
+        # the directory is only scanned on the first store
+        assert len(scans) == 1
+        monkeypatch.undo()
+        assert len(list(tmp_path.iterdir())) == 2
+
+        # and again once the cache may have grown past maxSize
+        monkeypatch.setattr(os, "listdir", countingListdir)
+        cache.maxSize = cache._size
+        extractor.extractUFO(path, FontClass(), doFeatures=False, cache=cache)
+        assert len(scans) == 2
+        monkeypatch.undo()
+        assert cache._size <= cache.maxSize
+        assert len(list(tmp_path.iterdir())) == 2
+
+    def test_extract_incremental(self, FontClass, tmp_path):
+        from fontTools.ttLib import TTFont
+        from extractor.stats import ExtractionStats
+
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf")
+        ufo = FontClass()
+        extractor.extractUFO(path, ufo, incremental=True)
+        numAnchors = sum(len(glyph.anchors) for glyph in ufo)
+
+        # nothing changed
+        stats = ExtractionStats()
+        extractor.extractUFO(path, ufo, incremental=True, stats=stats)
+        assert "info" not in stats.phases
+        assert "glyphs" not in stats.phases
+
+        # only the name table changed
+        font = TTFont(path)
+        font["name"].setName("Changed", 1, 1, 0, 0)
+        changedPath = str(tmp_path / "changed.ttf")
+        font.save(changedPath)
+        stats = ExtractionStats()
+        extractor.extractUFO(changedPath, ufo, incremental=True, stats=stats)
+        assert "info" in stats.phases
+        assert "glyphs" not in stats.phases
+        assert "kerning" not in stats.phases
+        assert ufo.info.styleMapFamilyName == "Changed"
+        assert sum(len(glyph.anchors) for glyph in ufo) == numAnchors
+
+        # a glyph renamed through the post table only
+        font = TTFont(path)
+        font["post"]
+        glyphOrder = font.getGlyphOrder()
+        font.setGlyphOrder(["Aalpha" if name == "A" else name for name in glyphOrder])
+        renamedPath = str(tmp_path / "renamed.ttf")
+        font.save(renamedPath)
+        extractor.extractUFO(renamedPath, ufo, incremental=True)
+        assert "Aalpha" in ufo
+        assert "A" not in ufo
+        assert "A" not in ufo.lib["public.glyphOrder"]
+        for members in ufo.groups.values():
+            assert "A" not in members
+        assert any("Aalpha" in members for members in ufo.groups.values())
+        for pair in ufo.kerning.keys():
+            assert "A" not in pair
+        expected = FontClass()
+        extractor.extractUFO(renamedPath, expected)
+        assert dict(ufo.groups.items()) == dict(expected.groups.items())
+        assert dict(ufo.kerning.items()) == dict(expected.kerning.items())
+        assert sum(len(glyph.anchors) for glyph in ufo) == numAnchors
+
+    def test_extract_subset(self, FontClass, recwarn):
+        ufo = FontClass()
+        extractor.extractUFO(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"),
+            ufo,
+            glyphs=["Aacute"],
+            unicodes=range(0x61, 0x7B),
+        )
+        # the components of Aacute are added
+        assert set(ufo.keys()) == {"A", "Aacute", "acute.case"} | {
+            chr(c) for c in range(0x61, 0x7B)
+        }
+        assert set(ufo.lib["public.glyphOrder"]) == set(ufo.keys())
+        assert ufo.kerning
+        for pair in ufo.kerning.keys():
+            for side in pair:
+                assert side in ufo.groups or side in ufo
+        for members in ufo.groups.values():
+            assert set(members) <= set(ufo.keys())
+        assert "Aacute" in ufo.features.text
+        assert "Adieresis" not in ufo.features.text
+        # no rules with classes that the subset emptied
+        rules = [
+            line.strip()
+            for line in ufo.features.text.splitlines()
+            if line.strip().startswith(("pos ", "sub ", "# pos ", "# sub "))
+        ]
+        assert rules
+        for rule in rules:
+            assert not rule.startswith("#")
+            assert "[]" not in rule
+        assert not [w for w in recwarn if "Empty class" in str(w.message)]
+
+    def test_extract_subset_uvs(self, FontClass):
+        ufo = FontClass()
+        extractor.extractUFO(getpath("UVSTest.ttf"), ufo, unicodes=[0x30])
+        assert set(ufo.keys()) == {"zero", "zero.slash"}
+        assert ufo.lib["public.unicodeVariationSequences"] == {
+            "FE00": {"0030": "zero.slash"},
+        }
+
+    @pytest.mark.parametrize("extension", ["ttf", "otf"])
+    def test_extract_glyph_workers(self, FontClass, extension, monkeypatch):
+        from extractor.cache import serialize
+        from extractor import tools
+
+        # shard even a small font
+        monkeypatch.setattr(tools, "GLYPH_CHUNK_SIZE", 200)
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL." + extension)
+        serial = FontClass()
+        extractor.extractUFO(path, serial)
+        sharded = FontClass()
+        extractor.extractUFO(path, sharded, glyphWorkers=2)
+
+        serial = serialize(serial)
+        sharded = serialize(sharded)
+        assert sorted(serial.pop("glyphs")) == sorted(sharded.pop("glyphs"))
+        assert serial == sharded
+
+    @pytest.mark.parametrize("extension", ["ttf", "otf"])
+    def test_extract_vertical_origin(self, FontClass, extension, tmp_path):
+        from fontTools.fontBuilder import FontBuilder
+        from fontTools.pens.boundsPen import ControlBoundsPen
+        from fontTools.ttLib import TTFont
+
+        font = TTFont(getpath("ibm_plex/IBM Plex Serif-Text-FL." + extension))
+        # add vertical metrics without VORG
+        fb = FontBuilder(font=font)
+        fb.setupVerticalMetrics({name: (1000, 100) for name in font.getGlyphOrder()})
+        fb.setupVerticalHeader(ascent=500, descent=-500)
+        path = str(tmp_path / ("vertical." + extension))
+        font.save(path)
+        ufo = FontClass()
+        extractor.extractUFO(path, ufo)
+
+        font = TTFont(path)
+        glyphSet = font.getGlyphSet()
+        for glyph in ufo:
+            pen = ControlBoundsPen(glyphSet)
+            glyphSet[glyph.name].draw(pen)
+            assert glyph.height == 1000
+            if pen.bounds is None:
+                assert glyph.verticalOrigin is None
+            else:
+                assert glyph.verticalOrigin == 100 + pen.bounds[3]
+
+    def test_glyf_outline(self):
+        from fontTools.ttLib import TTFont
+        from extractor.formats.opentype import _glyfOutline
+        from extractor.tools import OutlineRecordingPointPen
+
+        font = TTFont(getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"))
+        # an outline that is moved by its left side bearing
+        width, lsb = font["hmtx"]["A"]
+        font["hmtx"]["A"] = (width, lsb + 10)
+        glyphSet = font.getGlyphSet()
+        for glyphName in font.getGlyphOrder():
+            pen = OutlineRecordingPointPen()
+            glyphSet[glyphName].drawPoints(pen)
+            contours, components = _glyfOutline(glyphSet[glyphName], font["glyf"])
+            assert contours == pen.contours
+            assert components == pen.components
+
+    def test_extract_context(self, FontClass):
+        contexts = []
+
+        def withContext(source, destination, context):
+            contexts.append(context)
+
+        def withoutContext(source, destination):
+            contexts.append(None)
+
+        ufo = FontClass()
+        extractor.extractUFO(
+            getpath("ibm_plex/IBM Plex Serif-Text-FL.otf"),
+            ufo,
+            customFunctions={"OTF": [withContext, withoutContext]},
+        )
+        context, noContext = contexts
+        assert noContext is None
+        # the phases already built the cmap and lookup data
+        cmap = context.source["cmap"]
+        assert context.bestCmap is context.bestCmap
+        assert context.bestCmap == cmap.getBestCmap()
+        assert context.reversedCmap == cmap.buildReversed()
+        assert context.lookupIndexes(["mkmk", "mark"]) is context.lookupIndexes(
+            ["mark", "mkmk"]
+        )
+        # nothing is kept for a dropped table
+        glyphSet = context.glyphSet
+        context.forgetTables(["cmap", "GPOS"])
+        assert context.bestCmap is not None
+        assert context.glyphSet is glyphSet
+        context.forgetTables(["CFF "])
+        assert context.glyphSet is not glyphSet
+
+    @pytest.mark.parametrize("extension", ["ttf", "otf"])
+    def test_extract_lazy_glyphs(self, FontClass, extension, tmp_path):
+        from extractor.cache import ExtractionCache, serialize
+
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL.%s" % extension)
+        extracted = FontClass()
+        extractor.extractUFO(path, extracted)
+        lazy = FontClass()
+        extractor.extractUFO(path, lazy, lazyGlyphs=True)
+        reader = lazy.layers.defaultLayer._glyphSet
+        assert set(lazy.keys()) == set(extracted.keys())
+        assert reader.isPending("Aacute")
+        # the anchors and glyph programs are added when a glyph is read
+        glyph = lazy["Aacute"]
+        assert not reader.isPending("Aacute")
+        assert glyph.anchors
+        assert reader.isPending("a")
+
+        extracted = serialize(extracted)
+        lazy = serialize(lazy)
+        assert sorted(extracted.pop("glyphs")) == sorted(lazy.pop("glyphs"))
+        assert extracted == lazy
+
+        with pytest.raises(extractor.ExtractorError):
+            extractor.extractUFO(path, FontClass(), lazyGlyphs=True, incremental=True)
+        with pytest.raises(extractor.ExtractorError):
+            extractor.extractUFO(
+                path, FontClass(), lazyGlyphs=True, cache=ExtractionCache(str(tmp_path))
+            )
+
+    def test_extract_lazy_glyphs_fallback(self, FontClass, monkeypatch):
+        from types import SimpleNamespace
+        from extractor import tools
+        from extractor.cache import serialize
+
+        # a layer without the private attributes that are set
+        layer = SimpleNamespace(_keys=[], _glyphSet=None)
+        font = SimpleNamespace(layers=SimpleNamespace(defaultLayer=layer))
+        assert not tools.installGlyphReader(font, None)
+        lazy = FontClass()
+        if hasattr(lazy.layers.defaultLayer, "_keys"):
+            pytest.skip("defcon layers are covered by the layer above")
+        # as if a ufoLib2 release no longer had the sentinel for unread glyphs
+        monkeypatch.setattr(tools, "_GLYPH_NOT_LOADED", None)
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf")
+        extractor.extractUFO(path, lazy, lazyGlyphs=True)
+        extracted = FontClass()
+        extractor.extractUFO(path, extracted)
+        # the glyphs are extracted
+        assert lazy.layers.defaultLayer._glyphSet is None
+        assert serialize(lazy) == serialize(extracted)
+
+    def test_extract_defer_disassembly(self, FontClass):
+        from extractor.cache import serialize
+        from extractor.formats.opentype import (
+            TRUETYPE_BYTECODE_KEY,
+            TRUETYPE_INSTRUCTIONS_KEY,
+        )
+
+        path = getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf")
+        extracted = FontClass()
+        extractor.extractUFO(path, extracted)
+        deferred = FontClass()
+        extractor.extractUFO(path, deferred, deferDisassembly=True)
+        # the programs are kept as bytecode
+        lib = deferred.lib[TRUETYPE_INSTRUCTIONS_KEY]
+        assert "fontProgram" not in lib
+        assert isinstance(deferred.lib[TRUETYPE_BYTECODE_KEY]["fontProgram"], bytes)
+        glyph = deferred["a"]
+        assert "assembly" not in glyph.lib[TRUETYPE_INSTRUCTIONS_KEY]
+        assert isinstance(glyph.lib[TRUETYPE_BYTECODE_KEY], bytes)
+
+        extractor.disassembleInstructions(deferred)
+        assert TRUETYPE_BYTECODE_KEY not in deferred.lib
+        assert serialize(deferred) == serialize(extracted)
+
+    def test_glyph_program_hash(self, FontClass):
+        from extractor.formats.opentype import (
+            TRUETYPE_INSTRUCTIONS_KEY,
+            glyphProgramHash,
+        )
+
+        ufo = FontClass()
+        extractor.extractUFO(getpath("ibm_plex/IBM Plex Serif-Text-FL.ttf"), ufo)
+        # the outlines are hashed as they were extracted, the same
+        # as drawing the glyphs
+        hashes = [
+            (glyph.lib[TRUETYPE_INSTRUCTIONS_KEY]["id"], glyphProgramHash(glyph, ufo))
+            for glyph in ufo
+            if TRUETYPE_INSTRUCTIONS_KEY in glyph.lib
+        ]
+        assert hashes
+        assert all(extracted == drawn for extracted, drawn in hashes)
+
+    def test_outline_hash(self, FontClass):
+        from extractor.formats.opentype import _outlineHash, glyphProgramHash
+        from extractor.tools import appendOutline
+
+        outlines = {
+            "a": (
+                [
+                    (None, [
+                        (10, -5, "line", False),
+                        (1000000, 700, "line", False),
+                        (-0.0, 0.5, None, False),
+                        (300.25, 2.5, None, False),
+                        (301.5, -1e-07, "curve", False),
+                    ]),
+                    (None, [(1, 2, "qcurve", False), (3, 4, None, False)]),
+                ],
+                [],
+            ),
+            "b": ([], [("a", (0.33333, -0.5, 1e-05, 1, 10.5, -2.5), None)]),
+            "c": (
+                [(None, [(2.5, 3.5, "move", False), (4, 5, "line", False)])],
+                [("b", (-1, 0, 0, 1.0, 600, 0), None), ("a", (1, 0, 0, 1, 0, 0), None)],
+            ),
+        }
+        font = FontClass()
+        for glyphName, outline in outlines.items():
+            glyph = font.newGlyph(glyphName)
+            glyph.width = 500.5
+            appendOutline(glyph, *outline)
+        # the same as drawing the glyphs through the pens
+        hashData = {}
+        for glyphName in outlines:
+            assert _outlineHash(glyphName, 500.5, outlines, hashData) == (
+                glyphProgramHash(font[glyphName], font)
+            )
+
+    def test_extract_incremental_unsupported(self, FontClass):
+        with pytest.raises(extractor.ExtractorError):
+            extractor.extractUFO(
+                getpath("ibm_plex/IBM Plex Serif-Text-FL.ttx"),
+                FontClass(),
+                incremental=True,
+            )
+
 
 if __name__ == "__main__":
     import sys
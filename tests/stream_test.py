@@ -5,7 +5,7 @@ import unittest
 from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables.ttProgram import Program
 
-from extractor.stream import InstructionStream
+from extractor.stream import IllegalOpcodeError, InstructionStream
 
 
 sample = """PUSHB[ ]	/* 4 values pushed */
@@ -118,3 +118,64 @@ class InstructionStreamTests(unittest.TestCase):
         )
         with pytest.raises(KeyError):
             assert stream.vtt_assembly == sample
+
+    def test_npush_ttx(self):
+        stream = InstructionStream(
+            program_bytes=bytes([0x40, 2, 1, 255, 0x41, 2, 255, 254, 1, 0, 0x40, 0])
+        )
+        assert str(stream) == (
+            "NPUSHB[ ]\t/* 2 values pushed */\n"
+            "1 255\n"
+            "NPUSHW[ ]\t/* 2 values pushed */\n"
+            "-2 256\n"
+            "NPUSHB[ ]\t/* 0 values pushed */"
+        )
+
+    def test_jump_vtt(self):
+        stream = InstructionStream(program_bytes=bytes([0xB0, 4, 0x1C, 0x79]))
+        assert stream.vtt_assembly == (
+            "#PUSHOFF\n#PUSH, 4\n#PUSHON\nJMPR, \n#PUSHOFF\n"
+            "#PUSHON\nJROF, *, *\n#PUSHOFF\n#PUSHON"
+        )
+
+    def test_truncated_push(self):
+        # The last word is missing its low byte
+        stream = InstructionStream(program_bytes=bytes([0xB9, 1, 0, 0xFF]))
+        assert str(stream) == "PUSHW[ ]\t/* 2 values pushed */\n256 -1"
+        stream = InstructionStream(program_bytes=bytes([0xB1, 1]))
+        with pytest.raises(TypeError):
+            str(stream)
+
+    def test_instructions(self):
+        stream = InstructionStream(program_bytes=self._compile(sample))
+        instructions = list(stream.instructions())
+        assert [
+            (i.offset, i.mnemonic, i.flags, i.args, i.depth)
+            for i in instructions[:4]
+        ] == [
+            (0, "PUSHB", 0, (1, 2, 3, 4), 0),
+            (5, "PUSHW", 0, (1, -1), 0),
+            (10, "PUSHW", 0, (5, 512), 0),
+            (15, "SPVTCA", 0, None, 0),
+        ]
+        # the flag bits and the nesting depth
+        assert [
+            (i.mnemonic, i.flags, i.depth) for i in instructions[-9:]
+        ] == [
+            ("IF", 0, 0),
+            ("SHP", 0, 1),
+            ("SHC", 1, 1),
+            ("EIF", 0, 0),
+            ("MSIRP", 1, 0),
+            ("MD", 0, 0),
+            ("GC", 1, 0),
+            ("ROUND", 1, 0),
+            ("MDRP", 6, 0),
+        ]
+
+    def test_illegal_opcode(self):
+        stream = InstructionStream(program_bytes=bytes([0xB0, 1, 0x28]))
+        instructions = stream.instructions()
+        assert next(instructions).args == (1,)
+        with pytest.raises(IllegalOpcodeError):
+            next(instructions)
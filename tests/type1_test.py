@@ -0,0 +1,193 @@
+import os
+import shutil
+import struct
+from fontTools.pens.recordingPen import RecordingPointPen
+from extractor import extractUFO, tools
+from extractor.formats.type1 import (
+    extractFontFromType1,
+    findType1MetricsFile,
+    readAFM,
+    readPFMKerning,
+)
+from extractor.tools import groupKerningPairs
+
+AFM = """StartFontMetrics 4.1
+FontName Test
+CapHeight 700
+XHeight 500.5
+Ascender 750
+Descender -250
+StartCharMetrics 2
+C 65 ; WX 600 ; N A ; B 0 0 600 700 ;
+C 86 ; WX 600 ; N V ; B 0 0 600 700 ;
+EndCharMetrics
+StartKernData
+StartKernPairs 4
+KPX A V -80
+KP V A -70 0
+KPY A V 10
+KPX A T bad
+EndKernPairs
+StartKernPairs1 1
+KPX A V -20
+EndKernPairs
+EndKernData
+EndFontMetrics
+"""
+
+SIDECAR_AFM = """StartFontMetrics 4.1
+FontName IBMPlexSerif-Text
+CapHeight 698
+XHeight 516
+StartKernData
+StartKernPairs 5
+KPX A V -80
+KPX A W -80
+KPX Aacute V -80
+KPX Aacute W -80
+KPX T o -50
+EndKernPairs
+EndKernData
+EndFontMetrics
+"""
+
+
+def getpath(filename):
+    dirname = os.path.dirname(__file__)
+    return os.path.join(dirname, "data", filename)
+
+
+def _outline(glyph):
+    pen = RecordingPointPen()
+    glyph.drawPoints(pen)
+    return pen.value
+
+
+def _pfm(charSet, pairs):
+    kernTable = 147
+    data = bytearray(kernTable)
+    data[85] = charSet
+    struct.pack_into("<I", data, 131, kernTable)
+    data += struct.pack("<H", len(pairs))
+    for first, second, value in pairs:
+        data += struct.pack("<BBh", first, second, value)
+    return bytes(data)
+
+
+class Type1MetricsFileTest:
+
+    def test_find_metrics_file(self, tmp_path):
+        path = tmp_path / "font.pfb"
+        path.write_bytes(b"")
+        assert findType1MetricsFile(str(path)) is None
+        (tmp_path / "font.pfm").write_bytes(b"")
+        assert findType1MetricsFile(str(path)) == str(tmp_path / "font.pfm")
+        # an AFM file is preferred
+        (tmp_path / "font.afm").write_text(AFM)
+        assert findType1MetricsFile(str(path)) == str(tmp_path / "font.afm")
+
+    def test_read_afm(self, tmp_path):
+        path = tmp_path / "font.afm"
+        path.write_text(AFM)
+        metrics, pairs = readAFM(str(path))
+        assert metrics == dict(
+            CapHeight=700, XHeight=500.5, Ascender=750, Descender=-250
+        )
+        # the vertical pairs are skipped
+        assert pairs == [("A", "V", -80), ("V", "A", -70)]
+
+    def test_read_pfm_kerning(self, tmp_path):
+        path = tmp_path / "font.pfm"
+        path.write_bytes(_pfm(0, [(65, 86, -80), (86, 65, -70)]))
+        assert readPFMKerning(str(path)) == (0, [(65, 86, -80), (86, 65, -70)])
+        # a truncated file has no kerning
+        path.write_bytes(_pfm(2, [(65, 86, -80)])[:-2])
+        assert readPFMKerning(str(path)) == (2, [])
+
+    def test_group_kerning_pairs(self):
+        kerning = {
+            ("A", "V"): -80,
+            ("A", "W"): -80,
+            ("Aacute", "V"): -80,
+            ("Aacute", "W"): -80,
+            ("T", "o"): -50,
+        }
+        grouped, groups = groupKerningPairs(kerning)
+        assert groups == {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.V": ["V", "W"],
+        }
+        assert grouped == {
+            ("public.kern1.A", "public.kern2.V"): -80,
+            ("T", "o"): -50,
+        }
+
+
+class Type1GlyphsTest:
+
+    def _extract(self, FontClass, **kwargs):
+        ufo = FontClass()
+        extractFontFromType1(getpath("Type1Test.pfb"), ufo, **kwargs)
+        return ufo
+
+    def test_extract_glyphs_sharded(self, FontClass, monkeypatch):
+        serial = self._extract(FontClass)
+        # split the few glyphs of the test font into several chunks
+        monkeypatch.setattr(tools, "GLYPH_CHUNK_SIZE", 10)
+        sharded = self._extract(FontClass, glyphWorkers=2)
+        assert len(serial) > 40
+        assert list(sharded.keys()) == list(serial.keys())
+        assert sharded.lib["public.glyphOrder"] == serial.lib["public.glyphOrder"]
+        for glyph in serial:
+            other = sharded[glyph.name]
+            assert other.unicodes == glyph.unicodes
+            assert other.width == glyph.width
+            assert _outline(other) == _outline(glyph)
+
+
+class Type1SidecarTest:
+
+    def _font(self, tmp_path):
+        path = str(tmp_path / "Type1Test.pfb")
+        shutil.copy(getpath("Type1Test.pfb"), path)
+        return path
+
+    def test_extract_afm(self, FontClass, tmp_path):
+        path = self._font(tmp_path)
+        (tmp_path / "Type1Test.afm").write_text(SIDECAR_AFM)
+        ufo = FontClass()
+        extractUFO(path, ufo)
+        assert ufo.info.capHeight == 698
+        assert ufo.info.xHeight == 516
+        assert dict(ufo.kerning) == {
+            ("A", "V"): -80,
+            ("A", "W"): -80,
+            ("Aacute", "V"): -80,
+            ("Aacute", "W"): -80,
+            ("T", "o"): -50,
+        }
+        assert not ufo.groups
+
+    def test_extract_afm_grouped(self, FontClass, tmp_path):
+        path = self._font(tmp_path)
+        (tmp_path / "Type1Test.afm").write_text(SIDECAR_AFM)
+        ufo = FontClass()
+        extractUFO(path, ufo, groupKerning=True)
+        assert {name: list(members) for name, members in ufo.groups.items()} == {
+            "public.kern1.A": ["A", "Aacute"],
+            "public.kern2.V": ["V", "W"],
+        }
+        assert dict(ufo.kerning) == {
+            ("public.kern1.A", "public.kern2.V"): -80,
+            ("T", "o"): -50,
+        }
+
+    def test_extract_pfm(self, FontClass, tmp_path):
+        path = self._font(tmp_path)
+        # the ANSI character codes of A, V, T and o
+        (tmp_path / "Type1Test.pfm").write_bytes(
+            _pfm(0, [(65, 86, -80), (84, 111, -50)])
+        )
+        ufo = FontClass()
+        extractUFO(path, ufo)
+        assert dict(ufo.kerning) == {("A", "V"): -80, ("T", "o"): -50}
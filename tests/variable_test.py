@@ -0,0 +1,184 @@
+import io
+import os
+import sys
+import pytest
+from fontTools.ttLib import TTFont
+from extractor import extractUFO
+from extractor.exceptions import ExtractorError
+from extractor.formats.variable import extractVariableFont
+from extractor.tools import OutlineRecordingPointPen
+
+pytest.importorskip("numpy")
+
+# the variable fonts are built like the ones of the benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "benchmarks"))
+from fontbuilders import buildVariableFont as _buildVariableFont  # noqa: E402
+
+
+def getpath(filename):
+    dirname = os.path.dirname(__file__)
+    return os.path.join(dirname, "data", filename)
+
+
+def buildVariableFont(isTTF=True):
+    # a few glyphs with composites, class kerning, mark
+    # anchors and glyph programs that vary with the weight
+    data = io.BytesIO()
+    _buildVariableFont(
+        data,
+        numGlyphs=8,
+        isTTF=isTTF,
+        compositeEvery=4,
+        numKernClasses=2,
+        kernClassSize=2,
+        numMarks=2,
+        numMarkClasses=1,
+        programSize=20,
+    )
+    data.seek(0)
+    return data
+
+
+def _dump(font):
+    glyphs = {}
+    for glyph in font:
+        pen = OutlineRecordingPointPen()
+        glyph.drawPoints(pen)
+        glyphs[glyph.name] = (
+            glyph.width,
+            list(glyph.unicodes),
+            pen.contours,
+            pen.components,
+            [(anchor.x, anchor.y, anchor.name) for anchor in glyph.anchors],
+        )
+    return (
+        glyphs,
+        dict(font.kerning.items()),
+        font.info.xHeight,
+        font.info.openTypeOS2WeightClass,
+    )
+
+
+class VariableFontTest:
+
+    @pytest.mark.parametrize("isTTF", [True, False], ids=["ttf", "otf"])
+    def test_extract_instances(self, FontClass, isTTF):
+        from fontTools.varLib.instancer import instantiateVariableFont
+
+        data = buildVariableFont(isTTF)
+        document = extractVariableFont(TTFont(data), FontClass, instances=True)
+        assert [instance.styleName for instance in document.instances] == [
+            "W%d" % value for value in range(100, 1000, 100)
+        ]
+        assert document.sources == []
+        for instance in document.instances:
+            assert instance.font.info.styleName == instance.styleName
+            # the same as instancing the font and extracting it
+            data.seek(0)
+            static = instantiateVariableFont(
+                TTFont(data), dict(wght=instance.location["Weight"])
+            )
+            staticData = io.BytesIO()
+            static.save(staticData)
+            staticData.seek(0)
+            expected = FontClass()
+            extractUFO(staticData, expected, format="OTF")
+            assert _dump(instance.font) == _dump(expected)
+
+    def test_extract_masters(self, FontClass):
+        document = extractVariableFont(TTFont(buildVariableFont()), FontClass)
+        assert [axis.name for axis in document.axes] == ["Weight"]
+        # the default first
+        assert [source.location for source in document.sources] == [
+            dict(Weight=400), dict(Weight=100), dict(Weight=900)
+        ]
+        assert [source.styleName for source in document.sources] == [
+            "W400", "W100", "W900"
+        ]
+        default, light, bold = [source.font for source in document.sources]
+        assert default["g00001"].width == 600
+        assert light["g00001"].width == 560
+        assert bold["g00001"].width == 700
+        assert bold["g00003"].components[1].transformation[4:] == (150, 0)
+        assert bold.groups["public.kern1.g00000"] == ["g00000", "g00001"]
+        assert bold.kerning["public.kern1.g00000", "public.kern2.g00000"] == -20
+        assert [(a.x, a.y) for a in bold["g00000"].anchors] == [(300, 700)]
+        # the named instances are listed without fonts
+        assert len(document.instances) == 9
+        assert all(instance.font is None for instance in document.instances)
+
+    @pytest.mark.parametrize("instances", [False, True], ids=["masters", "instances"])
+    def test_fonts_are_independent(self, FontClass, instances):
+        from extractor.formats.opentype import TRUETYPE_INSTRUCTIONS_KEY
+
+        document = extractVariableFont(
+            TTFont(buildVariableFont()), FontClass, instances=instances
+        )
+        descriptors = document.instances if instances else document.sources
+        first, second = descriptors[0].font, descriptors[1].font
+        glyphOrder = list(second.lib["public.glyphOrder"])
+        unicodes = list(second["g00001"].unicodes)
+        controlValue = dict(second.lib[TRUETYPE_INSTRUCTIONS_KEY]["controlValue"])
+        assert controlValue != first.lib[TRUETYPE_INSTRUCTIONS_KEY]["controlValue"]
+        # changing one font leaves the others unchanged
+        first.lib["public.glyphOrder"].append("B")
+        first["g00001"].unicodes.append(0x42)
+        first.lib[TRUETYPE_INSTRUCTIONS_KEY]["controlValue"]["0"] = 0
+        first.lib[TRUETYPE_INSTRUCTIONS_KEY]["formatVersion"] = "2"
+        assert second.lib["public.glyphOrder"] == glyphOrder
+        assert second["g00001"].unicodes == unicodes
+        assert second.lib[TRUETYPE_INSTRUCTIONS_KEY]["controlValue"] == controlValue
+        assert second.lib[TRUETYPE_INSTRUCTIONS_KEY]["formatVersion"] == "1"
+
+    @pytest.mark.parametrize("instances", [False, True], ids=["masters", "instances"])
+    def test_glyph_program_hashes(self, FontClass, instances):
+        from extractor.formats.opentype import (
+            TRUETYPE_INSTRUCTIONS_KEY,
+            glyphProgramHash,
+        )
+
+        document = extractVariableFont(
+            TTFont(buildVariableFont()), FontClass, instances=instances
+        )
+        descriptors = document.instances if instances else document.sources
+        for descriptor in descriptors:
+            font = descriptor.font
+            for glyph in font:
+                # the hashes of the outlines at each location
+                assert glyph.lib[TRUETYPE_INSTRUCTIONS_KEY]["id"] == glyphProgramHash(
+                    glyph, font
+                )
+
+    def test_save_file_names(self, FontClass, tmp_path):
+        from extractor import _extractVariableFontFile
+
+        font = TTFont(buildVariableFont())
+        name = font["name"]
+        instances = font["fvar"].instances
+        # style names that would name paths outside the
+        # directory or the same file more than once
+        for instance, styleName in zip(
+            instances, ["../../Evil/Style", "Same", "Same", "same"]
+        ):
+            instance.subfamilyNameID = name.addName(styleName)
+        directory = tmp_path / "fonts"
+        directory.mkdir()
+        path = str(directory / "font.ttf")
+        font.save(path)
+        _extractVariableFontFile(
+            path, path + ".designspace", FontClass, "package", None, True
+        )
+        assert sorted(os.listdir(str(tmp_path))) == ["fonts"]
+        filenames = sorted(os.listdir(str(directory)))
+        assert len(filenames) == len(instances) + 2
+        for filename in (
+            "font.ttf-EvilStyle.ufo",
+            "font.ttf-Same.ufo",
+            "font.ttf-Same-2.ufo",
+            "font.ttf-same-3.ufo",
+        ):
+            assert filename in filenames
+
+    def test_not_variable(self, FontClass):
+        with pytest.raises(ExtractorError):
+            extractVariableFont(getpath("UVSTest.ttf"), FontClass)